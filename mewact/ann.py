@@ -0,0 +1,170 @@
+
+import os
+import math
+import threading
+import numpy as np
+from typing import Tuple
+from colorama import Fore
+
+from .config import print
+from .vector_index import normalize, top_k, best_rows
+
+# --- APPROXIMATE NEAREST NEIGHBOURS (IVF-FLAT) ---
+# Rows of a VectorIndex are bucketed by their nearest k-means centroid
+# (spherical k-means on a sample). A query scores the centroids, opens the
+# `nprobe` best buckets and scores only their rows exactly, so the work per
+# query is roughly nprobe/nlist of a brute-force scan. Raising nprobe trades
+# latency for recall. New rows are assigned to their nearest centroid as they
+# are added. On disk, next to the vector file:
+#   <base>.ivf.npy     centroids (nlist x dim, float32)
+#   <base>.ivf.assign  int32 bucket per row, append-only
+# Training starts in the background once the store reaches `min_items` (exact
+# search until then) and reruns when it has grown 4x past the trained size.
+
+BLOCK = 65536   # Rows scored per block when assigning
+
+
+def _assign(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    out = np.empty(len(matrix), np.int32)
+    for start in range(0, len(matrix), BLOCK):
+        out[start:start + BLOCK] = np.argmax(np.asarray(matrix[start:start + BLOCK]) @ centroids.T, axis=1)
+    return out
+
+
+def train_centroids(matrix: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of (normalised) rows."""
+    rng = np.random.default_rng(seed)
+    n = len(matrix)
+    sample = np.asarray(matrix[np.sort(rng.choice(n, min(n, nlist * 64), replace=False))], np.float32)
+    sample = sample[sample.any(axis=1)]
+    nlist = min(nlist, len(sample))
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _assign(sample, centroids)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=nlist)
+        sums = np.zeros_like(centroids)
+        nonempty = counts > 0
+        sums[nonempty] = np.add.reduceat(sample[order], np.concatenate(([0], np.cumsum(counts)[:-1]))[nonempty])
+        empty = np.flatnonzero(~nonempty)
+        if len(empty): sums[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]  # Reseed
+        centroids = normalize(sums)
+    return centroids
+
+
+class IVFIndex:
+    def __init__(self, index, base: str = None, nprobe: int = 8, min_items: int = 50000):
+        self.index = index           # VectorIndex / MappedVectorIndex holding the rows
+        self.base = base
+        self.nprobe = nprobe
+        self.min_items = min_items
+        self.centroids = None
+        self.trained_on = 0
+        self._lists = []             # bucket -> growable int64 row buffer
+        self._sizes = None
+        self._assigned = 0           # Rows already bucketed
+        self._building = False
+        self._lock = threading.RLock()
+        if base: self._load()
+
+    @property
+    def active(self) -> bool:
+        return self.centroids is not None
+
+    def _paths(self):
+        return self.base + ".ivf.npy", self.base + ".ivf.assign"
+
+    def _load(self):
+        cpath, apath = self._paths()
+        if not os.path.exists(cpath): return
+        try:
+            centroids = np.load(cpath)
+            if centroids.shape[1] != self.index.dim: return
+            assign = np.fromfile(apath, np.int32) if os.path.exists(apath) else np.zeros(0, np.int32)
+            assign = assign[:len(self.index)]
+            with open(apath, "r+b" if os.path.exists(apath) else "wb") as f: f.truncate(len(assign) * 4)
+            self._set_centroids(centroids, len(assign))
+            self._bucket(np.arange(len(assign)), assign)
+            self.sync()  # Rows added since the last run
+        except Exception as e:
+            print(f"{Fore.YELLOW}[!] Ignoring unreadable ANN index: {e}")
+            self.centroids = None
+
+    def _set_centroids(self, centroids: np.ndarray, trained_on: int):
+        self.centroids = np.asarray(centroids, np.float32)
+        self.trained_on = trained_on
+        self._lists = [np.zeros(16, np.int64) for _ in range(len(self.centroids))]
+        self._sizes = np.zeros(len(self.centroids), np.int64)
+        self._assigned = 0
+
+    def _bucket(self, rows: np.ndarray, assign: np.ndarray):
+        order = np.argsort(assign, kind="stable")
+        rows, assign = rows[order], assign[order]
+        bounds = np.flatnonzero(np.diff(assign)) + 1
+        for chunk_rows, chunk_assign in zip(np.split(rows, bounds), np.split(assign, bounds)):
+            if not len(chunk_rows): continue
+            b = int(chunk_assign[0])
+            size, need = self._sizes[b], self._sizes[b] + len(chunk_rows)
+            if need > len(self._lists[b]):
+                grown = np.zeros(max(need, 2 * len(self._lists[b])), np.int64)
+                grown[:size] = self._lists[b][:size]
+                self._lists[b] = grown
+            self._lists[b][size:need] = chunk_rows
+            self._sizes[b] = need
+        self._assigned += len(rows)
+
+    def build(self, nlist: int = None):
+        """(Re)train centroids on the current rows and bucket all of them (blocking)."""
+        n = len(self.index)
+        if not n: return
+        nlist = nlist or max(16, int(4 * math.sqrt(n)))
+        matrix = self.index.matrix[:n]
+        centroids = train_centroids(matrix, nlist)
+        assign = _assign(matrix, centroids)
+        with self._lock:
+            # Rows added while training are picked up by the next sync()
+            self._set_centroids(centroids, n)
+            self._bucket(np.arange(n), assign)
+            if self.base:
+                cpath, apath = self._paths()
+                np.save(cpath, self.centroids)
+                assign.tofile(apath)
+        print(f"{Fore.CYAN}[*] ANN index: {len(self.centroids)} lists over {n} vectors")
+
+    def _build_async(self):
+        if self._building: return
+        self._building = True
+        def run():
+            try: self.build()
+            except Exception as e: print(f"{Fore.RED}[!] ANN build failed: {e}")
+            finally: self._building = False
+        threading.Thread(target=run, daemon=True).start()
+
+    def sync(self):
+        """Bucket rows added to the underlying index since the last call (O(new rows)).
+        Training and retraining run in the background; queries use what is there meanwhile."""
+        with self._lock:
+            n = len(self.index)
+            if not self.active or n > 4 * self.trained_on:
+                if n >= self.min_items: self._build_async()
+                if not self.active: return
+            if n <= self._assigned: return
+            rows = np.arange(self._assigned, n)
+            assign = _assign(self.index.matrix[self._assigned:n], self.centroids)
+            self._bucket(rows, assign)
+            if self.base:
+                with open(self._paths()[1], "ab") as f: f.write(assign.tobytes())
+
+    def search(self, query, k: int = 3, nprobe: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, cosine scores); exact search until the index has been trained."""
+        self.sync()
+        if not self.active: return self.index.search(query, k)
+        q = normalize(np.asarray(query, np.float32).reshape(-1))
+        if q.shape[0] != self.index.dim: return np.zeros(0, np.int64), np.zeros(0, np.float32)
+        probe = top_k(self.centroids @ q, min(nprobe or self.nprobe, len(self.centroids)))
+        rows = np.concatenate([self._lists[b][:self._sizes[b]] for b in probe])
+        if not len(rows): return np.zeros(0, np.int64), np.zeros(0, np.float32)
+        rows.sort()  # Sequential reads from the memory map
+        scores = self.index.matrix[rows] @ q
+        best, scores = best_rows(scores, self.index.live()[rows], k)
+        return rows[best], scores
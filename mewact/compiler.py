@@ -0,0 +1,181 @@
+
+import ast
+import re
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Optional
+from colorama import Fore
+
+from .config import print
+
+# --- COMMAND COMPILER ---
+# Python-type library commands are compiled once into code objects, keyed by a
+# hash of their source. Placeholders (__VAR__, __VAR1__, or any declared
+# __NAME__) are not spliced into the source: every occurrence (bare or inside a
+# string literal) is rewritten to a variable reference, and the executor binds
+# the values in the exec namespace.
+#   "pyautogui.write('__VAR__')"    ->  pyautogui.write(__VAR__)
+#   "Popen('start __VAR__')"        ->  Popen(f'start {__VAR__}')
+# Shell templates reference environment variables instead (see CommandTemplate).
+
+PLACEHOLDER = re.compile(r"__([A-Z][A-Z0-9]*(?:_[A-Z0-9]+)*)__")
+DIRECTIVE_PREFIX = "SYSTEM:"  # Sentinel directives stored as python commands; never compiled
+
+
+def _to_bool(value) -> bool:
+    return value if isinstance(value, bool) else str(value).strip().lower() in ("1", "true", "yes", "on")
+
+PARAM_TYPES = {"str": str, "int": int, "float": float, "bool": _to_bool}
+
+
+def source_hash(code: str) -> str:
+    return hashlib.sha1(code.encode("utf-8")).hexdigest()
+
+
+def _split_literal(text: str) -> list:
+    """'a __VAR__ b' -> [Constant('a '), FormattedValue(Name('__VAR__')), Constant(' b')]"""
+    parts, pos = [], 0
+    for m in PLACEHOLDER.finditer(text):
+        if m.start() > pos: parts.append(ast.Constant(text[pos:m.start()]))
+        parts.append(ast.FormattedValue(ast.Name(m.group(0), ast.Load()), -1, None))
+        pos = m.end()
+    if pos < len(text): parts.append(ast.Constant(text[pos:]))
+    return parts
+
+
+class _BindPlaceholders(ast.NodeTransformer):
+    def visit_JoinedStr(self, node):
+        # Placeholders inside an existing f-string are spliced in place (f-strings can't nest)
+        values = []
+        for v in node.values:
+            if isinstance(v, ast.Constant) and isinstance(v.value, str) and PLACEHOLDER.search(v.value):
+                values.extend(_split_literal(v.value))
+            else:
+                values.append(self.visit(v))
+        node.values = values
+        return node
+
+    def visit_Constant(self, node):
+        if not isinstance(node.value, str) or not PLACEHOLDER.search(node.value): return node
+        if PLACEHOLDER.fullmatch(node.value):
+            return ast.copy_location(ast.Name(node.value, ast.Load()), node)
+        return ast.copy_location(ast.JoinedStr(_split_literal(node.value)), node)
+
+
+def placeholders(code: str) -> tuple:
+    """Parameter names referenced by a command, e.g. ('VAR',) or ('VAR1', 'VAR2')."""
+    return tuple(dict.fromkeys(PLACEHOLDER.findall(code)))
+
+
+def compile_command(code: str, name: str = "<command>"):
+    tree = _BindPlaceholders().visit(ast.parse(code, filename=name))
+    return compile(ast.fix_missing_locations(tree), name, "exec")
+
+
+class CommandTemplate:
+    """
+    Named, typed parameters of one library command.
+    Entries may declare them as {"params": {"SECONDS": {"type": "float", "default": 1.0}}};
+    undeclared placeholders are optional strings (the legacy __VAR__ behaviour).
+    """
+    def __init__(self, source: str, spec: Optional[Dict] = None):
+        self.source = source
+        self.params = {name: {"type": "str", "default": ""} for name in placeholders(source)}
+        for name, decl in (spec or {}).items():
+            decl = decl if isinstance(decl, dict) else {"type": str(decl)}
+            if decl.get("type", "str") not in PARAM_TYPES:
+                raise ValueError(f"unknown parameter type '{decl.get('type')}' for {name}")
+            self.params[name.upper()] = {"type": decl.get("type", "str"), **({"default": decl["default"]} if "default" in decl else {})}
+        self._shell = {}  # var_ref style -> shell source
+
+    def bind(self, values: Optional[Dict] = None) -> Dict:
+        """Typed values for every parameter. A lone inline value (VAR) fills a single declared parameter."""
+        values = {k.upper(): v for k, v in (values or {}).items()}
+        bound = {}
+        for name, decl in self.params.items():
+            if name in values and (values[name] != "" or "default" not in decl):
+                raw = values[name]
+            elif len(self.params) == 1 and values.get("VAR"):
+                raw = values["VAR"]
+            elif "default" in decl:
+                raw = decl["default"]
+            else:
+                raise ValueError(f"missing parameter '{name}'")
+            try:
+                bound[name] = PARAM_TYPES[decl["type"]](raw)
+            except (TypeError, ValueError):
+                raise ValueError(f"parameter '{name}' expects {decl['type']}, got {raw!r}")
+        return bound
+
+    def shell_source(self, var_ref) -> str:
+        """Shell command with each placeholder replaced by `var_ref(env_name)`, cached per shell flavour."""
+        key = var_ref("X")
+        if key not in self._shell:
+            self._shell[key] = PLACEHOLDER.sub(lambda m: var_ref(env_name(m.group(1))), self.source)
+        return self._shell[key]
+
+
+def env_name(param: str) -> str:
+    return f"MEWACT_{param}"
+
+
+def render(code: str, params: Optional[Dict[str, str]] = None) -> str:
+    """Text form of a command with its placeholders filled (for logs, recordings and directives)."""
+    params = params or {}
+    return PLACEHOLDER.sub(lambda m: str(params.get(m.group(1), "")), code)
+
+
+class CodeCache:
+    """
+    Compiled library commands, keyed by source hash, each with its parameter template.
+    Library entries are pinned with their declared parameter types, so the same source
+    run as raw code binds exactly like typed dispatch; ad-hoc code (LLM output,
+    recordings) has only optional string parameters and is kept in a small LRU.
+    """
+    def __init__(self, adhoc_limit: int = 256):
+        self._pinned = {}
+        self._adhoc = OrderedDict()
+        self.adhoc_limit = adhoc_limit
+        self.errors = {}  # command name -> error message
+
+    def compile_library(self, commands: Dict) -> Dict[str, str]:
+        """Compile every python-type command; returns {name: error} for the broken ones."""
+        self._pinned.clear(); self.errors.clear()
+        for name, data in commands.items():
+            if not isinstance(data, dict) or data.get("type", "python") != "python": continue
+            self.add(name, data.get("code", ""), data.get("params"))
+        if self.errors:
+            print(f"{Fore.YELLOW}[!] {len(self.errors)} library command(s) failed to compile:")
+            for name, err in self.errors.items():
+                print(f"{Fore.YELLOW}    - '{name}': {err}")
+        return self.errors
+
+    def add(self, name: str, code: str, spec: Optional[Dict] = None) -> bool:
+        self.errors.pop(name, None)
+        if not code or code.startswith(DIRECTIVE_PREFIX): return True
+        try:
+            self._pinned[source_hash(code)] = {"code": compile_command(code, name), "params": placeholders(code),
+                                               "template": CommandTemplate(code, spec)}
+            return True
+        except SyntaxError as e:
+            self.errors[name] = f"line {e.lineno}: {e.msg}"
+        except ValueError as e:
+            self.errors[name] = str(e)
+        return False
+
+    def get(self, code: str) -> Dict:
+        """{"code": code object, "params": names, "template": CommandTemplate}; compiles (and caches) unknown sources. Raises SyntaxError."""
+        key = source_hash(code)
+        entry = self._pinned.get(key)
+        if entry: return entry
+        entry = self._adhoc.get(key)
+        if entry:
+            self._adhoc.move_to_end(key)
+            return entry
+        entry = {"code": compile_command(code), "params": placeholders(code), "template": CommandTemplate(code)}
+        self._adhoc[key] = entry
+        if len(self._adhoc) > self.adhoc_limit: self._adhoc.popitem(last=False)
+        return entry
+
+    def __len__(self):
+        return len(self._pinned)
@@ -27,11 +27,28 @@ TARGET_WINDOW_TITLE = ""  # Focus on specific window (e.g., "Chrome")
 TARGET_MONITORS = []      # List of monitor indices (1-based). Empty = all. E.g., [1] or [1, 2]
 LIBRARY_FILE = "command_library.json"
 SESSION_FILE = "sessions.json"
+HISTORY_FILE = "recording.txt"  # Log of every executed command (the history table with the sqlite backend)
+JOURNAL_COMPACT_EVERY = 50  # Learned-command journal records before they are folded into the library file
+STORAGE_BACKEND = "json"    # "json" (files above) or "sqlite" (library, sessions, memories and history in DB_FILE)
+DB_FILE = "mewact.db"       # Existing JSON files are imported on first start with the sqlite backend
 
 # --- ACTIVE VISION CONFIGURATION ---
 ACTIVE_MODE = False 
 # ... (existing keys) ...
-EMBEDDING_MODEL = "nomic-embed-text" 
+EMBEDDING_MODEL = "nomic-embed-text"   # Ollama embedding model (ollama pull nomic-embed-text); also the embed cache key
+
+# --- MCP SERVER CONFIGURATION ---
+MCP_OBSERVE_WORKERS = 4     # Concurrent read-only tools (captures, screen info, searches)
+MCP_WORK_WORKERS = 4        # Concurrent long-running tools (shell, VLM, mobile)
+MCP_OBSERVE_TIMEOUT = 20    # Seconds before an observation tool gives up
+MCP_ACTION_TIMEOUT = 60     # Seconds before an input/command tool gives up
+MCP_WORK_TIMEOUT = 300      # Seconds before a long-running tool gives up
+
+# --- SHELL CONFIGURATION ---
+SHELL_TIMEOUT = 60          # Seconds before a shell command (and its process tree) is killed
+SHELL_MAX_OUTPUT = 20000    # Characters of output returned (head + tail kept, middle truncated)
+SHELL_MAX_CONCURRENT = 4    # Shell commands allowed to run at the same time
+PERSISTENT_SHELL = False    # Set True to run executor shell commands in one long-lived bash/PowerShell session
 
 # --- SANDBOX CONFIGURATION ---
 SANDBOX_ENABLED = False # Set True to route 'execute_script' to Docker
@@ -39,6 +56,36 @@ DOCKER_IMAGE = "mewact-runner"
 
 # --- AUTONOMY CONFIGURATION ---
 PLANNER_MODEL = "mistral" # Requires: ollama pull mistral
+GOAL_CACHE_SIZE = 512      # Resolved goals remembered by the planner (cleared whenever the library changes)
+USAGE_FILE = "usage_stats.bin"  # Per-command run/success counts (fixed-size records)
+USAGE_WEIGHT = 0.3         # Max relative BM25 boost (or penalty) from a command's run/success history
+PLAN_VISION_DEADLINE = 8.0  # Seconds plan_goal waits for the screen description before planning without it
+PLAN_MEMORY_DEADLINE = 1.0  # Seconds plan_goal waits for skill recall
+PLAN_VISION_REUSE = 2.0     # Seconds a screen description still in flight may be shared with a newer goal
+
+# --- VECTOR MEMORY CONFIGURATION ---
+ANN_ENABLED = False        # IVF approximate search for large memory stores (exact search below ANN_MIN_ITEMS)
+ANN_MIN_ITEMS = 50000      # Store size at which the ANN index is trained
+ANN_NPROBE = 8             # Lists scanned per query: higher = better recall, slower
+VECTOR_QUANTIZATION = "none"  # "none", "float16" or "int8": compact scan copy, re-rank from the on-disk vectors (json/binary store only)
+RERANK_FACTOR = 4          # Candidates re-ranked at full precision per result (k * RERANK_FACTOR)
+EMBEDDING_BACKEND = "auto"  # "ollama", "local" (offline hashed TF-IDF) or "auto": Ollama in ACTIVE_MODE, else local
+EMBED_CACHE_DIR = "embed_cache"    # Persistent embeddings keyed by (model, text hash), relative to the memory store; "" disables
+LOCAL_EMBED_DIM = 256      # Offline embedder output size
+LOCAL_EMBED_STATE = "local_embed_df.npy"  # Offline embedder document frequencies (IDF)
+LOCAL_EMBED_FIT_DOCS = 500 # Stored texts after which the offline IDF is frozen (training freezes it after the library)
+MEMORY_CONSOLIDATE_INTERVAL = 0   # Seconds between background consolidation passes (0 = off)
+MEMORY_DEDUP_THRESHOLD = 0.97     # Cosine similarity at which memories are merged as duplicates
+MEMORY_TTL_DAYS = 0               # Drop memories neither added nor retrieved for this long (0 = keep)
+MEMORY_MAX_ITEMS = 0              # Capacity (0 = unlimited); eviction by MEMORY_EVICTION
+MEMORY_EVICTION = "lru"           # "lru" or "least_useful" (fewest retrievals first)
+
+# --- LLM SELECTION CONFIGURATION ---
+LLM_SELECT = False         # Let MODEL_NAME pick among the top keyword matches (falls back to the top match)
+LLM_SELECT_HOST = "http://localhost:11434"  # Any Ollama-compatible /api/chat endpoint
+LLM_SELECT_DEADLINE = 1.5  # Seconds to wait for the model before using the keyword top match
+LLM_SELECT_CANDIDATES = 15 # Shortlist size sent to the model
+LLM_SELECT_CACHE_SIZE = 256  # Cached answers, keyed by (goal, candidate set)
 
 # --- MOBILE CONFIGURATION ---
 MOBILE_ENABLED = False # Set True to enable Android control via ADB
@@ -71,6 +118,14 @@ OCR_STRIP_OVERLAP = 30      # Pixels of overlap between strips to prevent cuttin
 OCR_SCAN_MODE = "monitor"   # "monitor" (default) or "window"
 OCR_MONITOR_STRATEGY = "full" # "full" (default) or "window" (iterates windows on monitor) 
 
+# Element Detection (icons, checkboxes, icon-only buttons that OCR cannot see)
+ELEMENT_DETECTION = True    # Adds {"kind": "element"} boxes to capture_and_scan() ui_data
+ELEMENT_SCALE = 0.5         # Detection runs at this fraction of capture resolution
+
+# Template Matching (click icons by sample image)
+TEMPLATE_DIR = "templates"  # Preprocessed template pyramids (.npz), one per template
+TEMPLATE_THRESHOLD = 0.8    # Minimum normalized correlation for a match
+
 # --- AUTO-ROLLBACK CONFIG ---
 # When enabled, automatically focuses back to chat window after each command
 AUTO_ROLLBACK_ENABLED = False
@@ -0,0 +1,213 @@
+
+import os
+import time
+import threading
+import numpy as np
+from typing import Dict, List
+from colorama import Fore
+
+from .config import print
+
+# --- MEMORY CONSOLIDATION ---
+# Keeps VectorMemory compact while it keeps growing:
+#   dedupe   each new row is compared with every earlier row, one block of new
+#            rows at a time against chunks of the matrix (one matrix product
+#            per chunk). An older row at or above the cosine threshold with the
+#            same metadata "id" (or neither has one) is merged into the newer
+#            one: the newer text and vector win, metadata is merged (newer keys
+#            win, "merged" counts absorbed entries) and usage is added up. The
+#            older row is deleted. Rows of different commands are never merged,
+#            however similar their descriptions.
+#   TTL      rows neither added nor retrieved within ttl_days are deleted
+#   capacity above max_items, rows are evicted by policy: "lru" (least recently
+#            added or retrieved) or "least_useful" (fewest retrievals, then LRU)
+# Deletes are tombstones (see vector_store.py), so none of the steps rewrites
+# the store. Similarity is computed outside the memory lock; only the resulting
+# merges and deletes take it. The store is rewritten (compacted) only once half
+# of it is dead. Work per step is bounded by `batch` new rows. A row watermark
+# is persisted with the usage table, so a restart doesn't rescan old rows.
+
+CHUNK = 16384   # Matrix rows per similarity block
+USAGE_COLUMNS = 3  # added, last retrieved, retrieval count
+
+
+class RowUsage:
+    """Per-row insert time, last retrieval time and retrieval count, saved next to the store."""
+    def __init__(self, path: str = None):
+        self.path = path
+        self.table = np.zeros((1024, USAGE_COLUMNS), np.float64)
+        self.rows = 0
+        self.scanned = 0          # Rows already checked for duplicates
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with np.load(path) as saved:
+                    table = saved["table"]
+                    self._reserve(len(table))
+                    self.table[:len(table)] = table
+                    self.rows, self.scanned = len(table), int(saved["scanned"])
+            except Exception as e:
+                print(f"{Fore.YELLOW}[!] Ignoring unreadable usage table {path}: {e}")
+
+    def _reserve(self, need: int):
+        if need > len(self.table):
+            grown = np.zeros((max(need, 2 * len(self.table)), USAGE_COLUMNS), np.float64)
+            grown[:self.rows] = self.table[:self.rows]
+            self.table = grown
+
+    def sync(self, count: int, now: float = None):
+        """Cover rows up to `count`. Rows the table hasn't seen count as added `now`, so a
+        missing or stale table postpones expiry rather than triggering it (no metadata is read)."""
+        if count < self.rows: self.rows = count; self.scanned = min(self.scanned, count)
+        if count == self.rows: return
+        self._reserve(count)
+        self.table[self.rows:count] = 0.0
+        self.table[self.rows:count, 0] = now or time.time()
+        self.rows = count
+        self._dirty = True
+
+    def touch(self, rows, now: float = None):
+        rows = np.asarray(rows, np.int64)
+        rows = rows[rows < self.rows]
+        if not len(rows): return
+        self.table[rows, 1] = now or time.time()
+        self.table[rows, 2] += 1
+        self._dirty = True
+
+    def absorb(self, into: int, rows: List[int]):
+        """Usage of merged-away rows is credited to the surviving row."""
+        self.table[into, 0] = max(self.table[into, 0], self.table[rows, 0].max())
+        self.table[into, 1] = max(self.table[into, 1], self.table[rows, 1].max())
+        self.table[into, 2] += self.table[rows, 2].sum()
+        self._dirty = True
+
+    def recency(self) -> np.ndarray:
+        return self.table[:self.rows, :2].max(axis=1)
+
+    def hits(self) -> np.ndarray:
+        return self.table[:self.rows, 2]
+
+    def remap(self, keep: np.ndarray):
+        """After compaction: new row i is old row keep[i]."""
+        self.scanned = int(np.searchsorted(keep, self.scanned))
+        table = self.table[keep]
+        self.table = np.zeros((max(1024, len(table)), USAGE_COLUMNS), np.float64)
+        self.table[:len(table)] = table
+        self.rows = len(table)
+        self._dirty = True
+
+    def save(self):
+        if not (self.path and self._dirty): return
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp, table=self.table[:self.rows], scanned=np.int64(self.scanned))
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+
+class Consolidator:
+    def __init__(self, memory, threshold: float = 0.97, ttl_days: float = 0, max_items: int = 0,
+                 policy: str = "lru", batch: int = 256, compact_ratio: float = 0.5):
+        if policy not in ("lru", "least_useful"): raise ValueError(f"Unknown eviction policy: {policy}")
+        self.memory = memory
+        self.threshold = threshold
+        self.ttl_days = ttl_days
+        self.max_items = max_items
+        self.policy = policy
+        self.batch = batch
+        self.compact_ratio = compact_ratio
+        self._stop = threading.Event()
+        self._thread = None
+
+    def pending(self) -> int:
+        """New rows not yet checked for duplicates."""
+        return max(0, len(self.memory.data) - self.memory.usage.scanned)
+
+    def _duplicates(self, start: int, end: int) -> Dict[int, List[int]]:
+        """new row -> earlier rows at or above the threshold (read-only; runs without the lock)."""
+        matrix = self.memory.index.matrix
+        new = np.asarray(matrix[start:end])
+        dups = {}
+        for c in range(0, end, CHUNK):
+            sims = np.asarray(matrix[c:min(c + CHUNK, end)]) @ new.T
+            older, newer = np.nonzero(sims >= self.threshold)
+            older += c; newer += start
+            for j, i in zip(older[older < newer].tolist(), newer[older < newer].tolist()):
+                dups.setdefault(i, []).append(j)
+        return dups
+
+    def _merge(self, dups: Dict[int, List[int]]) -> int:
+        memory, merged = self.memory, 0
+        for i in sorted(dups):
+            if memory.is_deleted(i): continue
+            newest = memory.data[i].get("metadata") or {}
+            older = [j for j in dups[i] if not memory.is_deleted(j)
+                     and (memory.data[j].get("metadata") or {}).get("id") == newest.get("id")]
+            if not older: continue
+            metadata, count = {}, 0
+            for j in older:
+                meta = memory.data[j].get("metadata") or {}
+                metadata.update(meta)
+                count += 1 + meta.get("merged", 0)
+            metadata.update(newest)
+            metadata["merged"] = count + newest.get("merged", 0)
+            memory.usage.absorb(i, older)
+            memory.update_metadata(i, metadata)
+            memory.remove_rows(older)
+            merged += len(older)
+        return merged
+
+    def _alive(self) -> np.ndarray:
+        alive = np.ones(self.memory.usage.rows, bool)
+        dead = [r for r in self.memory.deleted_rows() if r < len(alive)]
+        alive[dead] = False
+        return alive
+
+    def step(self, now: float = None) -> Dict:
+        """One bounded consolidation pass; returns what it did."""
+        memory, now = self.memory, now or time.time()
+        stats = {"merged": 0, "expired": 0, "evicted": 0, "compacted": False}
+        start = memory.usage.scanned
+        end = min(len(memory.data), start + self.batch)
+        dups = self._duplicates(start, end) if end > start and memory.index.dim else {}
+        with memory._lock:
+            if dups: stats["merged"] = self._merge(dups)
+            memory.usage.scanned = max(memory.usage.scanned, end)
+            alive = self._alive()
+            if self.ttl_days:
+                expired = np.flatnonzero(alive & (memory.usage.recency() < now - self.ttl_days * 86400))
+                memory.remove_rows(expired.tolist())
+                alive[expired] = False
+                stats["expired"] = len(expired)
+            excess = int(alive.sum()) - self.max_items if self.max_items else 0
+            if excess > 0:
+                candidates = np.flatnonzero(alive)
+                recency = memory.usage.recency()[candidates]
+                order = (np.argsort(recency, kind="stable") if self.policy == "lru"
+                         else np.lexsort((recency, memory.usage.hits()[candidates])))
+                memory.remove_rows(candidates[order[:excess]].tolist())
+                stats["evicted"] = excess
+            if len(memory.data) and len(memory.deleted_rows()) >= self.compact_ratio * len(memory.data):
+                memory.compact()
+                stats["compacted"] = True
+            memory.usage.save()
+        if any(stats.values()):
+            print(f"{Fore.CYAN}[*] Memory consolidation: {stats}")
+        return stats
+
+    def start(self, interval: float = 60.0):
+        """Run step() in a daemon thread; back-to-back while new rows are waiting, else every `interval` s."""
+        if self._thread: return self
+        def loop():
+            while not self._stop.wait(0 if self.pending() else interval):
+                try: self.step()
+                except Exception as e:
+                    print(f"{Fore.RED}[!] Memory consolidation failed: {e}")
+                    self._stop.wait(interval)
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join(timeout=5)
+        self._thread = None
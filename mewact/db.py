@@ -0,0 +1,375 @@
+
+import os
+import re
+import ast
+import json
+import time
+import sqlite3
+import threading
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Optional
+from colorama import Fore
+
+from .config import print
+
+# --- SQLITE STORAGE BACKEND ---
+# Optional single-file store (config.STORAGE_BACKEND = "sqlite") for everything
+# that otherwise lives in separate JSON/text files that are loaded whole and
+# rewritten whole: the command library, both kinds of sessions, vector memories
+# and the command history (recording.txt). WAL mode keeps reads concurrent with
+# writes: writes go through one connection under a lock, and each thread reads
+# on its own connection, so it only ever sees committed data. Every change is a
+# single-row statement. FTS5 tables (when the SQLite
+# build has FTS5) give indexed text search over commands and memories.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS commands (
+    name TEXT PRIMARY KEY, id INTEGER, type TEXT, description TEXT,
+    position INTEGER NOT NULL, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS commands_id ON commands(id);
+CREATE INDEX IF NOT EXISTS commands_position ON commands(position);
+CREATE TABLE IF NOT EXISTS sessions (
+    rowid INTEGER PRIMARY KEY, store TEXT NOT NULL, name TEXT NOT NULL,
+    description TEXT, created REAL, UNIQUE(store, name)
+);
+CREATE TABLE IF NOT EXISTS steps (
+    session INTEGER NOT NULL REFERENCES sessions(rowid) ON DELETE CASCADE,
+    idx INTEGER NOT NULL, data TEXT NOT NULL, PRIMARY KEY(session, idx)
+);
+CREATE TABLE IF NOT EXISTS memories (
+    id INTEGER PRIMARY KEY, text TEXT NOT NULL, metadata TEXT, vector BLOB, timestamp REAL
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY, ts REAL NOT NULL, cmd_id TEXT, args TEXT, keywords TEXT
+);
+CREATE INDEX IF NOT EXISTS history_ts ON history(ts);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS commands_fts USING fts5(name, description, content='commands', content_rowid='rowid');
+CREATE TRIGGER IF NOT EXISTS commands_ai AFTER INSERT ON commands BEGIN
+    INSERT INTO commands_fts(rowid, name, description) VALUES (new.rowid, new.name, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS commands_ad AFTER DELETE ON commands BEGIN
+    INSERT INTO commands_fts(commands_fts, rowid, name, description) VALUES ('delete', old.rowid, old.name, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS commands_au AFTER UPDATE ON commands BEGIN
+    INSERT INTO commands_fts(commands_fts, rowid, name, description) VALUES ('delete', old.rowid, old.name, old.description);
+    INSERT INTO commands_fts(rowid, name, description) VALUES (new.rowid, new.name, new.description);
+END;
+CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(text, content='memories', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN
+    INSERT INTO memories_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
+    INSERT INTO memories_fts(memories_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+_HISTORY_LINE = re.compile(r"^\[(.+?)\] CMD: (.*?) \| ARGS: (.*?) \| KEYWORDS: (\[.*\])$")
+
+
+def _fts_query(text: str) -> str:
+    """Quote each word so user text can't be parsed as FTS5 syntax; words are OR-ed."""
+    words = [w.replace('"', '""') for w in text.split() if w.strip()]
+    return " OR ".join(f'"{w}"' for w in words)
+
+
+class Database:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        # One writer connection (used only inside _tx) and one read connection per thread:
+        # a read never joins another thread's open write transaction, it sees the last commit
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        try:
+            self._writer.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            print(f"{Fore.YELLOW}[!] SQLite build lacks FTS5; text search falls back to LIKE")
+            self.has_fts = False
+        self._local = threading.local()
+        self._readers = []
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """This thread's read connection (WAL readers run concurrently with the writer)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._lock: self._readers.append(conn)
+        return conn
+
+    def _tx(self):
+        """Serialised write transaction: `with self._tx() as c: ...`"""
+        db = self
+        class _Tx:
+            def __enter__(self):
+                db._lock.acquire()
+                db._writer.execute("BEGIN IMMEDIATE")
+                return db._writer
+            def __exit__(self, exc_type, *_):
+                try: db._writer.execute("ROLLBACK" if exc_type else "COMMIT")
+                finally: db._lock.release()
+        return _Tx()
+
+    def close(self):
+        with self._lock:
+            for conn in self._readers: conn.close()
+            self._readers.clear()
+            self._local = threading.local()
+            self._writer.close()
+
+    # --- META ---
+    def get_meta(self, key: str, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row else default
+
+    def set_meta(self, key: str, value):
+        with self._tx() as c:
+            c.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def library_meta(self) -> Dict:
+        """Top-level library fields (schema_version, next_id, ...); import bookkeeping is left out."""
+        rows = self.conn.execute("SELECT key, value FROM meta WHERE key NOT LIKE 'imported:%'")
+        return {r["key"]: json.loads(r["value"]) for r in rows}
+
+    # --- COMMANDS ---
+    def command_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM commands").fetchone()[0]
+
+    def load_commands(self) -> Dict:
+        """name -> entry, in library order (section markers included)."""
+        return {r["name"]: json.loads(r["data"]) for r in self.conn.execute("SELECT name, data FROM commands ORDER BY position")}
+
+    def put_command(self, name: str, entry, meta: Optional[Dict] = None):
+        with self._tx() as c:
+            row = c.execute("SELECT position FROM commands WHERE name = ?", (name,)).fetchone()
+            position = row["position"] if row else c.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM commands").fetchone()[0]
+            is_cmd = isinstance(entry, dict)
+            c.execute("INSERT OR REPLACE INTO commands(name, id, type, description, position, data) VALUES (?, ?, ?, ?, ?, ?)",
+                      (name, entry.get("id") if is_cmd else None, entry.get("type", "python") if is_cmd else None,
+                       entry.get("description", "") if is_cmd else str(entry), position, json.dumps(entry)))
+            for k, v in (meta or {}).items():
+                c.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (k, json.dumps(v)))
+
+    def delete_command(self, name: str):
+        with self._tx() as c:
+            c.execute("DELETE FROM commands WHERE name = ?", (name,))
+
+    def replace_commands(self, commands: Dict, meta: Optional[Dict] = None):
+        with self._tx() as c:
+            c.execute("DELETE FROM commands")
+            c.executemany("INSERT INTO commands(name, id, type, description, position, data) VALUES (?, ?, ?, ?, ?, ?)", [
+                (name, e.get("id") if isinstance(e, dict) else None, e.get("type", "python") if isinstance(e, dict) else None,
+                 e.get("description", "") if isinstance(e, dict) else str(e), i, json.dumps(e))
+                for i, (name, e) in enumerate(commands.items())])
+            for k, v in (meta or {}).items():
+                c.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (k, json.dumps(v)))
+
+    def search_commands(self, query: str, limit: int = 10) -> List[Dict]:
+        if self.has_fts and _fts_query(query):
+            rows = self.conn.execute(
+                "SELECT c.name, c.data FROM commands_fts f JOIN commands c ON c.rowid = f.rowid "
+                "WHERE commands_fts MATCH ? ORDER BY rank LIMIT ?", (_fts_query(query), limit))
+        else:
+            rows = self.conn.execute("SELECT name, data FROM commands WHERE type IS NOT NULL AND (name LIKE ? OR description LIKE ?) LIMIT ?",
+                                     (f"%{query}%", f"%{query}%", limit))
+        return [{"name": r["name"], **json.loads(r["data"])} for r in rows]
+
+    # --- SESSIONS ---
+    # store "library": LibraryManager sessions (name -> [steps]);
+    # store "recording": SessionManager recordings (name -> {"name", "description", "steps"})
+    def load_sessions(self, store: str) -> Dict:
+        sessions = {}
+        for s in self.conn.execute("SELECT rowid, name, description FROM sessions WHERE store = ? ORDER BY rowid", (store,)):
+            steps = [json.loads(r["data"]) for r in self.conn.execute("SELECT data FROM steps WHERE session = ? ORDER BY idx", (s["rowid"],))]
+            sessions[s["name"]] = steps if store == "library" else {"name": s["name"], "description": s["description"] or "", "steps": steps}
+        return sessions
+
+    def save_session(self, store: str, name: str, steps: List, description: str = ""):
+        with self._tx() as c:
+            c.execute("DELETE FROM sessions WHERE store = ? AND name = ?", (store, name))
+            rowid = c.execute("INSERT INTO sessions(store, name, description, created) VALUES (?, ?, ?, ?)",
+                              (store, name, description, time.time())).lastrowid
+            c.executemany("INSERT INTO steps(session, idx, data) VALUES (?, ?, ?)",
+                          [(rowid, i, json.dumps(step)) for i, step in enumerate(steps)])
+
+    # --- MEMORIES ---
+    def add_memory(self, text: str, vector, metadata: Optional[Dict] = None, timestamp: float = None) -> int:
+        blob = np.asarray(vector, np.float32).tobytes() if vector is not None else None
+        with self._tx() as c:
+            return c.execute("INSERT INTO memories(text, metadata, vector, timestamp) VALUES (?, ?, ?, ?)",
+                             (text, json.dumps(metadata or {}), blob, timestamp or time.time())).lastrowid
+
+    def load_memories(self) -> List[Dict]:
+        return [{"text": r["text"], "metadata": json.loads(r["metadata"] or "{}"),
+                 "vector": np.frombuffer(r["vector"], np.float32).tolist() if r["vector"] else None,
+                 "timestamp": r["timestamp"], "rowid": r["id"]}
+                for r in self.conn.execute("SELECT id, text, metadata, vector, timestamp FROM memories ORDER BY id")]
+
+    def delete_memories(self, rowids: List[int]):
+        with self._tx() as c:
+            c.executemany("DELETE FROM memories WHERE id = ?", [(r,) for r in rowids])
+
+    def update_memory_metadata(self, rowid: int, metadata: Dict):
+        with self._tx() as c:
+            c.execute("UPDATE memories SET metadata = ? WHERE id = ?", (json.dumps(metadata), rowid))
+
+    def search_memories_text(self, query: str, limit: int = 10) -> List[Dict]:
+        if not (self.has_fts and _fts_query(query)): return []
+        rows = self.conn.execute("SELECT m.text, m.metadata FROM memories_fts f JOIN memories m ON m.id = f.rowid "
+                                 "WHERE memories_fts MATCH ? ORDER BY rank LIMIT ?", (_fts_query(query), limit))
+        return [{"text": r["text"], "metadata": json.loads(r["metadata"] or "{}")} for r in rows]
+
+    # --- HISTORY ---
+    def log_history(self, cmd_id, args: str, keywords: List[str]):
+        with self._tx() as c:
+            c.execute("INSERT INTO history(ts, cmd_id, args, keywords) VALUES (?, ?, ?, ?)",
+                      (time.time(), str(cmd_id), args, json.dumps(keywords)))
+
+    def recent_history(self, limit: int = 50) -> List[Dict]:
+        rows = self.conn.execute("SELECT ts, cmd_id, args, keywords FROM history ORDER BY id DESC LIMIT ?", (limit,))
+        return [{"ts": r["ts"], "cmd_id": r["cmd_id"], "args": r["args"], "keywords": json.loads(r["keywords"] or "[]")} for r in rows]
+
+    def history_entries(self):
+        """(cmd id, epoch seconds) for every logged execution, oldest first."""
+        for r in self.conn.execute("SELECT cmd_id, ts FROM history ORDER BY id"):
+            yield r["cmd_id"], r["ts"]
+
+    # --- JSON IMPORT / EXPORT ---
+    def import_json(self, library: str = None, sessions: str = None, session_memory: str = None,
+                    memories: str = None, history: str = None) -> Dict[str, int]:
+        """
+        Load the existing JSON stores (any subset); returns the rows written per table.
+        Safe to re-run: commands and sessions are upserted by name, and memories and
+        history lines already in the database (same text/metadata/timestamp, same
+        ts/command/args) are skipped, so only new entries are added.
+        """
+        counts = {}
+        def read(path):
+            if not path or not os.path.exists(path): return None
+            with open(path, "r", encoding="utf-8") as f: return json.load(f)
+
+        lib = read(library)
+        if lib and "commands" in lib:
+            self.replace_commands(lib["commands"], {k: v for k, v in lib.items() if k != "commands"})
+            counts["commands"] = len(lib["commands"])
+        for store, path in (("library", sessions), ("recording", session_memory)):
+            data = read(path)
+            if not data: continue
+            for name, value in data.items():
+                if not isinstance(value, (list, dict)): continue
+                steps = value if isinstance(value, list) else value.get("steps", [])
+                self.save_session(store, name, steps, "" if isinstance(value, list) else value.get("description", ""))
+            counts[f"sessions:{store}"] = len(data)
+        mems = read(memories)
+        if mems:
+            stored = Counter((r["text"], json.dumps(json.loads(r["metadata"] or "{}"), sort_keys=True), r["timestamp"])
+                             for r in self.conn.execute("SELECT text, metadata, timestamp FROM memories"))
+            rows = []
+            for m in mems:
+                timestamp = m.get("timestamp")
+                key = (m.get("text", ""), json.dumps(m.get("metadata") or {}, sort_keys=True), timestamp)
+                if stored[key]: stored[key] -= 1; continue
+                vector = m.get("vector")
+                rows.append((key[0], json.dumps(m.get("metadata") or {}),
+                             np.asarray(vector, np.float32).tobytes() if vector is not None else None, timestamp))
+            with self._tx() as c:
+                c.executemany("INSERT INTO memories(text, metadata, vector, timestamp) VALUES (?, ?, ?, ?)", rows)
+            counts["memories"] = len(rows)
+        if history and os.path.exists(history):
+            stored = Counter(tuple(r) for r in self.conn.execute("SELECT ts, cmd_id, args FROM history"))
+            rows = []
+            with open(history, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    m = _HISTORY_LINE.match(line.rstrip("\n"))
+                    if not m: continue
+                    try:
+                        ts = time.mktime(time.strptime(m.group(1), "%Y-%m-%d %H:%M:%S"))
+                        keywords = ast.literal_eval(m.group(4))
+                    except (ValueError, SyntaxError):
+                        continue
+                    key = (ts, m.group(2), m.group(3))
+                    if stored[key]: stored[key] -= 1; continue
+                    rows.append((*key, json.dumps(keywords)))
+            with self._tx() as c:
+                c.executemany("INSERT INTO history(ts, cmd_id, args, keywords) VALUES (?, ?, ?, ?)", rows)
+            counts["history"] = len(rows)
+        return counts
+
+    def import_once(self, kind: str, path: str) -> bool:
+        """First start on the sqlite backend: pull one legacy JSON file in (kind = an import_json keyword)."""
+        key = f"imported:{kind}:{os.path.abspath(path)}"
+        if self.get_meta(key) or not os.path.exists(path): return False
+        counts = self.import_json(**{kind: path})
+        self.set_meta(key, time.time())
+        print(f"{Fore.CYAN}[*] Imported {os.path.basename(path)} into {os.path.basename(self.path)}: {counts}")
+        return True
+
+    def export_json(self, directory: str) -> List[str]:
+        """Write the JSON files the json backend reads; returns the paths written."""
+        from .journal import write_json_atomic
+        os.makedirs(directory, exist_ok=True)
+        outputs = {
+            "command_library.json": {**self.library_meta(), "commands": self.load_commands()},
+            "sessions.json": self.load_sessions("library"),
+            "session_memory.json": self.load_sessions("recording"),
+            "memory_store.json": [{k: v for k, v in m.items() if k != "rowid"} for m in self.load_memories()]
+        }
+        paths = []
+        for filename, data in outputs.items():
+            path = os.path.join(directory, filename)
+            write_json_atomic(path, data)
+            paths.append(path)
+        return paths
+
+
+class SqliteLibraryStore:
+    """Drop-in for JournaledStore when the library lives in SQLite: every change is one row write."""
+    def __init__(self, db: Database, json_path: str = None):
+        self.db = db
+        self.json_path = json_path
+
+    def load(self, read_snapshot, source) -> Dict:
+        if self.json_path and self.db.command_count() == 0:
+            self.db.import_once("library", self.json_path)
+        return {"schema_version": 2, **self.db.library_meta(), "commands": self.db.load_commands()}
+
+    def set(self, key: str, value, meta: Optional[Dict] = None):
+        self.db.put_command(key, value, meta)
+
+    def delete(self, key: str, meta: Optional[Dict] = None):
+        self.db.delete_command(key)
+
+    def snapshot(self, doc: Dict):
+        self.db.replace_commands(doc["commands"], {k: v for k, v in doc.items() if k != "commands"})
+
+    def compact(self):
+        pass
+
+
+# One Database per file so every component writes through the same lock and writer connection
+_DATABASES = {}
+_db_lock = threading.Lock()
+
+def get_database(path: str = None) -> Database:
+    from . import config
+    path = os.path.abspath(path or config.DB_FILE)
+    with _db_lock:
+        if path not in _DATABASES:
+            _DATABASES[path] = Database(path)
+        return _DATABASES[path]
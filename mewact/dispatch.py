@@ -0,0 +1,105 @@
+
+import time
+import threading
+import contextlib
+from typing import Dict, List, Optional
+from colorama import Fore
+
+from .config import print
+from .compiler import CommandTemplate
+
+# --- TYPED COMMAND DISPATCH ---
+# Library entries are normalised once at load into "prepared" records that the
+# executor's handler table can run directly: hotkeys become key tuples, url and
+# file entries keep only their target, and sequences are flattened (nested
+# sequences inlined) into a precomputed list of (step, delay) pairs.
+
+COMMAND_TYPES = ("python", "shell", "hotkey", "url", "file", "sequence")
+DEFAULT_SEQUENCE_DELAY = 0.5
+
+
+def prepare_command(name: str, data: Dict) -> Optional[Dict]:
+    """Prepared record for one entry; None without a runnable payload, ValueError on bad params."""
+    ctype = data.get("type", "python")
+    rec = {"id": data.get("id"), "name": name, "type": ctype}
+    if ctype in ("python", "shell"):
+        rec["code"] = data.get("code", "")
+        rec["template"] = CommandTemplate(rec["code"], data.get("params"))
+    elif ctype == "hotkey":
+        keys = data.get("keys")
+        if not keys and "(" not in data.get("code", ""):
+            keys = [k.strip() for k in data.get("code", "").split("+") if k.strip()]
+        if not keys: return None
+        rec["keys"] = tuple(keys)
+    elif ctype == "url":
+        rec["target"] = data.get("url", "")
+        rec["template"] = CommandTemplate(rec["target"], data.get("params"))
+    elif ctype == "file":
+        rec["target"] = data.get("path", "")
+        rec["template"] = CommandTemplate(rec["target"], data.get("params"))
+    elif ctype == "sequence":
+        rec["step_ids"] = list(data.get("steps", []))
+        rec["delay"] = data.get("delay", DEFAULT_SEQUENCE_DELAY)
+    else:
+        return None
+    return rec
+
+
+def _flatten(rec: Dict, prepared: Dict, trail: tuple = ()) -> List:
+    """[(step_record, delay_after), ...] with nested sequences inlined; cycles and unknown ids are dropped."""
+    steps = []
+    for cid in rec["step_ids"]:
+        step = prepared.get(cid)
+        if step is None or cid in trail:
+            print(f"{Fore.YELLOW}[!] Sequence '{rec['name']}': skipping {'unknown' if step is None else 'recursive'} step {cid}")
+            continue
+        if step["type"] == "sequence":
+            inner = _flatten(step, prepared, trail + (rec["id"],))
+            if inner: inner[-1] = (inner[-1][0], rec["delay"])
+            steps.extend(inner)
+        else:
+            steps.append((step, rec["delay"]))
+    if steps: steps[-1] = (steps[-1][0], 0.0)  # No pause after the last step
+    return steps
+
+
+def prepare_library(commands: Dict) -> Dict[int, Dict]:
+    """{id: prepared record} for every entry with an id (first entry wins on duplicate ids)."""
+    prepared = {}
+    for name, data in commands.items():
+        if not isinstance(data, dict) or data.get("id") is None or data["id"] in prepared: continue
+        try: rec = prepare_command(name, data)
+        except ValueError as e:
+            print(f"{Fore.YELLOW}[!] Command '{name}': {e}")
+            continue
+        if rec: prepared[data["id"]] = rec
+        else: print(f"{Fore.YELLOW}[!] Command '{name}' has no runnable {data.get('type')} payload")
+    for rec in prepared.values():
+        if rec["type"] == "sequence":
+            rec["steps"] = _flatten(rec, prepared, (rec["id"],))
+    return prepared
+
+
+class LatencyStats:
+    """Per-type execution counters: count, total and worst-case milliseconds."""
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, ctype: str, seconds: float):
+        ms = seconds * 1000
+        with self._lock:
+            s = self._stats.setdefault(ctype, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            s["count"] += 1
+            s["total_ms"] += ms
+            s["max_ms"] = max(s["max_ms"], ms)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {t: {**s, "avg_ms": round(s["total_ms"] / s["count"], 3)} for t, s in self._stats.items()}
+
+    @contextlib.contextmanager
+    def timed(self, ctype: str):
+        start = time.perf_counter()
+        try: yield
+        finally: self.record(ctype, time.perf_counter() - start)
@@ -0,0 +1,162 @@
+
+import numpy as np
+import cv2
+from typing import List, Dict, Tuple
+
+# --- CLASSICAL-CV ELEMENT DETECTOR ---
+# OCR only sees text. Icons, checkboxes and icon-only buttons are found here
+# with edges + morphological grouping at reduced resolution. Results are cached
+# per capture region and only the tiles that changed since the last frame are
+# re-detected.
+
+def changed_tiles(prev: np.ndarray, curr: np.ndarray, tile: int = 32, threshold: int = 12) -> np.ndarray:
+    """Return a boolean (rows, cols) grid marking tiles whose pixels changed."""
+    diff = cv2.absdiff(prev, curr)
+    h, w = diff.shape[:2]
+    rows, cols = -(-h // tile), -(-w // tile)
+    padded = np.zeros((rows * tile, cols * tile), dtype=diff.dtype)
+    padded[:h, :w] = diff
+    tile_max = padded.reshape(rows, tile, cols, tile).max(axis=(1, 3))
+    return tile_max > threshold
+
+
+def changed_regions(prev: np.ndarray, curr: np.ndarray, tile: int = 32, threshold: int = 12, margin: int = 1) -> List[Tuple[int, int, int, int]]:
+    """
+    Group changed tiles into rectangles (x, y, w, h) in pixel coordinates of `curr`.
+    Returns the whole frame when shapes differ (resize / first frame).
+    """
+    h, w = curr.shape[:2]
+    if prev is None or prev.shape != curr.shape:
+        return [(0, 0, w, h)]
+
+    dirty = changed_tiles(prev, curr, tile, threshold)
+    if not dirty.any():
+        return []
+
+    # Grow the dirty mask so elements crossing a tile edge are re-detected whole
+    mask = dirty.astype(np.uint8)
+    if margin > 0:
+        k = 2 * margin + 1
+        mask = cv2.dilate(mask, np.ones((k, k), np.uint8))
+
+    n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    regions = []
+    for tx, ty, tw, th, _ in stats[1:n]:
+        x, y = int(tx) * tile, int(ty) * tile
+        regions.append((x, y, min(int(tw) * tile, w - x), min(int(th) * tile, h - y)))
+    return regions
+
+
+class ElementDetector:
+    """
+    Detect visually distinct UI elements (icons, buttons, checkboxes) in a BGRA/BGR frame.
+
+    detect() returns the same dict shape as OCR results ({"text", "x", "y"} centre
+    coordinates) plus the box size and kind="element", so both can live in one ui_data list.
+    """
+    def __init__(self, scale: float = 0.5, min_size: int = 10, max_size: int = 400,
+                 max_aspect: float = 8.0, tile: int = 32):
+        self.scale = scale
+        self.min_size = min_size      # Full-resolution pixels
+        self.max_size = max_size      # Anything bigger is a panel/window, not a control
+        self.max_aspect = max_aspect
+        self.tile = tile
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+        self._cache = {}  # region key -> {"small": gray frame, "boxes": Nx4 int array (small coords)}
+
+    def _to_small_gray(self, img: np.ndarray) -> np.ndarray:
+        if img.ndim == 3:
+            code = cv2.COLOR_BGRA2GRAY if img.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            img = cv2.cvtColor(img, code)
+        if self.scale != 1.0:
+            img = cv2.resize(img, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return img
+
+    def _detect_boxes(self, gray: np.ndarray) -> np.ndarray:
+        """Edges -> close -> connected components. Returns Nx4 (x, y, w, h) in `gray` coords."""
+        edges = cv2.Canny(gray, 50, 150)
+        grouped = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, self._kernel, iterations=2)
+        n, _, stats, _ = cv2.connectedComponentsWithStats(grouped, connectivity=8)
+        boxes = stats[1:n, :4]
+        if not len(boxes):
+            return boxes.reshape(0, 4)
+
+        w, h = boxes[:, 2], boxes[:, 3]
+        lo, hi = self.min_size * self.scale, self.max_size * self.scale
+        keep = (w >= lo) & (h >= lo) & (w <= hi) & (h <= hi)
+        keep &= (w <= h * self.max_aspect) & (h <= w * self.max_aspect)
+        return self._drop_nested(boxes[keep])
+
+    @staticmethod
+    def _drop_nested(boxes: np.ndarray) -> np.ndarray:
+        """Remove boxes fully contained in another box (icon glyph inside its button)."""
+        if len(boxes) < 2:
+            return boxes
+        x1, y1 = boxes[:, 0], boxes[:, 1]
+        x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+        inside = ((x1[:, None] >= x1[None, :]) & (y1[:, None] >= y1[None, :]) &
+                  (x2[:, None] <= x2[None, :]) & (y2[:, None] <= y2[None, :]))
+        np.fill_diagonal(inside, False)
+        return boxes[~inside.any(axis=1)]
+
+    @staticmethod
+    def _outside(boxes: np.ndarray, rect: Tuple[int, int, int, int]) -> np.ndarray:
+        """Mask of boxes that do not intersect rect."""
+        rx, ry, rw, rh = rect
+        return ((boxes[:, 0] + boxes[:, 2] <= rx) | (boxes[:, 0] >= rx + rw) |
+                (boxes[:, 1] + boxes[:, 3] <= ry) | (boxes[:, 1] >= ry + rh))
+
+    def detect(self, img: np.ndarray, offset_x: int = 0, offset_y: int = 0, key=None) -> List[Dict]:
+        """
+        Detect elements in `img`. When `key` identifies the capture region, the previous
+        frame for that key is diffed and only changed regions are re-detected.
+        """
+        small = self._to_small_gray(img)
+        cached = self._cache.get(key) if key is not None else None
+
+        if cached is None:
+            boxes = self._detect_boxes(small)
+        else:
+            regions = changed_regions(cached["small"], small, tile=self.tile)
+            boxes = cached["boxes"]
+            for rect in regions:
+                rx, ry, rw, rh = rect
+                fresh = self._detect_boxes(small[ry:ry + rh, rx:rx + rw])
+                fresh = fresh + np.array([rx, ry, 0, 0], dtype=fresh.dtype)
+                boxes = np.concatenate([boxes[self._outside(boxes, rect)], fresh])
+
+        if key is not None:
+            self._cache[key] = {"small": small, "boxes": boxes}
+
+        return self._to_elements(boxes, offset_x, offset_y)
+
+    def _to_elements(self, boxes: np.ndarray, offset_x: int, offset_y: int) -> List[Dict]:
+        full = np.round(boxes.astype(np.float32) / self.scale).astype(int)
+        elements = []
+        for x, y, w, h in full.tolist():
+            elements.append({
+                "text": "",
+                "x": x + w // 2 + offset_x,
+                "y": y + h // 2 + offset_y,
+                "w": w,
+                "h": h,
+                "kind": "element"
+            })
+        return elements
+
+    def invalidate(self, key=None):
+        """Drop cached frames (all regions if key is None)."""
+        if key is None: self._cache.clear()
+        else: self._cache.pop(key, None)
+
+
+def drop_text_overlaps(elements: List[Dict], text_items: List[Dict]) -> List[Dict]:
+    """Drop element boxes that contain an OCR text centre (already covered by OCR)."""
+    if not elements or not text_items:
+        return elements
+    pts = np.array([(t["x"], t["y"]) for t in text_items])
+    box = np.array([(e["x"] - e["w"] // 2, e["y"] - e["h"] // 2, e["w"], e["h"]) for e in elements])
+    x1, y1 = box[:, 0:1], box[:, 1:2]
+    hit = ((pts[None, :, 0] >= x1) & (pts[None, :, 0] <= x1 + box[:, 2:3]) &
+           (pts[None, :, 1] >= y1) & (pts[None, :, 1] <= y1 + box[:, 3:4]))
+    return [e for e, covered in zip(elements, hit.any(axis=1)) if not covered]
@@ -0,0 +1,140 @@
+
+import os
+import re
+import struct
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# --- EMBEDDING CACHE ---
+# Content-addressed store of embeddings so a text is sent to the model server
+# once per model. Keys are sha1(model + NUL + text). Each model gets its own
+# append-only file of fixed-size records (20-byte key + float32 vector) behind a
+# 16-byte header, so the key index is rebuilt on first use with one vectorised
+# read and a hit is a seek into a memory map. A small in-memory LRU sits in
+# front for the hottest texts (e.g. the same goal queried again and again).
+
+HEADER = struct.Struct("<8sII")   # magic, version, dim
+MAGIC = b"MEWEMB\x00\x00"
+
+
+def text_key(model: str, text: str) -> bytes:
+    return hashlib.sha1(f"{model}\0{text}".encode("utf-8")).digest()
+
+
+class _ModelFile:
+    def __init__(self, path: str):
+        self.path = path
+        self.dim = None
+        self.keys = {}        # key -> record number
+        self._map = None
+        self._records = 0
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+            with open(path, "rb") as f:
+                magic, _, dim = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC: raise ValueError(f"{path} is not an embedding cache")
+            self.dim = dim
+            records = (os.path.getsize(path) - HEADER.size) // self.dtype.itemsize
+            with open(path, "r+b") as f: f.truncate(HEADER.size + records * self.dtype.itemsize)  # Torn tail
+            keys = np.fromfile(path, self.dtype, count=records, offset=HEADER.size)["key"] if records else []
+            self.keys = {bytes(k): i for i, k in enumerate(keys)}
+            self._records = records
+
+    @property
+    def dtype(self):
+        return np.dtype([("key", "S20"), ("vec", "<f4", (self.dim,))])
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        i = self.keys.get(key)
+        if i is None: return None
+        if self._map is None or len(self._map) < self._records:
+            self._map = np.memmap(self.path, self.dtype, "r", offset=HEADER.size, shape=(self._records,))
+        return np.array(self._map[i]["vec"])
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray):
+        vectors = np.asarray(vectors, np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            with open(self.path, "wb") as f: f.write(HEADER.pack(MAGIC, 1, self.dim))
+        if vectors.shape[1] != self.dim: return
+        fresh = [i for i, k in enumerate(keys) if k not in self.keys]
+        if not fresh: return
+        records = np.zeros(len(fresh), self.dtype)
+        records["key"] = [keys[i] for i in fresh]
+        records["vec"] = vectors[fresh]
+        with open(self.path, "ab") as f: f.write(records.tobytes())
+        for n, i in enumerate(fresh): self.keys[keys[i]] = self._records + n
+        self._records += len(fresh)
+
+
+class EmbeddingCache:
+    def __init__(self, directory: str, lru_size: int = 1024):
+        self.directory = directory
+        self.lru_size = lru_size
+        self._lru = OrderedDict()     # key -> vector (list of floats)
+        self._files = {}              # model -> _ModelFile
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _file(self, model: str) -> _ModelFile:
+        f = self._files.get(model)
+        if f is None:
+            name = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+            f = self._files[model] = _ModelFile(os.path.join(self.directory, f"{name}.emb"))
+        return f
+
+    def _remember(self, key: bytes, vector: List[float]):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.lru_size: self._lru.popitem(last=False)
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        out = []
+        with self._lock:
+            f = self._file(model)
+            for text in texts:
+                key = text_key(model, text)
+                vector = self._lru.get(key)
+                if vector is None:
+                    found = f.get(key)
+                    if found is not None:
+                        vector = found.tolist()
+                        self._remember(key, vector)
+                else:
+                    self._lru.move_to_end(key)
+                if vector is None: self.misses += 1
+                else: self.hits += 1
+                out.append(vector)
+        return out
+
+    def put(self, model: str, text: str, vector):
+        self.put_many(model, [text], [vector])
+
+    def put_many(self, model: str, texts: List[str], vectors):
+        if not texts: return
+        keys = [text_key(model, t) for t in texts]
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)   # Created on first write; lookups never touch the disk layout
+            self._file(model).put_many(keys, np.asarray(vectors, np.float32))
+            for key, vector in zip(keys, vectors): self._remember(key, [float(x) for x in vector])
+
+    def stats(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses, "models": {m: len(f.keys) for m, f in self._files.items()}}
+
+
+# Shared per directory so every VectorMemory (and the training script) reuses one index
+_CACHES = {}
+_cache_lock = threading.Lock()
+
+def get_embedding_cache(directory: str = None) -> EmbeddingCache:
+    from . import config
+    directory = os.path.abspath(directory or config.EMBED_CACHE_DIR)
+    with _cache_lock:
+        if directory not in _CACHES:
+            _CACHES[directory] = EmbeddingCache(directory)
+        return _CACHES[directory]
@@ -1,52 +1,147 @@
 
+import os
 import sys
 import contextlib
 import io
 import time
+import functools
 import subprocess
 import traceback
+import webbrowser
 import pyautogui
 import ctypes
 from colorama import Fore
-from .config import print, AUTO_ROLLBACK_ENABLED, AUTO_ROLLBACK_CHAT
+from .config import print, AUTO_ROLLBACK_ENABLED, AUTO_ROLLBACK_CHAT, PERSISTENT_SHELL
+from .shell import get_shell_service, PersistentShell
+from .compiler import render, env_name, CommandTemplate
+from .dispatch import LatencyStats
 
 # --- 5. EXECUTION ENGINE ---
 class ActionExecutor:
     def __init__(self, library_manager, session_manager=None):
         self.library = library_manager
         self.session_manager = session_manager
+        self.shell_session = PersistentShell() if PERSISTENT_SHELL else None  # Started on first use
         self.locals = {
             "pyautogui": pyautogui,
             "ctypes": ctypes,
             "time": time,
-            "subprocess": subprocess
+            "subprocess": subprocess,
+            "run_shell": self._exec_shell
         }
+        # Native handler per library type. Each binds a prepared record (LibraryManager.prepared)
+        # into a callable taking the call's params; bound callables are cached per record.
+        self.handlers = {
+            "python": self._bind_python,
+            "shell": lambda rec: functools.partial(self._exec_shell_template, rec["template"]),
+            "hotkey": lambda rec: lambda params: self._exec_keys(rec["keys"]),
+            "url": lambda rec: functools.partial(self._run_url, rec),
+            "file": lambda rec: functools.partial(self._run_file, rec),
+            "sequence": lambda rec: functools.partial(self._run_sequence, rec)
+        }
+        self._bound = {}  # id -> (record, callable)
+        self.latency = LatencyStats()
 
-    def execute(self, code: str, cmd_type: str = "python", cmd_data=None) -> bool:
+    def execute(self, code: str, cmd_type: str = "python", cmd_data=None, params=None) -> bool:
+        """
+        Run a command. Library entries (cmd_data with a known id) go through the typed
+        dispatch table; raw code falls back to the python/shell/hotkey paths.
+        `params` fills the command's placeholders ({"VAR": "..."}) without editing its source.
+        """
+        if cmd_data and cmd_data.get("id") in self.library.prepared:
+            return self.execute_command(cmd_data["id"], params)
         if not code: return False
         
         try:
             print(f"{Fore.CYAN}[+] Executing ({cmd_type}): {code[:60]}...")
             
-            if cmd_type == "python":
-                return self._exec_python(code)
-            elif cmd_type == "shell":
-                return self._exec_shell(code)
-            elif cmd_type == "hotkey":
-                return self._exec_hotkey(code)
-            elif cmd_type == "sequence":
-                # Only supported if planner expands it
-                print(f"{Fore.RED}[!] Sequence execution should be expanded by planner.")
-                return False
-            else:
-                print(f"{Fore.RED}[!] Unknown command type: {cmd_type}")
-                return False
+            with self.latency.timed(cmd_type):
+                if cmd_type == "python":
+                    return self._exec_python(code, params)
+                elif cmd_type == "shell":
+                    return self._exec_shell_template(CommandTemplate(code), params) if params else self._exec_shell(code)
+                elif cmd_type == "hotkey":
+                    return self._exec_hotkey(code)
+                else:
+                    print(f"{Fore.RED}[!] Cannot run raw {cmd_type} code; execute it by command id.")
+                    return False
+        except Exception as e:
+            print(f"{Fore.RED}[!] Execution Error: {e}")
+            return False
+
+    def execute_command(self, cmd_id, params=None) -> bool:
+        """Run a library command by id through its prepared record."""
+        try: rec = self.library.prepared.get(int(cmd_id))
+        except (TypeError, ValueError): rec = None
+        if not rec:
+            print(f"{Fore.RED}[!] Command ID {cmd_id} not found")
+            return False
+        print(f"{Fore.CYAN}[+] Executing #{rec['id']} '{rec['name']}' ({rec['type']})")
+        return self._dispatch(rec, params)
+
+    def _dispatch(self, rec: dict, params=None) -> bool:
+        try:
+            bound = self._bound.get(rec["id"])
+            if bound is None or bound[0] is not rec:  # First use, or the entry was replaced
+                bound = self._bound[rec["id"]] = (rec, self.handlers[rec["type"]](rec))
+            with self.latency.timed(rec["type"]):
+                return bound[1](params)
         except Exception as e:
             print(f"{Fore.RED}[!] Execution Error: {e}")
             return False
 
-    def _exec_python(self, code: str) -> bool:
+    def _run_url(self, rec: dict, params=None) -> bool:
+        url = render(rec["target"], rec["template"].bind(params))
+        if not url:
+            print(f"{Fore.RED}URL error: No URL specified")
+            return False
+        webbrowser.open(url)
+        print(f"{Fore.GREEN}RESULT: Opened {url}")
+        return True
+
+    def _run_file(self, rec: dict, params=None) -> bool:
+        path = render(rec["target"], rec["template"].bind(params))
+        if not path:
+            print(f"{Fore.RED}File error: No path specified")
+            return False
+        if sys.platform == "win32":
+            os.startfile(path)
+        else:
+            subprocess.Popen(["open" if sys.platform == "darwin" else "xdg-open", path])
+        print(f"{Fore.GREEN}RESULT: Opened {path}")
+        return True
+
+    def _run_sequence(self, rec: dict, params=None) -> bool:
+        steps = rec.get("steps", [])
+        if not steps:
+            print(f"{Fore.RED}Sequence error: No steps specified")
+            return False
+        for i, (step, delay) in enumerate(steps):
+            print(f"{Fore.CYAN}  Sequence step {i+1}/{len(steps)}: #{step['id']} {step['name']}")
+            if not self._dispatch(step, params): return False
+            if delay: time.sleep(delay)
+        print(f"{Fore.GREEN}RESULT: Sequence complete ({len(steps)} steps)")
+        return True
+
+    def _bind_python(self, rec: dict):
+        compiled = self.library.code_cache.get(rec["code"])
+        template = rec["template"]
+        return lambda params: self._exec_compiled(compiled, template.bind(params))
+
+    def _exec_python(self, code: str, params=None) -> bool:
         """Execute safe python subset"""
+        try:
+            # Library code is precompiled at load; anything else is compiled once and cached
+            compiled = self.library.code_cache.get(code)
+            # Same typed binding as dispatch: library sources keep their declared parameter types
+            values = compiled["template"].bind(params)
+        except (SyntaxError, ValueError) as e:
+            print(f"{Fore.RED}[!] PyError: {e}")
+            return False
+        return self._exec_compiled(compiled, values)
+
+    def _exec_compiled(self, compiled: dict, values: dict) -> bool:
+        bound = []
         try:
             # Capture stdout/stderr to avoid pollution? 
             # In MCP mode, print already goes to stderr. So direct exec is fine.
@@ -57,28 +152,45 @@ class ActionExecutor:
             
             # self.locals['print'] = print # Inject safe print
             
+            # Placeholders are plain variables in the compiled code; bind their values for this run
+            for name, value in values.items():
+                self.locals[f"__{name}__"] = value
+                bound.append(f"__{name}__")
+
             # Simple exec since we handle safety at module level or trust the library code
-            exec(code, self.locals, self.locals)
+            exec(compiled["code"], self.locals, self.locals)
             return True
         except Exception as e:
             print(f"{Fore.RED}[!] PyError: {e}")
             traceback.print_exc()
             return False
+        finally:
+            for name in bound: self.locals.pop(name, None)
+
+    def _shell_runner(self):
+        return self.shell_session if self.shell_session else get_shell_service()
 
-    def _exec_shell(self, code: str) -> bool:
-        """Execute shell/PowerShell command"""
-        result = subprocess.run(code, shell=True, capture_output=True, text=True)
-        if result.stdout:
-            print(f"{Fore.GREEN}OUTPUT: {result.stdout.strip()}")
-        if result.stderr:
-            print(f"{Fore.YELLOW}STDERR: {result.stderr.strip()}")
-        print(f"{Fore.GREEN}RESULT: Exit code {result.returncode}")
-        return result.returncode == 0
+    def _exec_shell_template(self, template: CommandTemplate, params=None) -> bool:
+        """Parameter values travel as environment variables, never as shell source."""
+        env = {env_name(name): str(value) for name, value in template.bind(params).items()}
+        return self._exec_shell(template.shell_source(self._shell_runner().var_ref), env=env)
+
+    def _exec_shell(self, code: str, env=None) -> bool:
+        """Execute shell/PowerShell command (streamed, time-bounded, output capped)"""
+        def echo(stream, line):
+            color = Fore.GREEN if stream == "stdout" else Fore.YELLOW
+            print(f"{color}{line.rstrip()}")
+
+        result = self._shell_runner().run(code, on_output=echo, env=env)
+        print(f"{Fore.GREEN}RESULT: Exit code {result['returncode']}" + (" (timed out)" if result["timed_out"] else ""))
+        return result["returncode"] == 0
 
     def _exec_hotkey(self, code: str) -> bool:
         """Execute hotkey string (e.g. 'ctrl+c')"""
+        return self._exec_keys(code.split('+'))
+
+    def _exec_keys(self, keys) -> bool:
         try:
-            keys = code.split('+')
             pyautogui.hotkey(*keys)
             return True
         except Exception as e:
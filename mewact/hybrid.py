@@ -0,0 +1,94 @@
+
+import threading
+import numpy as np
+from typing import Dict, List, Optional
+
+# --- HYBRID SKILL RETRIEVAL (BM25 + VECTORS, RECIPROCAL-RANK FUSION) ---
+# The lexical side is the library's CommandIndex (BM25). The vector side is
+# VectorMemory, whose trained items carry the command name in metadata["id"]
+# (training.py). Each side produces a ranked list of up to `depth` commands.
+# The two lists are fused by reciprocal rank:
+#   score = sum over lists of weight / (rrf_k + rank)
+# so neither side's raw score scale dominates. Filters ({"category": ..., "type": ...},
+# a value or a collection of values) become a boolean mask over index slots. The
+# mask is cached per library version and applied inside the BM25 scoring and to
+# the vector hits. Both indexes are in memory, so a query costs one sparse BM25
+# pass, one embedding (cached or offline) and one matrix-vector product.
+# With only one side available (no memory, no embedding), hits keep that side's
+# own score and order.
+
+FILTER_FIELDS = ("category", "type")
+
+
+class HybridRetriever:
+    def __init__(self, library, memory=None, rrf_k: int = 60, depth: int = 50,
+                 lexical_weight: float = 1.0, vector_weight: float = 1.0):
+        self.library = library       # LibraryManager (CommandIndex at library.index)
+        self.memory = memory         # VectorMemory or None
+        self.rrf_k = rrf_k
+        self.depth = depth
+        self.weights = {"lexical": lexical_weight, "vector": vector_weight}
+        self._masks = {}             # (filters, library version) -> slot mask
+        self._lock = threading.Lock()
+
+    def _mask(self, filters: Optional[Dict]) -> Optional[np.ndarray]:
+        if not filters: return None
+        wanted = {}
+        for field, value in filters.items():
+            if field not in FILTER_FIELDS: raise ValueError(f"Unknown filter field: {field}")
+            wanted[field] = frozenset([value] if isinstance(value, str) else value)
+        key = (tuple(sorted(wanted.items())), self.library.version)
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is None:
+                cmds = self.library.library["commands"]
+                def keep(name, category):
+                    data = cmds.get(name) or {}
+                    return (("category" not in wanted or category in wanted["category"])
+                            and ("type" not in wanted or data.get("type", "python") in wanted["type"]))
+                mask = self.library.index.mask(keep)
+                self._masks = {k: v for k, v in self._masks.items() if k[1] == self.library.version}
+                self._masks[key] = mask
+        return mask
+
+    def _vector_hits(self, query: str, query_vec, mask: Optional[np.ndarray]) -> List[Dict]:
+        if self.memory is None: return []
+        if query_vec is None: query_vec = self.memory.get_embedding(query)
+        if query_vec is None: return []
+        index, cmds = self.library.index, self.library.library["commands"]
+        hits, seen = [], set()
+        # Overfetch: stale rows of retrained commands and filtered-out commands are dropped below
+        for item, score in self.memory.search_vector(query_vec, self.depth * 2 if mask is None else self.depth * 4):
+            name = (item.get("metadata") or {}).get("id")
+            slot = index.slot(name) if isinstance(name, str) else None
+            if slot is None or name in seen or name not in cmds: continue
+            if mask is not None and not mask[slot]: continue
+            seen.add(name)
+            hits.append({"name": name, "score": round(score, 4)})
+            if len(hits) == self.depth: break
+        return hits
+
+    def search(self, query: str, k: int = 5, filters: Dict = None, query_vec=None) -> List[Dict]:
+        """
+        Ranked commands for `query`:
+        [{"name", "score", "lexical": {"rank", "score"} | None, "vector": {"rank", "score"} | None, "category", "type"}]
+        `query_vec` skips the embedding call when the caller already has one.
+        """
+        mask = self._mask(filters)
+        sides = {"lexical": self.library.index.ranked(query, self.depth, allowed=mask)[0],
+                 "vector": self._vector_hits(query, query_vec, mask)}
+        live = [side for side, hits in sides.items() if hits]
+        fused = {}
+        for side in live:
+            for rank, hit in enumerate(sides[side], 1):
+                entry = fused.setdefault(hit["name"], {"name": hit["name"], "score": 0.0, "lexical": None, "vector": None})
+                entry[side] = {"rank": rank, "score": hit["score"]}
+                entry["score"] += (self.weights[side] / (self.rrf_k + rank)) if len(live) > 1 else hit["score"]
+        # Python's sort is stable: equal fused scores keep lexical order, then vector order
+        ranked = sorted(fused.values(), key=lambda e: -e["score"])[:k]
+        cmds = self.library.library["commands"]
+        for entry in ranked:
+            entry["score"] = round(entry["score"], 6)
+            entry["category"] = self.library.index.category(entry["name"])
+            entry["type"] = (cmds.get(entry["name"]) or {}).get("type", "python")
+        return ranked
@@ -0,0 +1,141 @@
+
+import os
+import json
+import tempfile
+import threading
+from typing import Callable, Dict, Optional
+from colorama import Fore
+
+from .config import print
+
+# --- JOURNALED JSON STORE ---
+# A JSON document (e.g. the command library) is kept as a snapshot file plus an
+# append-only journal of changes to one of its collections. Each change costs a
+# single line appended to `<path>.journal`; loading replays the journal on top of
+# the snapshot. Once enough records pile up the journal is folded into a new
+# snapshot on a background thread. Snapshots are written to a temp file, fsynced
+# and renamed over the old one, so a crash never leaves a half-written library.
+# Records are idempotent (set/delete a key, set meta fields), so replaying a
+# record that the snapshot already contains is harmless.
+
+
+def write_json_atomic(path: str, data, indent: int = 4):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+
+
+class JournaledStore:
+    def __init__(self, path: str, collection: str = "commands", compact_every: int = None):
+        from . import config
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.collection = collection
+        self.compact_every = compact_every if compact_every is not None else config.JOURNAL_COMPACT_EVERY
+        self._source = None        # () -> document to snapshot; set by load()
+        self._pending = 0          # Records in the journal
+        self._compacting = False
+        self._lock = threading.Lock()         # Journal file appends
+        self._write_lock = threading.Lock()   # Snapshot writers (compaction, snapshot())
+
+    def load(self, read_snapshot: Callable[[str], Dict], source: Callable[[], Dict]) -> Dict:
+        """Snapshot (via `read_snapshot`) with the journal replayed on top. `source` returns the live document for compaction."""
+        self._source = source
+        doc = read_snapshot(self.path)
+        self._pending = self._replay(doc)
+        if self._pending:
+            print(f"{Fore.CYAN}[*] Replayed {self._pending} journal record(s) for {os.path.basename(self.path)}")
+        return doc
+
+    def _replay(self, doc: Dict) -> int:
+        if not os.path.exists(self.journal_path): return 0
+        count, good = 0, 0
+        with open(self.journal_path, "rb") as f:
+            for n, line in enumerate(f, 1):
+                try:
+                    if line.strip():
+                        if not line.endswith(b"\n"): raise ValueError("incomplete record")
+                        self._apply(doc, json.loads(line))
+                        count += 1
+                except ValueError:
+                    # A torn final line from a crash mid-append; cut it off so later appends start clean
+                    print(f"{Fore.YELLOW}[!] Dropping unreadable journal record at line {n}")
+                    break
+                good += len(line)
+        if good < os.path.getsize(self.journal_path):
+            with open(self.journal_path, "r+b") as f: f.truncate(good)
+        return count
+
+    def _apply(self, doc: Dict, rec: Dict):
+        items = doc.setdefault(self.collection, {})
+        if rec.get("op") == "set":
+            items[rec["key"]] = rec["value"]
+        elif rec.get("op") == "del":
+            items.pop(rec["key"], None)
+        doc.update(rec.get("meta") or {})
+
+    def _append(self, rec: Dict):
+        line = json.dumps(rec) + "\n"
+        with self._lock:
+            with open(self.journal_path, "ab") as f:
+                f.write(line.encode("utf-8"))
+            self._pending += 1
+            due = self._pending >= self.compact_every and not self._compacting
+            if due: self._compacting = True
+        if due:
+            threading.Thread(target=self._compact, daemon=True).start()
+
+    def set(self, key: str, value, meta: Optional[Dict] = None):
+        self._append({"op": "set", "key": key, "value": value, "meta": meta or {}})
+
+    def delete(self, key: str, meta: Optional[Dict] = None):
+        self._append({"op": "del", "key": key, "meta": meta or {}})
+
+    def snapshot(self, doc: Dict):
+        """Write `doc` as the new snapshot and empty the journal (synchronous)."""
+        with self._write_lock, self._lock:
+            write_json_atomic(self.path, doc)
+            if os.path.exists(self.journal_path): os.remove(self.journal_path)
+            self._pending = 0
+
+    def _compact(self):
+        try:
+            with self._write_lock:
+                with self._lock:
+                    # Everything up to `offset` is in the copy; later records are kept and replayed over it
+                    offset = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+                doc = self._source()
+                write_json_atomic(self.path, doc)
+                with self._lock:
+                    tail = b""
+                    if os.path.exists(self.journal_path):
+                        with open(self.journal_path, "rb") as f:
+                            f.seek(offset)
+                            tail = f.read()
+                    if tail:
+                        fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".journal", dir=os.path.dirname(os.path.abspath(self.journal_path)))
+                        with os.fdopen(fd, "wb") as f: f.write(tail)
+                        os.replace(tmp, self.journal_path)
+                    elif os.path.exists(self.journal_path):
+                        os.remove(self.journal_path)
+                    self._pending = tail.count(b"\n")
+        except Exception as e:
+            print(f"{Fore.RED}[!] Journal compaction failed: {e}")
+        finally:
+            self._compacting = False
+
+    def compact(self):
+        """Fold the journal into the snapshot now (blocks until done)."""
+        with self._lock:
+            if self._compacting: return
+            self._compacting = True
+        self._compact()
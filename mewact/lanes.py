@@ -0,0 +1,89 @@
+
+import asyncio
+import contextlib
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Tuple
+
+# --- CONCURRENCY LANES ---
+# Tools are async and run their blocking bodies on bounded worker pools:
+#   observe: read-only screen/library queries, run concurrently with each other
+#   action:  input injection (mouse/keyboard/commands), serialised on one worker
+#   work:    long blocking jobs that neither read nor drive the screen (shell, VLM)
+# Observations and actions share a reader/writer lock so a capture never lands
+# in the middle of an action, while captures never wait on each other.
+
+
+class RWLock:
+    """Many concurrent readers or one writer. Waiting writers block new readers."""
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextlib.contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers: self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+def build_lanes(observe_workers: int, work_workers: int) -> Dict[str, Tuple[ThreadPoolExecutor, Callable]]:
+    """lane name -> (worker pool, guard context manager factory)."""
+    screen = RWLock()
+    return {
+        "observe": (ThreadPoolExecutor(observe_workers, thread_name_prefix="mewact-observe"), screen.read),
+        "action": (ThreadPoolExecutor(1, thread_name_prefix="mewact-action"), screen.write),
+        "work": (ThreadPoolExecutor(work_workers, thread_name_prefix="mewact-work"), contextlib.nullcontext),
+    }
+
+
+def lane(lanes: Dict, name: str, timeout: float, on_timeout=None):
+    """
+    Turn a blocking tool body into an async tool running on lane `name` with a deadline.
+    A timed-out call returns `on_timeout` (default: an error in the tool's return shape);
+    the worker thread itself cannot be interrupted and finishes in the background.
+    """
+    pool, guard = lanes[name]
+
+    def decorator(fn):
+        def locked(*args, **kwargs):
+            with guard():
+                return fn(*args, **kwargs)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            job = loop.run_in_executor(pool, functools.partial(locked, *args, **kwargs))
+            try:
+                return await asyncio.wait_for(job, timeout)
+            except asyncio.TimeoutError:
+                if on_timeout is not None: return on_timeout
+                msg = f"Error: {fn.__name__} timed out after {timeout}s"
+                return {"error": msg} if fn.__annotations__.get("return") is dict else msg
+        return wrapper
+    return decorator
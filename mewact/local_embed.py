@@ -0,0 +1,166 @@
+
+import os
+import re
+import zlib
+import threading
+import numpy as np
+from typing import List, Optional
+from colorama import Fore
+
+from .config import print
+from .vector_index import normalize
+
+# --- OFFLINE EMBEDDER ---
+# Needs no network or model server. Each text is reduced to hashed features:
+#   character 3/4/5-grams of " lowercased text " (typos, inflections, word parts)
+#   whole words (exact vocabulary)
+# The features fall into `buckets` signed hash buckets. Each bucket is weighted by
+# sublinear TF (1 + log tf) times IDF, and the weighted buckets are projected to
+# `dim` floats through a fixed random Gaussian matrix. The matrix is seeded, so
+# every process builds the same one and stored vectors stay comparable. The
+# n-gram hashes for a whole batch come from one rolling polynomial over the
+# concatenated UTF-8 bytes, and the projection is one gather plus a segmented
+# sum. Document frequencies are learned from the texts that are stored
+# (observe()) until the IDF is fitted: after `fit_docs` texts, or when training
+# has counted the whole library (freeze()). From then on the IDF never changes,
+# so stored vectors and new queries are weighted alike. The counts are kept in
+# a small .npy file, written every SAVE_EVERY texts and when the IDF freezes.
+# A query costs well under a millisecond.
+
+NGRAMS = (3, 4, 5)
+WORD = re.compile(r"\w+")
+MIX = np.uint64(0x9E3779B97F4A7C15)     # Fibonacci hashing multiplier
+MASK = np.uint64(0xFFFFFFFFFFFFFFFF)
+SAVE_EVERY = 64                          # Observed texts between state file writes
+
+
+class LocalEmbedder:
+    def __init__(self, dim: int = 256, buckets: int = 16384, state_file: str = None, seed: int = 0,
+                 fit_docs: int = 500):
+        if buckets & (buckets - 1): raise ValueError("buckets must be a power of two")
+        self.dim = dim
+        self.buckets = buckets
+        self.state_file = state_file
+        self.seed = seed
+        self.fit_docs = fit_docs
+        self._projection = None
+        self._lock = threading.Lock()
+        self.docs = 0
+        self.df = np.zeros(buckets, np.float64)
+        self.frozen = False
+        self._saved_docs = 0
+        if state_file and os.path.exists(state_file):
+            try:
+                state = np.load(state_file)
+                if len(state) == buckets + 2:    # docs, frozen flag, df
+                    self.docs, self.frozen, self.df = int(state[0]), bool(state[1]), state[2:]
+                elif len(state) == buckets + 1:  # Older state without the flag
+                    self.docs, self.df = int(state[0]), state[1:]
+                self._saved_docs = self.docs
+            except Exception as e:
+                print(f"{Fore.YELLOW}[!] Ignoring unreadable embedder state {state_file}: {e}")
+
+    @property
+    def projection(self) -> np.ndarray:
+        if self._projection is None:
+            rng = np.random.default_rng(self.seed)
+            self._projection = (rng.standard_normal((self.buckets, self.dim), dtype=np.float32) / np.sqrt(self.dim))
+        return self._projection
+
+    def _features(self, texts: List[str]):
+        """(doc ids, bucket ids, sign bits) of every feature in the batch."""
+        padded = [f" {t.lower()} ".encode("utf-8") for t in texts]
+        raw = np.frombuffer(b"".join(padded), np.uint8).astype(np.uint64)
+        lengths = np.array([len(p) for p in padded], np.int64)
+        ends = np.cumsum(lengths)
+        doc_of = np.repeat(np.arange(len(texts)), lengths)
+        docs, hashes = [], []
+        for n in NGRAMS:
+            if len(raw) < n: continue
+            h = np.zeros(len(raw) - n + 1, np.uint64)
+            for j in range(n):   # Polynomial hash of raw[i:i+n] for every i at once
+                h = (h * np.uint64(257) + raw[j:len(raw) - n + 1 + j] + np.uint64(1)) & MASK
+            starts = np.arange(len(h))
+            valid = starts + n <= ends[doc_of[:len(h)]]   # n-gram must not cross into the next text
+            docs.append(doc_of[:len(h)][valid])
+            hashes.append(h[valid] ^ np.uint64(n))
+        words = [(i, zlib.crc32(w.encode("utf-8"))) for i, t in enumerate(texts) for w in WORD.findall(t.lower())]
+        if words:
+            docs.append(np.array([i for i, _ in words], np.int64))
+            hashes.append(np.array([h for _, h in words], np.uint64) * np.uint64(0x100000001B3) & MASK)
+        if not docs: return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, np.int64)
+        mixed = (np.concatenate(hashes) * MIX) & MASK
+        shift = np.uint64(64 - int(np.log2(self.buckets)))
+        bucket = (mixed >> shift).astype(np.int64)
+        negative = (mixed & np.uint64(1)).astype(np.int64)
+        return np.concatenate(docs).astype(np.int64), bucket, negative
+
+    def _counts(self, texts: List[str]):
+        """Unique (doc, bucket, sign bit) features with their term counts, sorted by doc."""
+        docs, bucket, negative = self._features(texts)
+        keys, tf = np.unique((docs * self.buckets + bucket) * 2 + negative, return_counts=True)
+        return (keys >> 1) // self.buckets, (keys >> 1) % self.buckets, keys & 1, tf
+
+    def observe(self, texts: List[str]):
+        """Count document frequencies of stored texts (the IDF side of TF-IDF) until the IDF is fitted."""
+        texts = [t for t in texts if t]
+        if not texts or self.frozen: return
+        docs, bucket, _, _ = self._counts(texts)
+        pairs = np.unique(docs * self.buckets + bucket)
+        with self._lock:
+            if self.frozen: return
+            np.add.at(self.df, pairs % self.buckets, 1)
+            self.docs += len(texts)
+            if self.docs >= self.fit_docs: self.frozen = True
+            if self.frozen or self.docs - self._saved_docs >= SAVE_EVERY: self._save()
+
+    def freeze(self):
+        """Fix the IDF as it is now (e.g. after training counted the whole library)."""
+        with self._lock:
+            if self.frozen: return
+            self.frozen = True
+            self._save()
+
+    def save(self):
+        """Write counts not yet on disk."""
+        with self._lock:
+            if self.docs != self._saved_docs: self._save()
+
+    def _save(self):
+        if not self.state_file: return
+        tmp = self.state_file + ".tmp.npy"
+        np.save(tmp, np.concatenate(([self.docs, float(self.frozen)], self.df)))
+        os.replace(tmp, self.state_file)
+        self._saved_docs = self.docs
+
+    def embed(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """One vector per text (None for texts without any feature)."""
+        if not texts: return []
+        docs, rows, negative, tf = self._counts(texts)
+        if not len(docs): return [None] * len(texts)
+        with self._lock:
+            idf = np.log((1.0 + self.docs) / (1.0 + self.df[rows])) + 1.0
+        weight = ((1.0 + np.log(tf)) * idf * (1 - 2 * negative)).astype(np.float32)
+        contrib = self.projection[rows] * weight[:, None]
+        # docs is sorted (np.unique), so each text's features are one contiguous run
+        present, starts = np.unique(docs, return_index=True)
+        out = np.zeros((len(texts), self.dim), np.float32)
+        out[present] = np.add.reduceat(contrib, starts, axis=0)
+        out = normalize(out)
+        found = np.zeros(len(texts), bool)
+        found[present] = True
+        return [row.tolist() if ok else None for row, ok in zip(out, found)]
+
+
+_EMBEDDERS = {}
+_embedder_lock = threading.Lock()
+
+def get_local_embedder() -> LocalEmbedder:
+    """Shared per configuration so every VectorMemory learns one set of document frequencies."""
+    from . import config
+    key = (config.LOCAL_EMBED_DIM, config.LOCAL_EMBED_STATE)
+    with _embedder_lock:
+        if key not in _EMBEDDERS:
+            _EMBEDDERS[key] = LocalEmbedder(config.LOCAL_EMBED_DIM, state_file=config.LOCAL_EMBED_STATE or None,
+                                            fit_docs=config.LOCAL_EMBED_FIT_DOCS)
+        return _EMBEDDERS[key]
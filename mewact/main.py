@@ -7,6 +7,7 @@ from . import config
 from .memory import LibraryManager
 from .perception import WindowCapture, PerceptionEngine
 from .planning import CognitivePlanner
+from .memory_engine import VectorMemory
 from .execution import ActionExecutor
 from .session import SessionManager
 from .sentinel import PassiveSentinel, IdleWatchdog
@@ -111,7 +112,7 @@ def main():
     global PERCEPTION_ENGINE
     PERCEPTION_ENGINE = p
     
-    b = CognitivePlanner(lib_mgr) 
+    b = CognitivePlanner(lib_mgr, memory=VectorMemory())  # One memory for retrieval and plan_goal
     session_mgr = SessionManager()
     h = ActionExecutor(lib_mgr, session_manager=session_mgr)
     
@@ -3,11 +3,18 @@ import json
 import os
 import re
 import time
-import random
+import threading
 from typing import Dict, Optional
 from colorama import Fore
 
 from .config import print, VAR_PATTERN, LIBRARY_FILE, SESSION_FILE
+from . import config
+from .compiler import CodeCache
+from .dispatch import prepare_library, prepare_command
+from .retrieval import CommandIndex
+from .journal import JournaledStore, write_json_atomic
+
+LEARNED_ID_START = 1000  # Lowest id handed to commands learned at run time
 
 # --- GLOBAL VARIABLE STORE ---
 class VariableStore:
@@ -58,14 +65,30 @@ class LibraryManager:
     def __init__(self, lib_path=None):
         self.lib_path = lib_path if lib_path else LIBRARY_FILE
         self.sess_path = SESSION_FILE
-        self.library = self._load_json(self.lib_path)
+        if config.STORAGE_BACKEND == "sqlite":
+            from .db import get_database, SqliteLibraryStore
+            self.db = get_database()
+            self.store = SqliteLibraryStore(self.db, self.lib_path)
+        else:
+            # Learned commands are appended to a journal and folded into the library file in the background
+            self.db = None
+            self.store = JournaledStore(self.lib_path)
+        self.library = self.store.load(self._load_json, self._snapshot_source)
         
         # Ensure 'commands' key exists
         if "commands" not in self.library:
             self.library = {"schema_version": 2, "commands": {}}
             self._seed_defaults()
+
+        self._lock = threading.RLock()
+        self.code_cache = CodeCache()
+        self._build_indexes()
             
-        self.sessions = self._load_json(self.sess_path)
+        if self.db:
+            self.db.import_once("sessions", self.sess_path)
+            self.sessions = self.db.load_sessions("library")
+        else:
+            self.sessions = self._load_json(self.sess_path)
         self.is_recording = False
         self.current_session_name = ""
         self.current_session_data = []
@@ -83,6 +106,63 @@ class LibraryManager:
             self.library["commands"][k] = {"type": "python", "code": v["code"], "id": v["id"], "timestamp": time.time()}
         self._save_lib()
 
+    def _build_indexes(self):
+        """(Re)derive every lookup structure from self.library["commands"]."""
+        self.version = getattr(self, "version", 0) + 1  # Bumped on every change; planner caches key on it
+        cmds = self.library["commands"]
+        # Compile python commands once; broken entries are reported here instead of at run time
+        self.code_cache.compile_library(cmds)
+        # Typed dispatch records by id (hotkey keys, url/file targets, flattened sequences)
+        self.prepared = prepare_library(cmds)
+        # BM25 index over names, descriptions and section categories (planner Layer 2, list_commands)
+        self.index = CommandIndex()
+        self.index.build(cmds)
+        # id -> name; on duplicate ids the first entry wins (same as the old linear scan)
+        self.by_id = {}
+        for name, data in cmds.items():
+            if isinstance(data, dict) and data.get("id") is not None:
+                self.by_id.setdefault(data["id"], name)
+        # Learned commands get ids above everything ever issued; the counter is persisted with the library
+        self.library["next_id"] = max(self.library.get("next_id", 0), max(self.by_id, default=0) + 1, LEARNED_ID_START)
+
+    def allocate_id(self) -> int:
+        with self._lock:
+            new_id = self.library["next_id"]
+            self.library["next_id"] = new_id + 1
+            return new_id
+
+    def reload(self):
+        """Re-read the library file (and its journal) and rebuild all indexes."""
+        with self._lock:
+            library = self.store.load(self._load_json, self._snapshot_source)
+            if "commands" in library:
+                library["next_id"] = max(library.get("next_id", 0), self.library.get("next_id", 0))
+                self.library = library
+            self._build_indexes()
+
+    def get_command(self, name: str) -> Optional[Dict]:
+        cmd = self.library["commands"].get(name.lower())
+        return cmd if isinstance(cmd, dict) else None
+
+    def delete_entry(self, command: str) -> bool:
+        name = command.lower()
+        with self._lock:
+            cmd = self.get_command(name)
+            if cmd is None: return False
+            del self.library["commands"][name]
+            cid = cmd.get("id")
+            if self.by_id.get(cid) == name:
+                # Another entry may share the id (aliases); it takes over the lookup
+                self.by_id.pop(cid)
+                alias = next((n for n, d in self.library["commands"].items() if isinstance(d, dict) and d.get("id") == cid), None)
+                if alias: self.by_id[cid] = alias
+                # Sequences may reference the id, so re-flatten
+                self.prepared = prepare_library(self.library["commands"])
+            self.index.remove(name)
+            self.version += 1
+            self.store.delete(name)
+            return True
+
     def _load_json(self, path) -> Dict:
         if not os.path.exists(path): return {"schema_version": 2, "commands": {}}
         try:
@@ -97,25 +177,39 @@ class LibraryManager:
             print(f"{Fore.YELLOW}[!] Warning: Could not load {path}: {e}")
             return {"schema_version": 2, "commands": {}}
 
+    def _snapshot_source(self) -> Dict:
+        # Entries are replaced, never mutated in place, so a shallow copy is a consistent snapshot
+        return {**self.library, "commands": dict(self.library["commands"])}
+
     def _save_lib(self):
         try: 
-            with open(self.lib_path, 'w') as f: 
-                json.dump(self.library, f, indent=4)
+            self.store.snapshot(self._snapshot_source())
         except Exception as e:
             print(f"{Fore.RED}[!] Failed to save library: {e}")
 
     def save_entry(self, command: str, code: str):
         if "session" in command.lower(): return
         if "AI Error" in code: return 
-        # Auto-generate an ID if saving from Sentinel (random high number)
-        new_id = random.randint(1000, 9999)
-        self.library["commands"][command.lower()] = {
-            "type": "python",
-            "code": code,
-            "id": new_id,
-            "timestamp": time.time()
-        }
-        self._save_lib()
+        name = command.lower()
+        with self._lock:
+            # Re-learning a command keeps its id; new commands get the next id from the allocator
+            existing = self.get_command(name)
+            new_id = existing["id"] if existing and existing.get("id") is not None else self.allocate_id()
+            self.library["commands"][name] = {
+                "type": "python",
+                "code": code,
+                "id": new_id,
+                "timestamp": time.time()
+            }
+            self.by_id.setdefault(new_id, name)
+            self.code_cache.add(name, code)
+            if existing:
+                self.prepared = prepare_library(self.library["commands"])  # Sequences may include the old version
+            else:
+                self.prepared[new_id] = prepare_command(name, self.library["commands"][name])
+            self.index.add(name, self.library["commands"][name], "learned")
+            self.version += 1
+            self.store.set(name, self.library["commands"][name], {"next_id": self.library["next_id"]})
 
     def handle_session_command(self, command: str) -> str:
         cmd = command.lower()
@@ -130,7 +224,8 @@ class LibraryManager:
                 return f"Resumed: '{name}'"
         elif cmd == "end session":
             self.is_recording = False; self.sessions[self.current_session_name] = self.current_session_data
-            with open(self.sess_path, 'w') as f: json.dump(self.sessions, f, indent=4)
+            if self.db: self.db.save_session("library", self.current_session_name, self.current_session_data)
+            else: write_json_atomic(self.sess_path, self.sessions)
             return "Saved"
         elif cmd.startswith("play session"):
             name = cmd.replace("play session", "").strip()
@@ -148,7 +243,6 @@ class LibraryManager:
 
     def get_command_by_id(self, cmd_id: int) -> Optional[Dict]:
         """Find a command by its ID for sequence execution"""
-        for name, cmd in self.library.get("commands", {}).items():
-            if cmd.get("id") == cmd_id:
-                return {**cmd, "name": name}
-        return None
+        name = self.by_id.get(cmd_id)
+        if name is None: return None
+        return {**self.library["commands"][name], "name": name}
@@ -1,76 +1,241 @@
 
-import json
 import os
 import math
 import time
+import threading
+import numpy as np
 from colorama import Fore
 from . import config
+from .vector_index import VectorIndex
+from .consolidate import RowUsage, Consolidator
 
 # Simple, lightweight Vector Store using Cosine Similarity
 # We avoid heavy deps like chromadb/faiss for now to ensure compatibility.
+# Vectors live in a normalised float32 matrix (VectorIndex); a search is one matrix-vector product.
+# On disk: a memory-mapped float32 file plus a JSON-lines sidecar (vector_store.py), or SQLite.
 # If config.ACTIVE_MODE is True, we use Ollama embeddings.
-# Fallback: TF-IDF or Keyword overlap (for now, simple word vector stub)
+# Fallback: offline hashed n-gram TF-IDF embedder (local_embed.py), so search works without a model server.
+# Retrievals are counted per row (RowUsage); consolidate.py dedupes, expires and evicts in the background.
 
 class VectorMemory:
     def __init__(self, storage_file="memory_store.json"):
         self.storage_file = storage_file
-        self.data = [] # List of {text, vector, metadata}
+        self.data = [] # Items {text, metadata, timestamp}; item i is row i of self.index
+        self.index = VectorIndex()
+        self.ann = None   # Optional IVF index over self.index (config.ANN_ENABLED)
+        self.quant = None # Optional float16/int8 scan copy (config.VECTOR_QUANTIZATION)
+        self.store = None
+        self.db = None
+        self.usage = RowUsage()
+        self._deleted = set()  # Deleted rows (sqlite backend; the binary store tracks its own)
+        self._lock = threading.RLock()
+        if config.STORAGE_BACKEND == "sqlite":
+            from .db import get_database
+            self.db = get_database()
+            self.db.import_once("memories", storage_file)
         self.load()
+        self.consolidator = None
+        if config.MEMORY_CONSOLIDATE_INTERVAL:
+            self.consolidator = Consolidator(self, config.MEMORY_DEDUP_THRESHOLD, config.MEMORY_TTL_DAYS,
+                                             config.MEMORY_MAX_ITEMS, config.MEMORY_EVICTION).start(config.MEMORY_CONSOLIDATE_INTERVAL)
         
     def load(self):
-        if os.path.exists(self.storage_file):
-            try:
-                with open(self.storage_file, 'r', encoding='utf-8') as f:
-                    self.data = json.load(f)
-                print(f"{Fore.CYAN}[*] Loaded {len(self.data)} memories from {self.storage_file}")
-            except Exception as e:
-                print(f"{Fore.RED}[!] Failed to load memory: {e}")
-                self.data = []
+        if self.db:
+            self.data = self.db.load_memories()
+            self.index = VectorIndex()
+            self._index_vectors()
+            self._attach_ann(None)
+            self.usage = RowUsage()
+            self._sync_usage()
+            print(f"{Fore.CYAN}[*] Loaded {len(self.data)} memories from {self.db.path}")
+            return
+        # Binary store (<base>.vec + <base>.meta.jsonl) next to the legacy JSON file
+        from .vector_store import MemoryStore
+        base = os.path.splitext(self.storage_file)[0]
+        try:
+            self.store = MemoryStore(base)
+            if not len(self.store) and os.path.exists(self.storage_file):
+                count = self.store.migrate_json(self.storage_file)
+                print(f"{Fore.CYAN}[*] Migrated {count} memories from {self.storage_file} to {base}.vec")
+            self.data, self.index = self.store.items, self.store.index
+            self._attach_ann(base)
+            self.usage = RowUsage(base + ".usage.npz")
+            self._sync_usage()
+            print(f"{Fore.CYAN}[*] Loaded {len(self.data)} memories from {base}.vec")
+        except Exception as e:
+            print(f"{Fore.RED}[!] Failed to load memory: {e}")
+            self.store, self.data, self.index = None, [], VectorIndex()
+
+    def _sync_usage(self, now=None):
+        self.usage.sync(len(self.data), now)
+
+    def _attach_ann(self, base):
+        self.ann = self.quant = None
+        if config.VECTOR_QUANTIZATION != "none":
+            if base:
+                from .quantize import QuantizedIndex
+                self.quant = QuantizedIndex(self.index, config.VECTOR_QUANTIZATION, base, config.RERANK_FACTOR)
+            else:
+                # The sqlite backend keeps its float32 matrix in RAM: a compact copy would add memory, not save it
+                print(f"{Fore.YELLOW}[!] VECTOR_QUANTIZATION applies to the binary store only; using exact search")
+        if config.ANN_ENABLED:
+            from .ann import IVFIndex
+            self.ann = IVFIndex(self.index, base, config.ANN_NPROBE, config.ANN_MIN_ITEMS)
+
+    def _index_vectors(self):
+        """Bring the in-RAM index (sqlite backend) up to one row per item; zero rows for items without a vector."""
+        if self.index.dim is None:
+            first = next((item["vector"] for item in self.data if item.get("vector")), None)
+            if first is None: return
+            self.index.dim = len(first)
+        pending = self.data[len(self.index):]
+        block = np.zeros((len(pending), self.index.dim), np.float32)
+        for i, item in enumerate(pending):
+            v = item.get("vector")
+            if v and len(v) == self.index.dim: block[i] = v
+            item.pop("vector", None)  # The index row is the only copy kept in RAM
+        self.index.add_batch(block)
 
     def save(self):
+        # Items are written as they are added (binary store / sqlite); only the offline IDF counts may be pending
+        if self.embedding_backend() == "local":
+            from .local_embed import get_local_embedder
+            get_local_embedder().save()
+
+    def _embed_cache(self):
+        if not config.EMBED_CACHE_DIR: return None
+        from .embed_cache import get_embedding_cache
+        # A relative directory sits next to the store, like its usage table and index files
+        return get_embedding_cache(os.path.join(os.path.dirname(os.path.abspath(self.storage_file)), config.EMBED_CACHE_DIR))
+
+    def embedding_backend(self):
+        backend = config.EMBEDDING_BACKEND
+        if backend != "auto": return backend
+        # A store keeps the backend it was built with: vectors from different models don't compare
+        if self.index.dim is not None: return "local" if self.index.dim == config.LOCAL_EMBED_DIM else "ollama"
+        return "ollama" if config.ACTIVE_MODE else "local"
+
+    def _ollama_embedding(self, text):
+        # Same (model, text) -> same vector: repeated goals and retraining skip the model server
+        cache = self._embed_cache()
+        if cache:
+            cached = cache.get(config.EMBEDDING_MODEL, text)
+            if cached is not None: return cached
         try:
-            with open(self.storage_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f)
-        except Exception as e:
-            print(f"{Fore.RED}[!] Failed to save memory: {e}")
+            import ollama
+            # Use a small embedding model. 
+            # User needs to pull it: ollama pull nomic-embed-text
+            response = ollama.embeddings(model=config.EMBEDDING_MODEL, prompt=text)
+            vector = response['embedding']
+            if cache and vector: cache.put(config.EMBEDDING_MODEL, text, vector)
+            return vector
+        except Exception:
+            return None
 
-    def get_embedding(self, text):
+    def get_embedding(self, text, observe=False):
         """
         Get vector embedding.
         Priority:
         1. Ollama (nomic-embed-text or mxbai-embed-large) if ACTIVE_MODE
-        2. Simple conceptual hash (Fallback)
+        2. Offline hashed n-gram TF-IDF embedder (Fallback)
         """
-        if config.ACTIVE_MODE:
-            try:
-                import ollama
-                # Use a small embedding model. 
-                # User needs to pull it: ollama pull nomic-embed-text
-                response = ollama.embeddings(model="nomic-embed-text", prompt=text)
-                return response['embedding']
-            except Exception:
-                pass # Fallback
-        
-        # Fallback: Simple Bag-of-Words Hash (Not true semantic, but better than nothing for exact matches)
-        # In a real "Project Ultra", we'd bundle FastEmbed.
-        # For now, let's just return a placeholder or warning if no Ollama.
-        return None # meaningful fallback TODO
+        return self.get_embeddings([text], observe)[0]
 
-    def add(self, text, metadata=None):
-        vector = self.get_embedding(text)
+    def get_embeddings(self, texts, observe=False, pool=None):
+        """Embed a batch; `observe` counts the texts into the offline embedder's IDF (texts about to be stored).
+        With an executor as `pool`, Ollama requests run concurrently on it."""
+        backend = self.embedding_backend()
+        if backend == "ollama":
+            vectors = list(pool.map(self._ollama_embedding, texts)) if pool else [self._ollama_embedding(t) for t in texts]
+            # Nothing stored yet and no model server: start the store on the offline embedder instead
+            if any(vectors) or config.EMBEDDING_BACKEND != "auto" or self.index.dim is not None: return vectors
+        from .local_embed import get_local_embedder
+        embedder = get_local_embedder()
+        if observe: embedder.observe(texts)
+        return embedder.embed(texts)
+
+    def add(self, text, metadata=None, vector=None):
+        """Store `text`; pass `vector` to skip the embedding call (e.g. when it was embedded in a batch)."""
+        if vector is None: vector = self.get_embedding(text, observe=True)
+        if vector is not None: vector = [float(x) for x in vector]
         if not vector and config.ACTIVE_MODE:
              print(f"{Fore.YELLOW}[!] Warning: Could not generate embedding. Is Ollama running?")
              return False
-             
-        entry = {
-            "text": text,
-            "vector": vector,
-            "metadata": metadata or {},
-            "timestamp": time.time()
-        }
-        self.data.append(entry)
-        self.save()
-        return True
+        return self.add_many([text], [metadata], [vector]) == 1
+
+    def add_many(self, texts, metadatas=None, vectors=None):
+        """Bulk insert with precomputed vectors (None entries = no embedding); one append per file."""
+        metadatas = metadatas or [None] * len(texts)
+        vectors = vectors if vectors is not None else [None] * len(texts)
+        now = time.time()
+        entries = [{"text": t, "metadata": m or {}, "timestamp": now} for t, m in zip(texts, metadatas)]
+        vectors = [v if v is not None and len(v) else None for v in vectors]
+        with self._lock:
+            # A batch whose vectors don't fit the index is rejected whole, before anything is written
+            dims = {len(v) for v in vectors if v is not None}
+            if len(dims) > 1 or (dims and self.index.dim is not None and dims != {self.index.dim}):
+                print(f"{Fore.YELLOW}[!] Embeddings have {sorted(dims)} dims, memory has {self.index.dim}; batch of {len(texts)} skipped")
+                return 0
+            if self.store is not None:
+                self.store.append_many(entries, vectors)
+            else:
+                for entry, v in zip(entries, vectors):
+                    if v is not None: v = [float(x) for x in v]
+                    rowid = self.db.add_memory(entry["text"], v, entry["metadata"], now) if self.db else None
+                    self.data.append({**entry, "vector": v, "rowid": rowid})
+                self._index_vectors()
+            if self.quant: self.quant.sync()
+            if self.ann: self.ann.sync()
+            self._sync_usage(now)
+        return len(entries)
+
+    def is_deleted(self, row):
+        return row in (self.store.deleted if self.store is not None else self._deleted)
+
+    def deleted_rows(self):
+        return self.store.deleted if self.store is not None else self._deleted
+
+    def remove_rows(self, rows):
+        """Delete items by row; rows keep their numbers (zeroed, never matched) until compact()."""
+        rows = [int(r) for r in rows if not self.is_deleted(r)]
+        if not rows: return
+        with self._lock:
+            if self.store is not None:
+                self.store.remove(rows)
+            else:
+                if self.db: self.db.delete_memories([self.data[r]["rowid"] for r in rows if self.data[r].get("rowid")])
+                self.index.clear_rows([r for r in rows if r < len(self.index)])
+                for r in rows: self.data[r]["deleted"] = True
+                self._deleted.update(rows)
+            if self.quant: self.quant.clear_rows(rows)
+
+    def update_metadata(self, row, metadata):
+        with self._lock:
+            if self.store is not None:
+                self.store.update_metadata(row, metadata)
+            else:
+                if self.db and self.data[row].get("rowid"): self.db.update_memory_metadata(self.data[row]["rowid"], metadata)
+                self.data[row]["metadata"] = metadata
+
+    def compact(self):
+        """Drop deleted items for good and renumber rows (rebuilds ANN/quantised copies)."""
+        with self._lock:
+            if self.store is not None:
+                self.ann = self.quant = None  # Release their maps of the old files
+                keep = self.store.compact()
+                self.data, self.index = self.store.items, self.store.index
+                self._attach_ann(self.store.base)
+            else:
+                keep = np.array([r for r in range(len(self.data)) if r not in self._deleted], np.int64)
+                matrix = self.index.matrix
+                self.data = [self.data[r] for r in keep]
+                self.index = VectorIndex(self.index.dim)
+                if len(matrix): self.index.add_batch(np.asarray(matrix)[keep[keep < len(matrix)]])
+                self._deleted = set()
+                self._attach_ann(None)
+            self.usage.remap(keep)
+            self.usage.save()
+            print(f"{Fore.CYAN}[*] Memory compacted to {len(self.data)} items")
 
     def search(self, query, k=3):
         """
@@ -78,15 +243,15 @@ class VectorMemory:
         """
         query_vec = self.get_embedding(query)
         if not query_vec: return [] # Cannot search without embedding
-        
-        results = []
-        for item in self.data:
-            if not item.get('vector'): continue
-            score = self.cosine_similarity(query_vec, item['vector'])
-            results.append((score, item))
-            
-        results.sort(key=lambda x: x[0], reverse=True)
-        return [r[1] for r in results[:k]]
+        return [item for item, _ in self.search_vector(query_vec, k)]
+
+    def search_vector(self, query_vec, k=3):
+        """[(item, cosine score)] for the k stored items nearest to `query_vec`."""
+        with self._lock:
+            searcher = self.ann if self.ann and self.ann.active else (self.quant or self.index)
+            rows, scores = searcher.search(query_vec, k)
+            self.usage.touch(rows)
+            return [(self.data[int(r)], float(s)) for r, s in zip(rows, scores)]
 
     def cosine_similarity(self, v1, v2):
         dot_product = sum(a*b for a,b in zip(v1, v2))
@@ -13,8 +13,9 @@ from colorama import Fore
 from .config import (
     print, OCR_ENGINE, OCR_USE_GPU, OCR_SCAN_MODE, OCR_MONITOR_STRATEGY,
     OCR_ADAPTIVE_MODE, OCR_STRIP_THRESHOLD, OCR_STRIP_COUNT, OCR_STRIP_OVERLAP,
-    DEBUG_OCR, TARGET_WINDOW_TITLE, TARGET_MONITORS
+    DEBUG_OCR, TARGET_WINDOW_TITLE, TARGET_MONITORS, ELEMENT_SCALE
 )
+from .element_detector import ElementDetector, drop_text_overlaps
 
 # --- 2. PERCEPTION ENGINE ---
 class WindowCapture:
@@ -124,6 +125,7 @@ class PerceptionEngine:
             self.ocr = RapidOCR(det_use_gpu=OCR_USE_GPU, cls_use_gpu=OCR_USE_GPU, rec_use_gpu=OCR_USE_GPU, intra_op_num_threads=4)
             
         self.win_cap = WindowCapture()
+        self.element_detector = ElementDetector(scale=ELEMENT_SCALE)
         # Active Vision is now separate (see active_vision.py)
         
         self.last_image = None  # DEPRECATED: Only used if we do full capture loop
@@ -230,6 +232,16 @@ class PerceptionEngine:
             if DEBUG_OCR: print(f"OCR Error: {e}")
         return ui_data, txt_parts
 
+    def _detect_elements(self, img, region_offset_x, region_offset_y, text_items):
+        """Non-text UI elements for one captured image, minus boxes OCR already covers."""
+        try:
+            key = (region_offset_x, region_offset_y, img.shape[1], img.shape[0])
+            elements = self.element_detector.detect(img, region_offset_x, region_offset_y, key=key)
+            return drop_text_overlaps(elements, text_items)
+        except Exception as e:
+            if DEBUG_OCR: print(f"Element Detection Error: {e}")
+            return []
+
     def capture_and_scan(self):
         # Imports from config to catch updates
         from . import config
@@ -281,6 +293,8 @@ class PerceptionEngine:
                             }
                             img = np.array(sct.grab(strip_rect))
                             s_data, s_txt = self._ocr_image(img, strip_rect['left'], strip_rect['top'])
+                            if config.ELEMENT_DETECTION:
+                                s_data += self._detect_elements(img, strip_rect['left'], strip_rect['top'], s_data)
                             all_ui_data.extend(s_data)
                             all_txt_parts.extend(s_txt)
                     else:
@@ -288,6 +302,8 @@ class PerceptionEngine:
                         # print(f"[DEBUG] Adaptive OCR: Full mode for small window ({coverage:.2f} coverage)")
                         img = np.array(sct.grab(region))
                         s_data, s_txt = self._ocr_image(img, region['left'], region['top'])
+                        if config.ELEMENT_DETECTION:
+                            s_data += self._detect_elements(img, region['left'], region['top'], s_data)
                         all_ui_data.extend(s_data)
                         all_txt_parts.extend(s_txt)
                 
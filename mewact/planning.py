@@ -1,24 +1,58 @@
 
 import re
 import difflib
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from typing import List, Dict, Optional, Tuple
 from colorama import Fore
 
-from .config import print, DEBUG_OCR
+from .config import print, DEBUG_OCR, GOAL_CACHE_SIZE, USAGE_WEIGHT, MODEL_NAME
+from .config import LLM_SELECT, LLM_SELECT_HOST, LLM_SELECT_DEADLINE, LLM_SELECT_CANDIDATES, LLM_SELECT_CACHE_SIZE
+from . import config
 from .memory import VAR_STORE
+from .compiler import render, placeholders
+from .usage import UsageStats
+from .selector import LLMSelector
+from .hybrid import HybridRetriever
 
 # --- 3. COGNITIVE PLANNER (ID SELECTOR) ---
 class CognitivePlanner:
-    def __init__(self, library_manager):
+    def __init__(self, library_manager, memory=None, usage_file: str = None):
         from ollama import Client
         self.client = Client(host='http://localhost:11434')
         self.library = library_manager 
+        self.memory = memory  # VectorMemory (optional): adds embedding similarity to skill retrieval
+        self.retriever = HybridRetriever(library_manager, memory)
+        # Goal memo: normalised goal text -> (command name, entry, VARn placeholders, LLM-extracted var); None caches a miss.
+        # Variables are parsed out before lookup, so "type | a" and "type | b" share one entry.
+        self._goal_cache = OrderedDict()
+        self._goal_cache_version = None
+        self._goal_lock = threading.Lock()
+        # Execution history (frequency, recency, success rate) re-weights retrieval scores
+        self.usage = UsageStats(usage_file or config.USAGE_FILE)
+        if config.STORAGE_BACKEND == "sqlite":
+            from .db import get_database
+            self.usage.seed(get_database().history_entries())
+        else:
+            self.usage.seed_from_history(config.HISTORY_FILE)
+        # Optional LLM pick among the keyword shortlist (deadline-bound, falls back to the top match)
+        self.selector = LLMSelector(LLM_SELECT_HOST, MODEL_NAME, LLM_SELECT_DEADLINE, LLM_SELECT_CACHE_SIZE) if LLM_SELECT else None
+        # plan_goal context: sources are gathered concurrently on long-lived engines
+        self.vision = None  # ActiveVisionEngine, created on first use
+        self._context_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="plan-context")
+        self._vision_future = None
+        self._vision_started = 0.0  # time.monotonic() when _vision_future was submitted
 
     def _extract_json(self, text: str) -> str:
         try:
-            match = re.search(r"```json\s*(\{.*\})\s*```", text, re.DOTALL)
+            match = re.search(r"```json\s*([\[{].*[\]}])\s*```", text, re.DOTALL)
             if match: return match.group(1)
-            start, end = text.find('{'), text.rfind('}')
+            # Plans are JSON arrays of steps; other replies are objects
+            opener = min((i for i in (text.find('['), text.find('{')) if i != -1), default=-1)
+            closer = ']' if opener != -1 and text[opener] == '[' else '}'
+            start, end = opener, text.rfind(closer)
             if start != -1 and end != -1: return text[start:end+1]
             return text
         except: return text
@@ -39,6 +73,17 @@ class CognitivePlanner:
         return best_match
 
     def plan(self, goal: str, ui_data: List[Dict]) -> Tuple[str, bool]:
+        """Resolve `goal` and return its code as text with placeholders filled in."""
+        match = self.resolve(goal, ui_data)
+        if not match: return "", False
+        return render(match["code"], match["params"]), match["cached"]
+
+    def resolve(self, goal: str, ui_data: List[Dict]) -> Optional[Dict]:
+        """
+        Pick the command for `goal` without touching its source.
+        Returns {"id", "name", "type", "code", "params", "cached"}; `params` holds the
+        placeholder values ({"VAR": ...}) for the executor to bind.
+        """
         goal_clean = goal.strip()
         
         # --- PARSE INLINE VARIABLE ---
@@ -79,52 +124,68 @@ class CognitivePlanner:
         # --- LAYER 1: REFLEXES ---
         if goal_clean.lower().startswith(("cmd", "powershell", "echo")):
             print(f"{Fore.CYAN}[*] Reflex: Shell")
-            # Escape quotes and backslashes for safe shell execution
-            safe_goal = goal_clean.replace("\\", "\\\\").replace("'", "\\'").replace('"', '\\"')
-            return f"subprocess.Popen('{safe_goal}', shell=True)", False
+            # run_shell is provided by the executor (persistent session when enabled); repr() quotes safely
+            return {"id": None, "name": "shell reflex", "type": "python",
+                    "code": f"run_shell({goal_clean!r})", "params": {}, "cached": False}
 
-        # --- LAYER 2: SMART KEYWORD FILTER ---
-        print(f"{Fore.MAGENTA}    [*] Smart Filter: Matching keywords...")
+        # --- GOAL CACHE ---
+        key = " ".join(goal_clean.lower().split())
+        with self._goal_lock:
+            if self._goal_cache_version != self.library.version:
+                self._goal_cache.clear()
+                self._goal_cache_version = self.library.version
+            hit = self._goal_cache.get(key, False)
+            if hit is not False: self._goal_cache.move_to_end(key)
+        if hit is not False:
+            if DEBUG_OCR: print(f"{Fore.GREEN}    [+] Goal cache: '{key}' -> {hit[0] if hit else None}")
+            return self._bind_match(*hit, inline_var, cached=True) if hit else None
+
+        # --- LAYER 2: HYBRID COMMAND RETRIEVAL (BM25 + VECTORS) ---
+        print(f"{Fore.MAGENTA}    [*] Smart Filter: Ranking commands...")
         
+        version = self.library.version
         cmds = self.library.library["commands"]
         if not cmds:
             print(f"{Fore.RED}    [!] Library empty.")
-            return "", False
+            return None
 
-        # 1. Extract keywords from goal
-        goal_words = set(goal_clean.lower().split())
-        # Remove common stopwords
-        stopwords = {'a', 'an', 'the', 'to', 'for', 'on', 'in', 'with', 'and', 'or', 'is', 'it', 'my', 'me', 'i'}
-        goal_keywords = goal_words - stopwords
-        
-        # 2. Find commands matching keywords
-        def match_score(cmd_name: str) -> int:
-            """Higher score = better match"""
-            cmd_words = set(cmd_name.lower().split())
-            return len(goal_keywords & cmd_words)
-        
-        matched_cmds = {}
-        for key, data in cmds.items():
-            if not isinstance(data, dict): continue
-            cid = data.get("id")
-            if cid is None: continue
-            
-            score = match_score(key)
-            if score > 0:
-                matched_cmds[cid] = {"name": key, "score": score, "code": data["code"], "id": cid, "type": data.get("type", "python")}
+        hits = self.retriever.search(goal_clean, k=LLM_SELECT_CANDIDATES if self.selector else 5)
+        if not hits:
+            print(f"{Fore.RED}    [!] No matching commands found.")
+            self._remember(key, None, version)
+            return None
+        # Commands that have run (and worked) recently win ties and near-ties; sort is stable
+        now = time.time()
+        for h in hits:
+            h["score"] = round(h["score"] * (1.0 + USAGE_WEIGHT * self.usage.prior(cmds[h["name"]].get("id"), now)), 4)
+        hits.sort(key=lambda h: -h["score"])
 
-        if not matched_cmds:
-            print(f"{Fore.RED}    [!] No keyword matches found.")
-            return "", False
+        # --- LAYER 2b: LLM SELECTION (optional) ---
+        chosen, llm_var, settled = hits[0], "", True
+        if self.selector and len(hits) > 1:
+            candidates, seen = [], set()
+            for h in hits:
+                cid = cmds[h["name"]].get("id")
+                if cid is None or cid in seen: continue  # Aliases share an id
+                seen.add(cid)
+                candidates.append({"id": cid, "name": h["name"], "description": cmds[h["name"]].get("description", ""), "hit": h})
+            answer = self.selector.select(goal_clean, candidates)
+            if answer:
+                chosen = next(c["hit"] for c in candidates if str(c["id"]) == answer["id"])
+                llm_var = answer["var"]
+            else:
+                settled = False  # Don't pin the fallback; the late answer is cached for next time
 
-        # 3. Sort by score
-        sorted_cmds = sorted(matched_cmds.values(), key=lambda x: x['score'], reverse=True)
-        top_match = sorted_cmds[0]
+        data = cmds[chosen["name"]]
+        top_match = {"name": chosen["name"], "score": chosen["score"], "code": data.get("code", ""),
+                     "id": data.get("id"), "type": data.get("type", "python")}
         
-        print(f"{Fore.GREEN}    [+] Matched: '{top_match['name']}' (ID: {top_match['id']})")
+        print(f"{Fore.GREEN}    [+] Matched: '{top_match['name']}' (ID: {top_match['id']}, score {top_match['score']})")
         
-        code = top_match['code']
-        code = code.replace("__VAR__", inline_var)
+        # __VAR1__, __VAR2__... read $V1, $V2... from the variable store at bind time
+        var_refs = tuple(n for n in placeholders(top_match['code']) if re.fullmatch(r"VAR\d+", n))
+        if settled: self._remember(key, (top_match['name'], data, var_refs, llm_var), version)
+        match = self._bind_match(top_match['name'], data, var_refs, llm_var, inline_var, cached=False)
         
         # --- LAYER 3: VISUAL CONFIRMATION ---
         # If command implies clicking, verify target is visible
@@ -138,47 +199,88 @@ class CognitivePlanner:
             else:
                  pass # Can't visually confirm, hope generic click works or it's a hotkey
 
-        return code, False
+        return match
+
+    def record_outcome(self, match: Optional[Dict], success: bool):
+        """Feed an execution result back into the usage stats; a failure also forgets goals cached to it."""
+        if not match or match.get("id") is None: return
+        self.usage.record(match["id"], success)
+        if not success:
+            with self._goal_lock:
+                for key in [k for k, v in self._goal_cache.items() if v and v[0] == match["name"]]:
+                    del self._goal_cache[key]
+
+    def _remember(self, key: str, entry: Optional[Tuple], version: int):
+        with self._goal_lock:
+            if version != self._goal_cache_version: return  # Library changed while ranking
+            self._goal_cache[key] = entry
+            if len(self._goal_cache) > GOAL_CACHE_SIZE: self._goal_cache.popitem(last=False)
+
+    def _bind_match(self, name: str, data: Dict, var_refs: Tuple[str, ...], llm_var: str, inline_var: str, cached: bool) -> Dict:
+        # __VAR__ takes the inline value (or what the LLM pulled out of the goal); "cached" says whether the goal cache answered
+        params = {"VAR": inline_var or llm_var}
+        for ref in var_refs: params[ref] = VAR_STORE.get(ref[3:])
+        return {"id": data.get("id"), "name": name, "type": data.get("type", "python"),
+                "code": data.get("code", ""), "params": params, "cached": cached}
+
+    def _describe_screen(self) -> str:
+        if self.vision is None:
+            from .active_vision import ActiveVisionEngine
+            self.vision = ActiveVisionEngine()
+        print(f"{Fore.CYAN}    [*] Scannning screen...")
+        return self.vision.describe_screen()
+
+    def _recall(self, goal: str) -> List[str]:
+        cmds = self.library.library["commands"]
+        lines = []
+        for hit in self.retriever.search(goal, k=3):
+            data = cmds.get(hit['name']) or {}
+            lines.append(f"ID {data.get('id')}: {hit['name']} {data.get('description', '')}".strip())
+        return lines
+
+    def _gather_context(self, goal: str) -> Dict:
+        """Screen description and skill recall in parallel, each bounded by its own deadline."""
+        start = time.monotonic()
+        sources = {}
+        if config.ACTIVE_MODE:
+            # A description still running for an earlier goal is shared only while it is fresh;
+            # an older capture may show a screen from long before this goal
+            fresh = start - self._vision_started <= config.PLAN_VISION_REUSE
+            if self._vision_future is None or self._vision_future.done() or not fresh:
+                self._vision_future = self._context_pool.submit(self._describe_screen)
+                self._vision_started = start
+            sources["screen"] = (self._vision_future, config.PLAN_VISION_DEADLINE)
+        sources["memory"] = (self._context_pool.submit(self._recall, goal), config.PLAN_MEMORY_DEADLINE)
+        context = {}
+        for name, (future, deadline) in sources.items():
+            try:
+                context[name] = future.result(timeout=max(0.0, start + deadline - time.monotonic()))
+            except FutureTimeout:
+                print(f"{Fore.YELLOW}    [!] {name.title()} context not ready after {deadline}s; planning without it.")
+            except Exception as e:
+                print(f"{Fore.RED}    [!] {name.title()} Error: {e}")
+        return context
 
     def plan_goal(self, goal: str) -> List[Dict]:
         """
         [AUTONOMY] Generate a multi-step plan for a high-level goal.
-        1. Context: Get Screen Description (The Eye)
-        2. Recall: Get Relevant Vectors (The Brain)
+        1. Context: Get Screen Description (The Eye)    } concurrently, each with
+        2. Recall: Get Relevant Skills (The Brain)      } its own deadline
         3. Reason: Use LLM to generate plan
         """
         import mewact.config as config
-        from colorama import Fore
         
         print(f"{Fore.CYAN}[*] Autonomy Engine: Analyzing goal '{goal}'...")
         
-        # 1. The Eye (Active Vision)
-        screen_context = "Unknown"
-        if config.ACTIVE_MODE:
-            try:
-                from .active_vision import ActiveVisionEngine
-                vision = ActiveVisionEngine()
-                print(f"{Fore.CYAN}    [*] Scannning screen...")
-                screen_context = vision.describe_screen()
-                print(f"{Fore.GREEN}    [+] Screen Context: {screen_context[:50]}...")
-            except Exception as e:
-                print(f"{Fore.RED}    [!] Vision Error: {e}")
-        
-        # 2. The Brain (Memory)
-        memory_context = []
-        if self.memory:
-            relevant = self.memory.search(goal, k=3)
-            for item in relevant:
-                cmd_id = item['metadata'].get('id')
-                desc = item['text']
-                memory_context.append(f"ID {cmd_id}: {desc}")
-            if memory_context:
-                print(f"{Fore.GREEN}    [+] Recalled {len(memory_context)} relevant skills.")
+        # 1 + 2. The Eye (Active Vision) and the Brain (keyword + embedding recall)
+        context = self._gather_context(goal)
+        screen_context = context.get("screen") or "Unknown"
+        memory_context = context.get("memory") or []
+        if "screen" in context: print(f"{Fore.GREEN}    [+] Screen Context: {screen_context[:50]}...")
+        if memory_context: print(f"{Fore.GREEN}    [+] Recalled {len(memory_context)} relevant skills.")
 
         # 3. The Reasoner (LLM)
         try:
-            import ollama
-            
             # Construct Prompt
             prompt = f"""
             GOAL: {goal}
@@ -205,7 +307,7 @@ class CognitivePlanner:
             """
             
             print(f"{Fore.CYAN}    [*] Generating Plan (Model: {config.PLANNER_MODEL})...")
-            response = ollama.chat(model=config.PLANNER_MODEL, messages=[{'role': 'user', 'content': prompt}])
+            response = self.client.chat(model=config.PLANNER_MODEL, messages=[{'role': 'user', 'content': prompt}])
             content = response['message']['content']
             
             # Extract JSON
@@ -219,4 +321,3 @@ class CognitivePlanner:
         except Exception as e:
             print(f"{Fore.RED}[!] Planning Error: {e}")
             return []
-
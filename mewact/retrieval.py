@@ -0,0 +1,162 @@
+
+import re
+import math
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# --- COMMAND RETRIEVAL (BM25) ---
+# In-memory inverted index over command names, descriptions and categories.
+# Postings are kept per term as {slot: weighted tf} and materialised into numpy
+# arrays on first use after a change, so a query only touches the postings of
+# its own terms and scores them in a few vectorised operations.
+
+STOPWORDS = frozenset({
+    'a', 'an', 'the', 'to', 'for', 'on', 'in', 'with', 'and', 'or', 'is', 'it', 'my', 'me', 'i',
+    'of', 'at', 'by', 'from', 'this', 'that', 'be', 'as', 'into', 'up', 'please', 'can', 'you'
+})
+FIELD_WEIGHTS = {"name": 3.0, "category": 1.0, "description": 1.0}
+_TOKEN = re.compile(r"[a-z0-9]+")
+_SUFFIXES = ("ational", "ization", "fulness", "iveness", "ation", "ness", "ment", "ing", "ed", "ly")
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Light suffix-stripping stemmer: 'opening'/'opened'/'opens' -> 'open', 'settings' -> 'set'."""
+    if len(word) <= 3 or word.isdigit(): return word
+    if word.endswith("ies") and len(word) > 4: word = word[:-3] + "y"
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")) and len(word) > 4: word = word[:-1]
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz": word = word[:-1]  # 'running' -> 'run'
+            break
+    if len(word) > 4 and word.endswith("e"): word = word[:-1]  # 'close'/'closed'/'closing' agree
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(t) for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def section_category(marker: str) -> str:
+    """'=== NEW BROWSER COMMANDS ===' -> 'browser'"""
+    words = [w for w in _TOKEN.findall(marker.lower()) if w not in ("new", "commands", "command")]
+    return " ".join(words)
+
+
+class CommandIndex:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self._names = []          # slot -> command name (None when removed)
+        self._slot = {}           # command name -> slot
+        self._lens = []           # slot -> weighted document length
+        self._categories = []     # slot -> category (for filtering)
+        self._terms = {}          # slot -> terms it was indexed under (for removal)
+        self._postings = {}       # term -> {slot: weighted tf}
+        self._arrays = {}         # term -> (slots, tfs) numpy cache
+        self._lens_arr = None
+        self._total_len = 0.0
+        self._free = []
+
+    def __len__(self):
+        return len(self._slot)
+
+    def build(self, commands: Dict):
+        """Index a library's commands; `_comment_*` section markers become categories."""
+        category = ""
+        for name, data in commands.items():
+            if not isinstance(data, dict):
+                if name.startswith("_comment"): category = section_category(str(data))
+                continue
+            self.add(name, data, data.get("category", category))
+
+    def add(self, name: str, entry: Dict, category: str = ""):
+        if name in self._slot: self.remove(name)
+        category = category or entry.get("category", "")
+        tf = {}
+        for field, text in (("name", name), ("category", category), ("description", entry.get("description", ""))):
+            for term in tokenize(text or ""):
+                tf[term] = tf.get(term, 0.0) + FIELD_WEIGHTS[field]
+        slot = self._free.pop() if self._free else len(self._names)
+        if slot == len(self._names):
+            self._names.append(name); self._lens.append(0.0); self._categories.append(category)
+        else:
+            self._names[slot] = name
+            self._categories[slot] = category
+        self._slot[name] = slot
+        self._lens[slot] = sum(tf.values())
+        self._total_len += self._lens[slot]
+        self._terms[slot] = tuple(tf)
+        for term, weight in tf.items():
+            self._postings.setdefault(term, {})[slot] = weight
+            self._arrays.pop(term, None)
+        self._lens_arr = None
+
+    def remove(self, name: str) -> bool:
+        slot = self._slot.pop(name, None)
+        if slot is None: return False
+        for term in self._terms.pop(slot, ()):
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(slot, None)
+                if not posting: del self._postings[term]
+            self._arrays.pop(term, None)
+        self._total_len -= self._lens[slot]
+        self._lens[slot] = 0.0
+        self._names[slot] = None
+        self._free.append(slot)
+        self._lens_arr = None
+        return True
+
+    def slot(self, name: str) -> Optional[int]:
+        return self._slot.get(name)
+
+    def category(self, name: str) -> str:
+        slot = self._slot.get(name)
+        return self._categories[slot] if slot is not None else ""
+
+    def mask(self, keep) -> np.ndarray:
+        """Boolean array over slots: True where `keep(name, category)` holds (False for free slots)."""
+        return np.fromiter((n is not None and keep(n, c) for n, c in zip(self._names, self._categories)), bool, len(self._names))
+
+    def _term_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            posting = self._postings.get(term)
+            if not posting: return None
+            arrays = (np.fromiter(posting.keys(), np.int64, len(posting)),
+                      np.fromiter(posting.values(), np.float64, len(posting)))
+            self._arrays[term] = arrays
+        return arrays
+
+    def ranked(self, query: str, k: int = 10, offset: int = 0, allowed: np.ndarray = None) -> Tuple[List[Dict], int]:
+        """Top `k` matches after skipping `offset`, and the total number of matching commands.
+        `allowed` (from mask()) restricts the search to a subset of commands."""
+        terms = set(tokenize(query))
+        n_docs = len(self._slot)
+        if not terms or not n_docs: return [], 0
+        if self._lens_arr is None: self._lens_arr = np.asarray(self._lens, np.float64)
+        avgdl = self._total_len / n_docs or 1.0
+
+        scores = np.zeros(len(self._names), np.float64)
+        for term in terms:
+            arrays = self._term_arrays(term)
+            if arrays is None: continue
+            slots, tfs = arrays
+            idf = math.log(1.0 + (n_docs - len(slots) + 0.5) / (len(slots) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self._lens_arr[slots] / avgdl)
+            scores[slots] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+        if allowed is not None: scores[:len(allowed)] *= allowed
+        hits = np.flatnonzero(scores)
+        total = len(hits)
+        want = offset + k
+        if total > want:
+            hits = hits[np.argpartition(-scores[hits], want - 1)[:want]]
+        # Ties keep library order (lower slot first)
+        hits = hits[np.lexsort((hits, -scores[hits]))][offset:want]
+        return [{"name": self._names[s], "score": round(float(scores[s]), 4)} for s in hits], total
+
+    def search(self, query: str, k: int = 10) -> List[Dict]:
+        return self.ranked(query, k)[0]
@@ -0,0 +1,111 @@
+
+import re
+import json
+import time
+import threading
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, List, Optional
+from colorama import Fore
+
+from .config import print
+
+# --- LLM COMMAND SELECTOR ---
+# Optional last step of the planner: the lexical shortlist is handed to an
+# Ollama-compatible /api/chat endpoint, which picks the command (and extracts
+# the variable if the goal carries one). Built to stay off the critical path:
+#  * The system prompt is a constant, so every request shares the same prefix
+#    and the model server can reuse its KV cache; only the short user message
+#    (candidates + goal) is new. keep_alive keeps the model loaded.
+#  * Each selection has a hard deadline; when it passes the caller gets None and
+#    falls back to the lexical top match. The request keeps running and its
+#    answer is cached, so the next identical goal gets it immediately.
+#  * Answers are cached by (goal, candidate set).
+
+SYSTEM_PROMPT = (
+    "You are a Command Selector for a desktop automation agent.\n"
+    "The user message lists candidate commands as 'ID <number>: <name> - <description>' followed by a GOAL.\n"
+    "Pick the single candidate that best achieves the GOAL.\n"
+    "If the goal carries content for the command (e.g. 'type hello' -> 'hello'), put it in 'var', else use \"\".\n"
+    "Return JSON only: {\"id\": <number>, \"var\": \"<content>\"}"
+)
+
+
+class LLMSelector:
+    def __init__(self, host: str, model: str, deadline: float = 1.5, cache_size: int = 256, retries: int = 1):
+        self.url = host.rstrip("/") + "/api/chat"
+        self.model = model
+        self.deadline = deadline
+        self.retries = retries
+        self.cache_size = cache_size
+        self._cache = OrderedDict()   # (goal, candidate ids) -> {"id", "var"}
+        self._inflight = {}           # key -> Future, so a slow answer is shared, not re-requested
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-select")
+
+    @staticmethod
+    def _key(goal: str, candidates: List[Dict]):
+        return (" ".join(goal.lower().split()), tuple(c["id"] for c in candidates))
+
+    def _user_message(self, goal: str, candidates: List[Dict]) -> str:
+        lines = [f"ID {c['id']}: {c['name']}" + (f" - {c['description']}" if c.get("description") else "") for c in candidates]
+        return "COMMANDS:\n" + "\n".join(lines) + f"\nGOAL: {goal}"
+
+    def _request(self, goal: str, candidates: List[Dict]) -> Optional[Dict]:
+        body = json.dumps({
+            "model": self.model, "stream": False, "format": "json", "keep_alive": "30m",
+            "options": {"temperature": 0},
+            "messages": [{"role": "system", "content": SYSTEM_PROMPT},
+                         {"role": "user", "content": self._user_message(goal, candidates)}]
+        }).encode("utf-8")
+        valid = {str(c["id"]) for c in candidates}
+        for attempt in range(self.retries + 1):
+            try:
+                req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+                with urllib.request.urlopen(req, timeout=max(self.deadline * 4, 10)) as res:
+                    content = json.loads(res.read())["message"]["content"]
+                match = re.search(r"\{.*\}", content, re.DOTALL)
+                data = json.loads(match.group(0) if match else content)
+                if str(data.get("id")) in valid:
+                    return {"id": str(data["id"]), "var": str(data.get("var") or "")}
+                print(f"{Fore.YELLOW}    [!] LLM picked an id outside the shortlist: {data.get('id')}")
+            except Exception as e:
+                print(f"{Fore.YELLOW}    [!] LLM selection failed (attempt {attempt + 1}): {e}")
+        return None
+
+    def _run(self, key, goal: str, candidates: List[Dict]) -> Optional[Dict]:
+        try:
+            answer = self._request(goal, candidates)
+            if answer is not None:
+                with self._lock:
+                    self._cache[key] = answer
+                    if len(self._cache) > self.cache_size: self._cache.popitem(last=False)
+            return answer
+        finally:
+            with self._lock: self._inflight.pop(key, None)
+
+    def select(self, goal: str, candidates: List[Dict]) -> Optional[Dict]:
+        """
+        candidates: [{"id", "name", "description"}] in lexical rank order.
+        Returns {"id": str, "var": str}, or None if no answer arrived before the deadline.
+        """
+        if len(candidates) < 2: return None
+        key = self._key(goal, candidates)
+        with self._lock:
+            answer = self._cache.get(key)
+            if answer is not None:
+                self._cache.move_to_end(key)
+                return answer
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._pool.submit(self._run, key, goal, candidates)
+                self._inflight[key] = future
+        start = time.perf_counter()
+        try:
+            answer = future.result(timeout=self.deadline)
+        except FutureTimeout:
+            print(f"{Fore.YELLOW}    [!] LLM selection missed its {self.deadline:.1f}s deadline; using lexical match")
+            return None
+        if answer: print(f"{Fore.CYAN}    [*] LLM selected ID {answer['id']} in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return answer
@@ -8,6 +8,7 @@ from colorama import Fore
 
 from .config import print, LOOP_DELAY, DEBUG_OCR, TRIGGER_PATTERN
 from .memory import VAR_STORE
+from .compiler import render
 
 # --- WATCHDOG THREAD ---
 class IdleWatchdog(threading.Thread):
@@ -102,14 +103,18 @@ class PassiveSentinel:
                     cid_str, cmd = m.group(1), m.group(2).strip()
                     print(f"{Fore.GREEN}    >>> Startup Command #{cid_str}: {cmd}")
                     self.executed_ids.add(cid_str)
-                    code, is_cached = self.planner.plan(cmd, ui_data)
+                    match = self.planner.resolve(cmd, ui_data)
+                    code = render(match["code"], match["params"]) if match else None
+                    is_cached = bool(match and match["cached"])
                     # --- Handle Visual Wait (Startup) ---
                     if code and code.startswith("SYSTEM:WAIT_FOR_TEXT:"):
                         target_text = code.split(":", 2)[2]
                         self.perception.wait_for_text(target_text)
                         code = None # Prevent execution
 
-                    if code and self.executor.execute(code):
+                    ok = code is not None and self.executor.execute(match["code"], match["type"], cmd_data=match, params=match["params"])
+                    if code is not None: self.planner.record_outcome(match, ok)
+                    if ok:
                         self._execute_auto_rollback(cmd)
                         if self.planner.library.is_recording:
                             self.planner.library.record_action(cmd, code)
@@ -160,7 +165,9 @@ class PassiveSentinel:
                     print(f"{Fore.GREEN}    >>> Command #{cid_int}: {cmd}")
                     self.executed_ids.add(cid_str)
                     
-                    code, is_cached = self.planner.plan(cmd, ui_data)
+                    match = self.planner.resolve(cmd, ui_data)
+                    code = render(match["code"], match["params"]) if match else None
+                    is_cached = bool(match and match["cached"])
                     
                     if code and code.startswith("SYSTEM:WAIT_FOR_TEXT:"):
                         target_text = code.split(":", 2)[2]
@@ -181,12 +188,16 @@ class PassiveSentinel:
                         for i, cmd_text in enumerate(lines):
                             print(f"{Fore.CYAN}    [BATCH {i+1}/{len(lines)}] {cmd_text}")
                             batch_ui, _ = self.perception.capture_and_scan() # Fresh scan
-                            batch_code, _ = self.planner.plan(cmd_text, batch_ui)
-                            if batch_code and not batch_code.startswith("SYSTEM:") and self.executor.execute(batch_code):
-                                self._execute_auto_rollback(cmd_text)
+                            batch = self.planner.resolve(cmd_text, batch_ui)
+                            if batch and not batch["code"].startswith("SYSTEM:"):
+                                ok = self.executor.execute(batch["code"], batch["type"], cmd_data=batch, params=batch["params"])
+                                self.planner.record_outcome(batch, ok)
+                                if ok: self._execute_auto_rollback(cmd_text)
                         code = None # Done handling
 
-                    if code and self.executor.execute(code):
+                    ok = code is not None and self.executor.execute(match["code"], match["type"], cmd_data=match, params=match["params"])
+                    if code is not None: self.planner.record_outcome(match, ok)
+                    if ok:
                         # Auto-rollback to chat window if enabled
                         self._execute_auto_rollback(cmd)
                         
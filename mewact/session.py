@@ -4,17 +4,25 @@ import os
 import time
 from colorama import Fore
 from .config import print
+from . import config
 
 # --- 4. SESSION MANAGER (CONTEXT MEMORY) ---
 class SessionManager:
     def __init__(self, session_file=None):
         from .config import SESSION_FILE as DEFAULT_SESSION_FILE
         self.session_file = session_file if session_file else DEFAULT_SESSION_FILE
+        self.db = None
+        if config.STORAGE_BACKEND == "sqlite":
+            from .db import get_database
+            self.db = get_database()
+            self.db.import_once("session_memory", self.session_file)
+            self.db.import_once("history", config.HISTORY_FILE)
         self.sessions = self._load()
         self.active_recording = None 
         self.is_recording = False
         
     def _load(self):
+        if self.db: return self.db.load_sessions("recording")
         if os.path.exists(self.session_file):
             try:
                 with open(self.session_file, 'r') as f: return json.load(f)
@@ -31,10 +39,13 @@ class SessionManager:
         clean_keywords = [k for k in keywords if len(k) > 3 and k.isalnum()][:20]
         args = cmd_data.get('args', '')
         
-        # 1. Log to persistent text file (Command History)
+        # 1. Log to persistent command history (recording.txt, or the history table)
         try:
-            with open("recording.txt", "a", encoding="utf-8") as f:
-                 f.write(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] CMD: {cmd_id} | ARGS: {args} | KEYWORDS: {clean_keywords}\n")
+            if self.db:
+                self.db.log_history(cmd_id, args, clean_keywords)
+            else:
+                with open(config.HISTORY_FILE, "a", encoding="utf-8") as f:
+                     f.write(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] CMD: {cmd_id} | ARGS: {args} | KEYWORDS: {clean_keywords}\n")
         except Exception as e: print(f"{Fore.RED}[SESSION] Log error: {e}")
 
         # 2. Add to active recording buffer if enabled
@@ -51,8 +62,11 @@ class SessionManager:
         if not self.is_recording or not self.active_recording: return
         name = self.active_recording["name"]
         self.sessions[name] = self.active_recording
-        with open(self.session_file, 'w') as f:
-            json.dump(self.sessions, f, indent=4)
+        if self.db:
+            self.db.save_session("recording", name, self.active_recording["steps"], self.active_recording["description"])
+        else:
+            with open(self.session_file, 'w') as f:
+                json.dump(self.sessions, f, indent=4)
         self.is_recording = False
         self.active_recording = None
         print(f"{Fore.GREEN}[SESSION] Saved session: {name}")
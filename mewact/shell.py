@@ -0,0 +1,303 @@
+
+import os
+import re
+import sys
+import time
+import uuid
+import queue
+import base64
+import shlex
+import signal
+import threading
+import subprocess
+from collections import deque
+from typing import Callable, Dict
+from colorama import Fore
+
+from .config import print
+
+# --- SHELL EXECUTION SERVICE ---
+# One place for running shell commands: output is streamed line by line to an
+# optional callback, the command is killed (with its whole process tree) when
+# it exceeds its timeout, returned output is capped with head/tail truncation,
+# and the number of commands running at once is bounded.
+
+IS_WINDOWS = sys.platform == "win32"
+
+
+class CappedOutput:
+    """Keeps the first and last `limit // 2` characters of a stream of lines."""
+    def __init__(self, limit: int):
+        self.head_budget = limit // 2
+        self.tail_budget = limit - self.head_budget
+        self.head = []
+        self.head_size = 0
+        self.tail = deque()
+        self.tail_size = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def append(self, line: str):
+        with self._lock:
+            if self.head_size < self.head_budget:
+                take = line[:self.head_budget - self.head_size]
+                self.head.append(take)
+                self.head_size += len(take)
+                line = line[len(take):]
+                if not line: return
+            self.tail.append(line)
+            self.tail_size += len(line)
+            while self.tail_size > self.tail_budget and self.tail:
+                extra = self.tail_size - self.tail_budget
+                first = self.tail[0]
+                if len(first) <= extra:
+                    self.tail.popleft()
+                    self.tail_size -= len(first)
+                    self.dropped += len(first)
+                else:
+                    self.tail[0] = first[extra:]
+                    self.tail_size -= extra
+                    self.dropped += extra
+
+    @property
+    def truncated(self) -> bool:
+        return self.dropped > 0
+
+    def text(self) -> str:
+        with self._lock:
+            head, tail = "".join(self.head), "".join(self.tail)
+            if self.dropped:
+                return f"{head}\n... [{self.dropped} chars truncated] ...\n{tail}"
+            return head + tail
+
+
+def kill_tree(proc: subprocess.Popen):
+    """Kill a shell and every process it started."""
+    if proc.poll() is not None: return
+    try:
+        if IS_WINDOWS:
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except Exception:
+        pass
+    try: proc.kill()
+    except Exception: pass
+
+
+class ShellService:
+    def __init__(self, timeout: float = None, max_output: int = None, max_concurrent: int = None):
+        from . import config
+        self.timeout = timeout if timeout is not None else config.SHELL_TIMEOUT
+        self.max_output = max_output if max_output is not None else config.SHELL_MAX_OUTPUT
+        self._slots = threading.BoundedSemaphore(max_concurrent if max_concurrent is not None else config.SHELL_MAX_CONCURRENT)
+
+    def run(self, command: str, timeout: float = None, on_output: Callable[[str, str], None] = None,
+            cwd: str = None, env: Dict[str, str] = None) -> Dict:
+        """
+        Run `command` through the system shell.
+        on_output(stream, line) is called from reader threads as lines arrive ("stdout"/"stderr").
+        Returns {"returncode", "output", "timed_out", "truncated", "duration"}.
+        """
+        timeout = timeout or self.timeout
+        start = time.time()
+        if not self._slots.acquire(timeout=timeout):
+            return {"returncode": None, "output": "Error: Too many shell commands running.",
+                    "timed_out": True, "truncated": False, "duration": time.time() - start}
+        try:
+            return self._run(command, timeout, on_output, cwd, env, start)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def var_ref(name: str) -> str:
+        """How a command refers to an environment variable passed via `env`."""
+        # cmd.exe runs with delayed expansion when env is given: !NAME! is read after parsing, so values can't inject syntax
+        return f"!{name}!" if IS_WINDOWS else f"${{{name}}}"
+
+    def _run(self, command, timeout, on_output, cwd, env, start) -> Dict:
+        kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if IS_WINDOWS else {"start_new_session": True}
+        shell = True
+        if env and IS_WINDOWS:
+            command, shell = f'{os.environ.get("COMSPEC", "cmd.exe")} /V:ON /S /C "{command}"', False
+        proc = subprocess.Popen(
+            command, shell=shell, stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding="utf-8", errors="replace", bufsize=1,
+            cwd=cwd, env={**os.environ, **env} if env else None, **kwargs
+        )
+        output = CappedOutput(self.max_output)
+
+        def pump(pipe, stream):
+            try:
+                for line in pipe:
+                    output.append(line)
+                    if on_output:
+                        try: on_output(stream, line)
+                        except Exception: pass
+            finally:
+                pipe.close()
+
+        readers = [threading.Thread(target=pump, args=(proc.stdout, "stdout"), daemon=True),
+                   threading.Thread(target=pump, args=(proc.stderr, "stderr"), daemon=True)]
+        for t in readers: t.start()
+
+        timed_out = False
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            print(f"{Fore.YELLOW}[!] Shell command timed out after {timeout}s, killing process tree.")
+            kill_tree(proc)
+            proc.wait()
+        # Grandchildren may hold the pipes open after the shell exits; don't wait on them forever
+        for t in readers: t.join(timeout=1.0)
+
+        text = output.text()
+        if timed_out:
+            text += f"\n[Timed out after {timeout}s]"
+        return {
+            "returncode": proc.returncode,
+            "output": text,
+            "timed_out": timed_out,
+            "truncated": output.truncated,
+            "duration": round(time.time() - start, 3)
+        }
+
+
+class PersistentShell:
+    """
+    A long-lived shell (bash on POSIX, PowerShell on Windows) fed over a pipe.
+
+    Each command is followed by a sentinel line carrying its exit code, so
+    back-to-back commands cost a pipe round-trip instead of a process spawn.
+    State such as the working directory persists between commands. The
+    session is restarted automatically if it dies or a command times out.
+    """
+    def __init__(self, timeout: float = None, max_output: int = None):
+        from . import config
+        self.timeout = timeout if timeout is not None else config.SHELL_TIMEOUT
+        self.max_output = max_output if max_output is not None else config.SHELL_MAX_OUTPUT
+        self.proc = None
+        self._lines = None
+        self._token = f"__MEWACT_DONE_{uuid.uuid4().hex}__"
+        self._done = re.compile(re.escape(self._token) + r" (-?\d+)\s*$")
+        self._lock = threading.Lock()
+
+    def _argv(self):
+        if IS_WINDOWS:
+            return ["powershell", "-NoLogo", "-NoProfile", "-NonInteractive", "-Command", "-"]
+        return ["bash", "--noprofile", "--norc"]
+
+    @staticmethod
+    def var_ref(name: str) -> str:
+        """How a command refers to an environment variable passed via `env`."""
+        return f"$env:{name}" if IS_WINDOWS else f"${{{name}}}"
+
+    @staticmethod
+    def _decode(text: str) -> str:
+        encoded = base64.b64encode(text.encode("utf-8")).decode("ascii")
+        return f"[Text.Encoding]::UTF8.GetString([Convert]::FromBase64String('{encoded}'))"
+
+    def _wrap(self, command: str, env: Dict[str, str] = None) -> str:
+        """One input line that sets `env`, runs `command` without letting it read our pipe, then prints the sentinel."""
+        env = env or {}
+        if IS_WINDOWS:
+            exports = "".join(f"$env:{k} = {self._decode(str(v))}; " for k, v in env.items())
+            block = f"[scriptblock]::Create({self._decode(command)})"
+            return (f"{exports}$global:LASTEXITCODE = 0; try {{ & ({block}) 2>&1 | Out-String -Stream }} "
+                    f"catch {{ $_ | Out-String -Stream }}; $__ok = $?; "
+                    f"Write-Output ('{self._token} ' + $(if ($LASTEXITCODE) {{ $LASTEXITCODE }} elseif ($__ok) {{ 0 }} else {{ 1 }}))\n")
+        exports = "".join(f"export {k}={shlex.quote(str(v))}; " for k, v in env.items())
+        return f"{exports}eval {shlex.quote(command)} </dev/null 2>&1; printf '%s %d\\n' '{self._token}' $?\n"
+
+    def _start(self):
+        kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if IS_WINDOWS else {"start_new_session": True}
+        self.proc = subprocess.Popen(
+            self._argv(), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, encoding="utf-8", errors="replace", bufsize=1, **kwargs
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._pump, args=(self.proc, self._lines), daemon=True).start()
+        print(f"{Fore.CYAN}[*] Persistent shell started ({self._argv()[0]}, PID {self.proc.pid})")
+
+    @staticmethod
+    def _pump(proc, lines):
+        for line in proc.stdout:
+            lines.put(line)
+        lines.put(None)  # EOF: shell exited
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def close(self):
+        if self.proc is not None:
+            kill_tree(self.proc)
+            self.proc = None
+
+    def run(self, command: str, timeout: float = None, on_output: Callable[[str, str], None] = None,
+            env: Dict[str, str] = None) -> Dict:
+        """Same contract as ShellService.run (stderr is merged into stdout)."""
+        timeout = timeout or self.timeout
+        with self._lock:
+            start = time.time()
+            if not self.alive:
+                self._start()
+            try:
+                self.proc.stdin.write(self._wrap(command, env))
+                self.proc.stdin.flush()
+            except (BrokenPipeError, OSError):
+                # Died between the liveness check and the write; one fresh attempt
+                self.close(); self._start()
+                self.proc.stdin.write(self._wrap(command, env))
+                self.proc.stdin.flush()
+
+            output = CappedOutput(self.max_output)
+            returncode, timed_out = None, False
+            deadline = start + timeout
+            while True:
+                try:
+                    line = self._lines.get(timeout=max(0.0, deadline - time.time()))
+                except queue.Empty:
+                    timed_out = True
+                    break
+                if line is None:  # Shell died mid-command (e.g. `exit`); restart on next call
+                    self.proc.wait()
+                    returncode = self.proc.returncode
+                    self.proc = None
+                    break
+                m = self._done.search(line)
+                if m:
+                    if line[:m.start()]: output.append(line[:m.start()])
+                    returncode = int(m.group(1))
+                    break
+                output.append(line)
+                if on_output:
+                    try: on_output("stdout", line)
+                    except Exception: pass
+
+            text = output.text()
+            if timed_out:
+                print(f"{Fore.YELLOW}[!] Shell command timed out after {timeout}s, restarting session.")
+                self.close()
+                text += f"\n[Timed out after {timeout}s]"
+            return {
+                "returncode": returncode,
+                "output": text,
+                "timed_out": timed_out,
+                "truncated": output.truncated,
+                "duration": round(time.time() - start, 3)
+            }
+
+# Shared service so the concurrency limit applies across the executor and MCP server
+SHELL = None
+_shell_lock = threading.Lock()
+
+def get_shell_service() -> ShellService:
+    global SHELL
+    with _shell_lock:
+        if SHELL is None:
+            SHELL = ShellService()
+        return SHELL
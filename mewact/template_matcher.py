@@ -0,0 +1,183 @@
+
+import os
+import re
+import numpy as np
+import cv2
+from typing import List, Dict, Optional, Tuple
+from colorama import Fore
+
+from .config import print
+
+# --- TEMPLATE MATCHING (CLICK BY SAMPLE IMAGE) ---
+# Templates are stored preprocessed (grayscale, several DPI scales, each with a
+# precomputed Gaussian pyramid) as one .npz per template. Matching runs
+# coarse-to-fine: the full search happens on the coarsest pyramid level and
+# only small windows around the best candidates are re-scored at finer levels.
+# cv2.matchTemplate switches to DFT-based correlation for large templates.
+
+DEFAULT_SCALES = (0.8, 1.0, 1.25, 1.5)
+MIN_COARSE_SIDE = 8   # Template side (px) below which a pyramid level is too coarse to be useful
+
+
+def _to_gray(img: np.ndarray) -> np.ndarray:
+    if img.ndim == 3:
+        code = cv2.COLOR_BGRA2GRAY if img.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        return cv2.cvtColor(img, code)
+    return img
+
+
+def _pyramid(gray: np.ndarray, levels: int) -> List[np.ndarray]:
+    pyr = [gray]
+    for _ in range(levels - 1):
+        if min(pyr[-1].shape[:2]) < 2 * MIN_COARSE_SIDE: break
+        pyr.append(cv2.pyrDown(pyr[-1]))
+    return pyr
+
+
+class TemplateLibrary:
+    """On-disk library of preprocessed templates with an in-memory cache."""
+    def __init__(self, directory: str = None, scales: Tuple[float, ...] = DEFAULT_SCALES, levels: int = 4):
+        from . import config
+        self.directory = directory if directory else config.TEMPLATE_DIR
+        self.scales = scales
+        self.levels = levels
+        self._cache = {}  # name -> [{"scale": s, "pyramid": [level0, level1, ...]}, ...]
+
+    def _path(self, name: str) -> str:
+        safe = re.sub(r"[^\w\-]", "_", name.strip().lower())
+        return os.path.join(self.directory, f"{safe}.npz")
+
+    def add(self, name: str, img: np.ndarray) -> Dict:
+        """Preprocess a sample image (BGR/BGRA/gray) and persist it."""
+        gray = _to_gray(img)
+        variants, arrays = [], {}
+        for i, s in enumerate(self.scales):
+            scaled = gray if s == 1.0 else cv2.resize(gray, None, fx=s, fy=s, interpolation=cv2.INTER_AREA if s < 1 else cv2.INTER_LINEAR)
+            pyr = _pyramid(scaled, self.levels)
+            variants.append({"scale": s, "pyramid": pyr})
+            for j, level in enumerate(pyr):
+                arrays[f"s{i}_l{j}"] = level
+
+        os.makedirs(self.directory, exist_ok=True)
+        np.savez(self._path(name), scales=np.array(self.scales, dtype=np.float32), **arrays)
+        self._cache[name.strip().lower()] = variants
+        print(f"{Fore.GREEN}[+] Template '{name}' saved ({gray.shape[1]}x{gray.shape[0]}, {len(self.scales)} scales)")
+        return {"name": name, "width": gray.shape[1], "height": gray.shape[0]}
+
+    def get(self, name: str) -> Optional[List[Dict]]:
+        key = name.strip().lower()
+        if key in self._cache: return self._cache[key]
+        path = self._path(name)
+        if not os.path.exists(path): return None
+        try:
+            with np.load(path) as data:
+                variants = []
+                for i, s in enumerate(data["scales"].tolist()):
+                    pyr, j = [], 0
+                    while f"s{i}_l{j}" in data.files:
+                        pyr.append(data[f"s{i}_l{j}"]); j += 1
+                    variants.append({"scale": s, "pyramid": pyr})
+            self._cache[key] = variants
+            return variants
+        except Exception as e:
+            print(f"{Fore.RED}[!] Failed to load template '{name}': {e}")
+            return None
+
+    def names(self) -> List[str]:
+        if not os.path.isdir(self.directory): return []
+        return sorted(f[:-4] for f in os.listdir(self.directory) if f.endswith(".npz"))
+
+    def remove(self, name: str) -> bool:
+        self._cache.pop(name.strip().lower(), None)
+        path = self._path(name)
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+
+
+class TemplateMatcher:
+    def __init__(self, library: TemplateLibrary, candidates: int = 3):
+        self.library = library
+        self.candidates = candidates  # Coarse peaks refined per scale
+
+    @staticmethod
+    def _top_peaks(scores: np.ndarray, k: int, suppress: Tuple[int, int]) -> List[Tuple[int, int]]:
+        scores = scores.copy()
+        peaks = []
+        sw, sh = max(1, suppress[0] // 2), max(1, suppress[1] // 2)
+        for _ in range(k):
+            _, max_val, _, (px, py) = cv2.minMaxLoc(scores)
+            if max_val <= -1: break
+            peaks.append((px, py))
+            scores[max(0, py - sh):py + sh + 1, max(0, px - sw):px + sw + 1] = -1
+        return peaks
+
+    def _match_variant(self, screen_pyr: List[np.ndarray], tpl_pyr: List[np.ndarray]) -> Tuple[float, int, int]:
+        """Coarse-to-fine search of one template scale. Returns (score, x, y) at level 0."""
+        # Coarsest level where both the template is still informative and the screen can contain it
+        top = min(len(screen_pyr), len(tpl_pyr)) - 1
+        while top > 0 and min(tpl_pyr[top].shape[:2]) < MIN_COARSE_SIDE: top -= 1
+        while top >= 0 and any(t > s for t, s in zip(tpl_pyr[top].shape[:2], screen_pyr[top].shape[:2])): top -= 1
+        if top < 0: return -1.0, 0, 0
+
+        tpl = tpl_pyr[top]
+        scores = cv2.matchTemplate(screen_pyr[top], tpl, cv2.TM_CCOEFF_NORMED)
+        peaks = self._top_peaks(scores, self.candidates, (tpl.shape[1], tpl.shape[0]))
+
+        best = (-1.0, 0, 0)
+        for px, py in peaks:
+            score = float(scores[py, px])
+            for level in range(top - 1, -1, -1):
+                # Project to the finer level and re-score a small window around it
+                px, py = px * 2, py * 2
+                scr, tpl = screen_pyr[level], tpl_pyr[level]
+                th, tw = tpl.shape[:2]
+                pad = 3
+                # Clamp the window inside the screen so matches at the border are still refined
+                x0, y0 = max(0, min(px - pad, scr.shape[1] - tw)), max(0, min(py - pad, scr.shape[0] - th))
+                x1 = min(scr.shape[1], px + tw + pad)
+                y1 = min(scr.shape[0], py + th + pad)
+                if x1 - x0 < tw or y1 - y0 < th:
+                    # Template larger than the screen at this level (pyramid rounding): keep the coarse estimate
+                    px, py = px << level, py << level
+                    break
+                local = cv2.matchTemplate(scr[y0:y1, x0:x1], tpl, cv2.TM_CCOEFF_NORMED)
+                _, score, _, (lx, ly) = cv2.minMaxLoc(local)
+                px, py = x0 + lx, y0 + ly
+            if score > best[0]:
+                best = (score, px, py)
+        return best
+
+    def match(self, screen: np.ndarray, name: str, region: Tuple[int, int, int, int] = None,
+              regions: List[Tuple[int, int, int, int]] = None, threshold: float = 0.8) -> Optional[Dict]:
+        """
+        Find template `name` in `screen` (BGR/BGRA/gray).
+        Search is limited to `region` (x, y, w, h) or to the union of `regions`
+        (e.g. dirty regions); coordinates in the result are screen coordinates.
+        """
+        variants = self.library.get(name)
+        if not variants: return None
+
+        gray = _to_gray(screen)
+        h, w = gray.shape[:2]
+        search = [region] if region else (regions if regions is not None else [(0, 0, w, h)])
+        max_tw = max(v["pyramid"][0].shape[1] for v in variants)
+        max_th = max(v["pyramid"][0].shape[0] for v in variants)
+
+        best = None
+        for rx, ry, rw, rh in search:
+            # Grow each region by the template size so partially changed matches are still found
+            x0, y0 = max(0, rx - max_tw), max(0, ry - max_th)
+            x1, y1 = min(w, rx + rw + max_tw), min(h, ry + rh + max_th)
+            if x1 <= x0 or y1 <= y0: continue
+            screen_pyr = _pyramid(gray[y0:y1, x0:x1], self.library.levels)
+            for v in variants:
+                score, px, py = self._match_variant(screen_pyr, v["pyramid"])
+                if score >= threshold and (best is None or score > best["score"]):
+                    th, tw = v["pyramid"][0].shape[:2]
+                    best = {
+                        "name": name, "score": round(score, 4), "scale": v["scale"],
+                        "x": x0 + px + tw // 2, "y": y0 + py + th // 2, "w": tw, "h": th
+                    }
+        return best
@@ -0,0 +1,129 @@
+
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Tuple
+from colorama import Fore
+
+from .config import print
+from .journal import write_json_atomic
+
+# --- MEMORY TRAINING PIPELINE ---
+# Embeds the library's commands into VectorMemory:
+#   stream    (name, text, metadata) from LibraryManager.library["commands"]
+#   skip      commands whose text is already trained (checkpoint: name -> text hash)
+#   embed     in batches; Ollama requests go over a bounded thread pool, the
+#             offline embedder takes the whole batch in one vectorised call
+#   write     one VectorMemory.add_many per batch, then checkpoint the batch.
+#             A retrained command's earlier row is deleted (tombstoned) in the
+#             same step, so stale text no longer matches.
+# An interrupted run resumes after the last checkpointed batch. Items written
+# after the checkpoint (crash between the two writes) are found from the rows
+# recorded in the checkpoint, so they are not added twice. Texts already counted
+# into the offline embedder's IDF are recorded too (name -> text hash), so a
+# resumed run doesn't count them again. Re-running on an unchanged library
+# embeds nothing.
+
+
+def command_text(name: str, data: Dict) -> str:
+    """Text to embed for a command: its name plus description, category and tags."""
+    tags = data.get("tags", "")
+    if isinstance(tags, (list, tuple)): tags = " ".join(map(str, tags))
+    parts = [name, data.get("description", ""), data.get("category", ""), tags]
+    return " ".join(str(p) for p in parts if p)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def iter_commands(lib_mgr) -> Iterator[Tuple[str, str, Dict]]:
+    for name, data in list(lib_mgr.library.get("commands", {}).items()):
+        if not isinstance(data, dict): continue
+        yield name, command_text(name, data), {"id": name, "command": data}
+
+
+class MemoryTrainer:
+    def __init__(self, lib_mgr, memory, checkpoint: str = None, batch_size: int = 64, workers: int = 8):
+        self.lib_mgr = lib_mgr
+        self.memory = memory
+        self.checkpoint = checkpoint or os.path.splitext(memory.storage_file)[0] + ".train.json"
+        self.batch_size = batch_size
+        self.workers = workers
+        self.state = self._load_checkpoint()
+
+    def _load_checkpoint(self) -> Dict:
+        state = {"rows": 0, "trained": {}, "observed": {}}
+        if os.path.exists(self.checkpoint):
+            try:
+                with open(self.checkpoint, "r", encoding="utf-8") as f: state.update(json.load(f))
+            except Exception as e:
+                print(f"{Fore.YELLOW}[!] Ignoring unreadable checkpoint {self.checkpoint}: {e}")
+        # Rows written after the last checkpoint (interrupted between store append and checkpoint)
+        rows = len(self.memory.data)
+        for i in range(min(state["rows"], rows), rows):
+            item = self.memory.data[i]
+            name = (item.get("metadata") or {}).get("id")
+            if isinstance(name, str): state["trained"][name] = text_hash(item.get("text", ""))
+        state["rows"] = rows
+        return state
+
+    def _save_checkpoint(self):
+        self.state["rows"] = len(self.memory.data)
+        write_json_atomic(self.checkpoint, self.state, indent=None)
+
+    def pending(self) -> List[Tuple[str, str, Dict]]:
+        trained = self.state["trained"]
+        return [c for c in iter_commands(self.lib_mgr) if trained.get(c[0]) != text_hash(c[1])]
+
+    def _stored_rows(self, names) -> Dict[str, List[int]]:
+        """Live rows already stored for `names` (earlier versions of retrained commands)."""
+        rows = {}
+        for i, item in enumerate(self.memory.data):
+            name = (item.get("metadata") or {}).get("id")
+            if isinstance(name, str) and name in names and not self.memory.is_deleted(i):
+                rows.setdefault(name, []).append(i)
+        return rows
+
+    def _observe(self, todo: List[Tuple[str, str, Dict]]):
+        """IDF over the whole batch set first, then frozen; each text is counted once across resumed runs."""
+        observed = self.state["observed"]
+        new = [(name, text) for name, text, _ in todo if observed.get(name) != text_hash(text)]
+        if not new: return
+        from .local_embed import get_local_embedder
+        embedder = get_local_embedder()
+        embedder.observe([text for _, text in new])
+        embedder.freeze()   # Every row trained from here on is weighted with this IDF
+        for name, text in new: observed[name] = text_hash(text)
+        self._save_checkpoint()
+
+    def run(self, progress: Callable[[int, int], None] = None) -> Dict:
+        """Train everything not yet in memory; returns counts and throughput."""
+        start = time.perf_counter()
+        todo = self.pending()
+        if todo and self.memory.embedding_backend() == "local": self._observe(todo)
+        retrained = {name for name, _, _ in todo if name in self.state["trained"]}
+        stale = self._stored_rows(retrained) if retrained else {}
+        stats = {"pending": len(todo), "added": 0, "replaced": 0, "failed": 0, "batches": 0}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for b in range(0, len(todo), self.batch_size):
+                batch = todo[b:b + self.batch_size]
+                vectors = self.memory.get_embeddings([text for _, text, _ in batch], pool=pool)
+                done = [(c, v) for c, v in zip(batch, vectors) if v]
+                if done and not self.memory.add_many([c[1] for c, _ in done], [c[2] for c, _ in done], [v for _, v in done]):
+                    done = []   # Rejected (embedding size doesn't fit the store): retried next run
+                stats["failed"] += len(batch) - len(done)
+                if done:
+                    old = [row for (name, _, _), _ in done for row in stale.pop(name, [])]
+                    if old: self.memory.remove_rows(old)
+                    stats["replaced"] += len(old)
+                    for (name, text, _), _ in done: self.state["trained"][name] = text_hash(text)
+                    self._save_checkpoint()
+                stats["added"] += len(done)
+                stats["batches"] += 1
+                if progress: progress(b + len(batch), len(todo))
+        stats["seconds"] = time.perf_counter() - start
+        stats["per_second"] = stats["added"] / stats["seconds"] if stats["seconds"] else 0.0
+        return stats
@@ -0,0 +1,104 @@
+
+import os
+import re
+import math
+import time
+import struct
+import threading
+from typing import Dict, Optional
+from colorama import Fore
+
+from .config import print
+
+# --- COMMAND USAGE STATISTICS ---
+# Per-command run/success counts and last-run time, kept in a flat file of
+# fixed-size records (one per command id). The id -> slot map is rebuilt by
+# scanning the file on load; recording an execution rewrites that one record
+# in place (seek + write), so an update costs the same however large the file.
+# The planner blends `prior()` into its BM25 scores so commands that ran (and
+# worked) recently win ties and near-ties, and ones that keep failing sink.
+
+RECORD = struct.Struct("<qIId")   # command id, runs, successes, last run (epoch seconds)
+_HISTORY_LINE = re.compile(r"^\[(.+?)\] CMD: (-?\d+) \|")
+
+
+class UsageStats:
+    def __init__(self, path: str, half_life_days: float = 14.0):
+        self.path = path
+        self.half_life = half_life_days * 86400.0
+        self._slots = {}    # cmd id -> slot
+        self._stats = {}    # cmd id -> [runs, successes, last]
+        self._lock = threading.Lock()
+        self._file = None
+        self._load()
+
+    def __len__(self):
+        return len(self._stats)
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f: raw = f.read()
+            whole = len(raw) - len(raw) % RECORD.size
+            for slot, (cid, runs, ok, last) in enumerate(RECORD.iter_unpack(raw[:whole])):
+                self._slots[cid] = slot
+                self._stats[cid] = [runs, ok, last]
+            if whole < len(raw):
+                # Torn final record from a crash mid-write
+                with open(self.path, "r+b") as f: f.truncate(whole)
+        self._file = open(self.path, "r+b" if os.path.exists(self.path) else "w+b", buffering=0)
+
+    def record(self, cmd_id, success: bool = True, when: float = None):
+        """Count one execution of `cmd_id`; rewrites a single record."""
+        if cmd_id is None: return
+        cid = int(cmd_id)
+        with self._lock:
+            stats = self._stats.setdefault(cid, [0, 0, 0.0])
+            stats[0] += 1
+            stats[1] += 1 if success else 0
+            stats[2] = when or time.time()
+            slot = self._slots.setdefault(cid, len(self._slots))
+            self._file.seek(slot * RECORD.size)
+            self._file.write(RECORD.pack(cid, *stats))
+
+    def get(self, cmd_id) -> Optional[Dict]:
+        stats = self._stats.get(cmd_id) if cmd_id is not None else None
+        if not stats: return None
+        return {"runs": stats[0], "successes": stats[1], "last_used": stats[2]}
+
+    def prior(self, cmd_id, now: float = None) -> float:
+        """-1..1: positive for commands that mostly work, negative for ones that mostly fail; grows with runs, fades with age."""
+        stats = self._stats.get(cmd_id) if cmd_id is not None else None
+        if not stats: return 0.0
+        runs, ok, last = stats
+        frequency = 1.0 - math.exp(-runs / 5.0)
+        success = (ok + 1.0) / (runs + 2.0)
+        recency = 0.5 ** (max(0.0, (now or time.time()) - last) / self.half_life)
+        return frequency * (2.0 * success - 1.0) * (0.5 + 0.5 * recency)
+
+    def seed(self, entries) -> int:
+        """Count past executions, (cmd id, epoch seconds) pairs; only when the stats file is new."""
+        if self._stats: return 0
+        count = 0
+        for cmd_id, when in entries:
+            try: self.record(int(cmd_id), True, when)
+            except (TypeError, ValueError): continue  # Reflexes and unknown commands log non-numeric ids
+            count += 1
+        if count: print(f"{Fore.CYAN}[*] Seeded usage stats from {count} history entries")
+        return count
+
+    def seed_from_history(self, history_path: str) -> int:
+        """Seed from the recording.txt history log."""
+        if self._stats or not os.path.exists(history_path): return 0
+        def entries():
+            with open(history_path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    m = _HISTORY_LINE.match(line)
+                    if not m: continue
+                    try: when = time.mktime(time.strptime(m.group(1), "%Y-%m-%d %H:%M:%S"))
+                    except ValueError: when = None
+                    yield m.group(2), when
+        return self.seed(entries())
+
+    def close(self):
+        with self._lock:
+            if self._file: self._file.close(); self._file = None
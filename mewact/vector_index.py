@@ -0,0 +1,108 @@
+
+import numpy as np
+from typing import List, Optional, Tuple
+from colorama import Fore
+
+from .config import print
+
+# --- VECTOR INDEX (EXACT COSINE) ---
+# Embeddings are L2-normalised once on insert and kept in one contiguous
+# float32 matrix that grows by doubling, so an add is amortised O(dim) and
+# never rebuilds what is already there. A search is one matrix-vector product
+# over the filled rows plus argpartition for the top k. All-zero rows are
+# placeholders for items without an embedding (or deleted items) and never
+# match: a row mask, extended lazily as rows are appended, scores them -inf
+# before the top-k selection, so they never take result slots.
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Row-wise L2 normalisation (zero rows stay zero)."""
+    vectors = np.asarray(vectors, np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first."""
+    if k >= len(scores): return np.argsort(-scores, kind="stable")
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def best_rows(scores: np.ndarray, live: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(rows, scores) of the k best live rows; dead rows are scored -inf so they never take a slot."""
+    scores = np.where(live, scores, -np.inf).astype(np.float32, copy=False)
+    rows = top_k(scores, k)
+    rows = rows[np.isfinite(scores[rows])]
+    return rows, scores[rows]
+
+
+class VectorIndex:
+    def __init__(self, dim: int = None, capacity: int = 1024):
+        self.dim = dim
+        self._matrix = np.zeros((capacity, dim), np.float32) if dim else None
+        self._count = 0
+        self._live, self._live_rows = np.zeros(0, bool), 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """View of the filled rows."""
+        return self._matrix[:self._count] if self._matrix is not None else np.zeros((0, self.dim or 0), np.float32)
+
+    def _reserve(self, extra: int):
+        need = self._count + extra
+        if self._matrix is None:
+            self._matrix = np.zeros((max(1024, need), self.dim), np.float32)
+        elif need > len(self._matrix):
+            grown = np.zeros((max(need, 2 * len(self._matrix)), self.dim), np.float32)
+            grown[:self._count] = self._matrix[:self._count]
+            self._matrix = grown
+
+    def add(self, vector) -> Optional[int]:
+        """Append one vector; returns its row (None if its dimension doesn't match the index)."""
+        rows = self.add_batch([vector])
+        return rows[0] if rows else None
+
+    def add_batch(self, vectors) -> List[int]:
+        vectors = np.asarray(vectors, np.float32)
+        if vectors.ndim != 2 or not len(vectors): return []
+        if self.dim is None: self.dim = vectors.shape[1]
+        if vectors.shape[1] != self.dim:
+            print(f"{Fore.YELLOW}[!] Embedding has {vectors.shape[1]} dims, index has {self.dim}; skipped")
+            return []
+        self._reserve(len(vectors))
+        start = self._count
+        self._matrix[start:start + len(vectors)] = normalize(vectors)
+        self._count += len(vectors)
+        return list(range(start, self._count))
+
+    def clear_rows(self, rows):
+        """Zero the given rows: they stay in place (row numbering is unchanged) but never match again."""
+        rows = np.asarray(rows, np.int64)
+        if len(rows) and self._matrix is not None: self._matrix[rows] = 0.0
+        self._mark_dead(rows)
+
+    def _mark_dead(self, rows):
+        rows = np.fromiter(rows, np.int64)
+        self._live[rows[rows < self._live_rows]] = False
+
+    def live(self) -> np.ndarray:
+        """Boolean mask over the filled rows: False for all-zero rows."""
+        n = len(self)
+        if n < self._live_rows: self._live_rows = n
+        if n > self._live_rows:
+            fresh = np.asarray(self.matrix[self._live_rows:n]).any(axis=1)
+            self._live = np.concatenate((self._live[:self._live_rows], fresh))
+            self._live_rows = n
+        return self._live[:n]
+
+    def search(self, query, k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, cosine scores) of the k nearest stored vectors, best first."""
+        if not self._count or query is None: return np.zeros(0, np.int64), np.zeros(0, np.float32)
+        q = normalize(np.asarray(query, np.float32).reshape(-1))
+        if q.shape[0] != self.dim: return np.zeros(0, np.int64), np.zeros(0, np.float32)
+        scores = self.matrix @ q
+        return best_rows(scores, self.live(), k)
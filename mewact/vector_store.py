@@ -0,0 +1,287 @@
+
+import os
+import json
+import struct
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from colorama import Fore
+
+from .config import print
+from .vector_index import VectorIndex, normalize
+
+# --- BINARY MEMORY STORE ---
+# VectorMemory on disk as two append-only files sharing one row numbering:
+#   <base>.vec         16-byte header (magic, version, dim) + normalised float32 rows
+#   <base>.meta.jsonl  one JSON line per item: {"text", "metadata", "timestamp"}
+# Opening memory-maps the vector file and locates line starts in the sidecar with
+# one vectorised newline scan; item metadata is parsed only when it is read.
+# Adding an item appends one row and one line, so neither cold start nor insert
+# cost grows with the size of the store. Items without an embedding get a zero
+# row (ignored by search) so row i is always item i. The vector row is written
+# before the metadata line; on open, a torn tail on either file is cut back so
+# the two stay aligned.
+# Deletes and metadata edits don't rewrite either file. A deleted item's vector
+# row is zeroed in place (search skips zero rows), and the edit is appended to
+#   <base>.edits.jsonl   {"row", "deleted": true} or {"row", "metadata": {...}}
+# which is replayed over the sidecar on open. compact() rewrites the store
+# without deleted items. The new files are written next to the old ones, and a
+# <base>.compact marker makes the swap roll forward after a crash. Files derived
+# from row numbers (ANN, quantised copies, usage) are dropped by the swap.
+
+HEADER = struct.Struct("<8sII")   # magic, version, dim
+MAGIC = b"MEWVEC\x00\x00"
+DERIVED = (".ivf.npy", ".ivf.assign", ".f16", ".i8", ".i8s", ".usage.npz")  # Keyed by row number
+COMPACT_BLOCK = 8192
+
+
+class VectorFile:
+    def __init__(self, path: str):
+        self.path = path
+        self.dim = None
+        self.rows = 0
+        self._map = None
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+            with open(path, "rb") as f:
+                magic, _, dim = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC: raise ValueError(f"{path} is not a vector file")
+            self.dim = dim
+            row_bytes = 4 * dim
+            self.rows = (os.path.getsize(path) - HEADER.size) // row_bytes
+            self.truncate(self.rows)  # Drop a partially written row
+
+    def truncate(self, rows: int):
+        self.rows = rows
+        self._map = None
+        if self.dim is not None:
+            with open(self.path, "r+b") as f: f.truncate(HEADER.size + rows * 4 * self.dim)
+
+    def zero_rows(self, rows):
+        if self.dim is None: return
+        width = 4 * self.dim
+        with open(self.path, "r+b") as f:
+            for r in sorted(int(r) for r in rows if r < self.rows):
+                f.seek(HEADER.size + r * width); f.write(b"\0" * width)
+
+    def matrix(self) -> Optional[np.ndarray]:
+        """Read-only memory map of the stored rows (remapped after appends)."""
+        if not self.rows: return None
+        if self._map is None or len(self._map) != self.rows:
+            self._map = np.memmap(self.path, np.float32, "r", offset=HEADER.size, shape=(self.rows, self.dim))
+        return self._map
+
+    def append(self, rows: np.ndarray):
+        rows = np.ascontiguousarray(rows, np.float32)
+        if self.dim is None:
+            self.dim = rows.shape[1]
+            with open(self.path, "wb") as f: f.write(HEADER.pack(MAGIC, 1, self.dim))
+        with open(self.path, "ab") as f:
+            f.write(rows.tobytes())
+        self.rows += len(rows)
+
+
+class MappedVectorIndex(VectorIndex):
+    """VectorIndex whose matrix is the memory-mapped vector file; adds append to the file."""
+    def __init__(self, path: str):
+        self.file = VectorFile(path)
+        self.dim = self.file.dim
+        self._matrix = None
+        self._live, self._live_rows = np.zeros(0, bool), 0
+
+    def __len__(self):
+        return self.file.rows
+
+    @property
+    def _count(self):
+        return self.file.rows
+
+    @property
+    def matrix(self) -> np.ndarray:
+        m = self.file.matrix()
+        return m if m is not None else np.zeros((0, self.dim or 0), np.float32)
+
+    def add_batch(self, vectors) -> List[int]:
+        vectors = np.asarray(vectors, np.float32)
+        if vectors.ndim != 2 or not len(vectors): return []
+        if self.dim is None: self.dim = vectors.shape[1]
+        if vectors.shape[1] != self.dim:
+            print(f"{Fore.YELLOW}[!] Embedding has {vectors.shape[1]} dims, index has {self.dim}; skipped")
+            return []
+        start = self.file.rows
+        self.file.append(normalize(vectors))
+        return list(range(start, self.file.rows))
+
+    def clear_rows(self, rows):
+        self.file.zero_rows(rows)
+        self._mark_dead(rows)
+
+
+class MetaLog:
+    """Append-only JSON-lines sidecar with lazy, indexed reads."""
+    def __init__(self, path: str, cache_size: int = 4096):
+        self.path = path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.overrides = {}   # line -> fields laid over the stored item (edits)
+        # Line i spans _starts[i]:_starts[i+1]; the buffer grows by doubling so appends stay O(1)
+        ends = np.zeros(0, np.int64)
+        if os.path.exists(path):
+            raw = np.fromfile(path, np.uint8)
+            ends = np.flatnonzero(raw == 10) + 1
+            if len(raw) and (not len(ends) or ends[-1] != len(raw)):
+                with open(path, "r+b") as f: f.truncate(int(ends[-1]) if len(ends) else 0)  # Torn last line
+        self._count = len(ends)
+        self._starts = np.zeros(max(1024, 2 * (self._count + 1)), np.int64)
+        self._starts[1:self._count + 1] = ends
+        self._file = open(path, "a+b")
+
+    def __len__(self):
+        return self._count
+
+    def truncate(self, count: int):
+        with self._lock:
+            self._file.truncate(int(self._starts[count]))
+            self._count = count
+            self._cache.clear()
+
+    def __getitem__(self, i: int) -> Dict:
+        if i < 0: i += len(self)
+        if not 0 <= i < len(self): raise IndexError(i)
+        with self._lock:
+            item = self._cache.get(i)
+            if item is None:
+                start, end = int(self._starts[i]), int(self._starts[i + 1])
+                self._file.seek(start)
+                item = json.loads(self._file.read(end - start))
+                self._cache[i] = item
+                if len(self._cache) > self.cache_size: self._cache.popitem(last=False)
+            else:
+                self._cache.move_to_end(i)
+        override = self.overrides.get(i)
+        return {**item, **override} if override else item
+
+    def close(self):
+        self._file.close()
+
+    def __iter__(self):
+        for i in range(len(self)): yield self[i]
+
+    def extend(self, items: List[Dict]):
+        lines = [json.dumps(item).encode("utf-8") + b"\n" for item in items]
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(b"".join(lines))
+            self._file.flush()
+            need = self._count + len(lines) + 1
+            if need > len(self._starts):
+                grown = np.zeros(max(need, 2 * len(self._starts)), np.int64)
+                grown[:self._count + 1] = self._starts[:self._count + 1]
+                self._starts = grown
+            self._starts[self._count + 1:need] = self._starts[self._count] + np.cumsum([len(l) for l in lines])
+            self._count += len(lines)
+
+    def append(self, item: Dict):
+        self.extend([item])
+
+
+class MemoryStore:
+    def __init__(self, base: str):
+        self.base = base
+        self._finish_compaction()
+        self.index = MappedVectorIndex(base + ".vec")
+        self.items = MetaLog(base + ".meta.jsonl")
+        # Re-align after a crash: extra rows are dropped, missing rows become zero rows
+        rows, count = len(self.index), len(self.items)
+        if rows > count:
+            self.index.file.truncate(count)
+        elif rows < count and self.index.dim:
+            self.index.add_batch(np.zeros((count - rows, self.index.dim), np.float32))
+        self.deleted = set()
+        self.edits = MetaLog(base + ".edits.jsonl", cache_size=0)
+        for edit in self.edits:
+            row = edit.get("row", -1)
+            if not 0 <= row < count: continue
+            if edit.get("deleted"): self.deleted.add(row)
+            if "metadata" in edit: self.items.overrides.setdefault(row, {})["metadata"] = edit["metadata"]
+        for row in self.deleted: self.items.overrides.setdefault(row, {})["deleted"] = True
+        if self.deleted: self.index.clear_rows(self.deleted)  # Idempotent; covers a crash mid-delete
+
+    def _finish_compaction(self):
+        marker = self.base + ".compact"
+        if not os.path.exists(marker): return
+        for suffix in (".vec", ".meta.jsonl"):
+            if os.path.exists(self.base + ".compacted" + suffix): os.replace(self.base + ".compacted" + suffix, self.base + suffix)
+        for suffix in DERIVED + (".edits.jsonl",):
+            if os.path.exists(self.base + suffix): os.remove(self.base + suffix)
+        os.remove(marker)
+
+    def remove(self, rows: List[int]):
+        """Delete items: vector rows are zeroed first, then the tombstones are logged."""
+        rows = [int(r) for r in rows if 0 <= r < len(self.items) and r not in self.deleted]
+        if not rows: return
+        self.index.clear_rows(rows)
+        self.edits.extend([{"row": r, "deleted": True} for r in rows])
+        self.deleted.update(rows)
+        for r in rows: self.items.overrides.setdefault(r, {})["deleted"] = True
+
+    def update_metadata(self, row: int, metadata: Dict):
+        self.edits.append({"row": row, "metadata": metadata})
+        self.items.overrides.setdefault(row, {})["metadata"] = metadata
+
+    def compact(self) -> np.ndarray:
+        """Rewrite the store without deleted items; returns the surviving old row numbers (new row i = old keep[i])."""
+        count = len(self.items)
+        keep = np.array([r for r in range(count) if r not in self.deleted], np.int64)
+        tmp_vec, tmp_meta = self.base + ".compacted.vec", self.base + ".compacted.meta.jsonl"
+        for path in (tmp_vec, tmp_meta):
+            if os.path.exists(path): os.remove(path)
+        vec_out = VectorFile(tmp_vec)
+        matrix = self.index.file.matrix()
+        with open(tmp_meta, "wb") as meta_out:
+            for start in range(0, len(keep), COMPACT_BLOCK):
+                rows = keep[start:start + COMPACT_BLOCK]
+                if matrix is not None: vec_out.append(np.asarray(matrix[rows]))
+                merged = [{k: v for k, v in self.items[int(r)].items() if k != "deleted"} for r in rows]
+                meta_out.write(b"".join(json.dumps(item).encode("utf-8") + b"\n" for item in merged))
+            meta_out.flush(); os.fsync(meta_out.fileno())
+        if matrix is not None and not len(keep): vec_out.append(np.zeros((0, self.index.dim), np.float32))
+        self.items.close(); self.edits.close()
+        self.index.file._map = None
+        with open(self.base + ".compact", "w") as f: f.write(str(len(keep)))
+        self._finish_compaction()
+        self.__init__(self.base)
+        return keep
+
+    def __len__(self):
+        return len(self.items)
+
+    def append_many(self, entries: List[Dict], vectors: List):
+        """Write items and their vectors (None for none) in one append per file."""
+        if not entries: return
+        given = [v for v in vectors if v is not None]
+        dims = {len(v) for v in given} | ({self.index.dim} if self.index.dim is not None and given else set())
+        if len(dims) > 1: raise ValueError(f"Embedding dimensions {sorted(dims)} don't match; nothing written")
+        if self.index.dim is None and given:
+            self.index.dim = len(given[0])
+            if len(self.items):  # Earlier items had no vector yet
+                self.index.add_batch(np.zeros((len(self.items), self.index.dim), np.float32))
+        if self.index.dim is not None:
+            block = np.zeros((len(entries), self.index.dim), np.float32)
+            for i, v in enumerate(vectors):
+                if v is not None: block[i] = v
+            self.index.add_batch(block)
+        self.items.extend(entries)
+
+    def migrate_json(self, json_path: str) -> int:
+        """One-time import of a legacy memory_store.json (list of {text, vector, metadata, timestamp})."""
+        with open(json_path, "r", encoding="utf-8") as f: data = json.load(f)
+        entries = [{"text": d.get("text", ""), "metadata": d.get("metadata") or {}, "timestamp": d.get("timestamp")} for d in data]
+        vectors = [d.get("vector") or None for d in data]
+        dims = {len(v) for v in vectors if v}
+        if len(dims) > 1:
+            dim = len(next(v for v in vectors if v))
+            vectors = [v if v and len(v) == dim else None for v in vectors]
+        self.append_many(entries, vectors)
+        return len(entries)
@@ -1,5 +1,6 @@
 import sys
 import os
+import asyncio
 import threading
 import socket
 import winsound
@@ -10,12 +11,13 @@ import time
 import math
 import random
 import ctypes
+import subprocess
 
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from mcp.server.fastmcp import FastMCP
+    from mcp.server.fastmcp import FastMCP, Context
 except ImportError:
     print("ERROR: MCP library not installed. Run: pip install mcp")
     sys.exit(1)
@@ -55,6 +57,10 @@ except ImportError:
     PYWINAUTO_AVAILABLE = False
 
 from mewact import PerceptionEngine, ActionExecutor, LibraryManager, SessionManager
+from mewact.element_detector import changed_regions
+from mewact.template_matcher import TemplateLibrary, TemplateMatcher
+from mewact.shell import get_shell_service
+from mewact.lanes import build_lanes, lane
 import mewact.config as mewact_config
 mewact_config.MCP_MODE = True
 
@@ -69,15 +75,29 @@ _lib_mgr = None
 _executor = None
 _session_mgr = None
 _last_ui_elements = {}  # Cache for Smart Screenshots
+_last_screenshot = None  # Last capture_screen image (same frame as _last_ui_elements)
 _last_scale_factor = 1.0  # For coordinate translation
-_action_lock = threading.Lock()
+_last_frame_gray = None  # Last observed frame (grayscale) for change detection
+_template_matcher = None
+_frame_lock = threading.Lock()  # Guards _last_frame_gray, _last_screenshot/_last_ui_elements and the element detector cache
+_init_lock = threading.Lock()   # Lazy component loading may race between worker threads
+
+# --- CONCURRENCY LANES ---
+# observe (concurrent reads), action (serialised input) and work (long jobs); see mewact/lanes.py
+_LANES = build_lanes(mewact_config.MCP_OBSERVE_WORKERS, mewact_config.MCP_WORK_WORKERS)
+
+def _lane(name: str, timeout: float, on_timeout=None):
+    """Run a blocking tool body as an async tool on lane `name` with a deadline."""
+    return lane(_LANES, name, timeout, on_timeout)
 
 # --- HELPER FUNCTIONS ---
 
 def _get_components():
     """Lazy load MewAct components."""
     global _perception, _lib_mgr, _executor, _session_mgr
-    if _perception is None:
+    with _init_lock:
+        if _perception is not None:
+            return _perception, _lib_mgr, _executor, _session_mgr
         base_dir = os.path.dirname(os.path.abspath(__file__))
         _perception = PerceptionEngine()
         _lib_mgr = LibraryManager(os.path.join(base_dir, "command_library.json"))
@@ -85,7 +105,29 @@ def _get_components():
         _session_mgr = SessionManager(os.path.join(base_dir, "session_memory.json"))
     return _perception, _lib_mgr, _executor, _session_mgr
 
-    return _perception, _lib_mgr, _executor, _session_mgr
+def _get_template_matcher() -> TemplateMatcher:
+    """Lazy load the icon template library."""
+    global _template_matcher
+    with _init_lock:
+        if _template_matcher is not None:
+            return _template_matcher
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        library = TemplateLibrary(os.path.join(base_dir, mewact_config.TEMPLATE_DIR))
+        _template_matcher = TemplateMatcher(library)
+    return _template_matcher
+
+def _grab_primary() -> np.ndarray:
+    """Fast BGRA grab of the primary monitor (same origin as pyautogui)."""
+    with mss.mss() as sct:
+        return np.array(sct.grab(sct.monitors[1]))
+
+def _observe_frame(gray: np.ndarray) -> list:
+    """Record the latest frame and return regions (x, y, w, h) that changed since the previous one."""
+    global _last_frame_gray
+    with _frame_lock:
+        regions = changed_regions(_last_frame_gray, gray, tile=64)
+        _last_frame_gray = gray
+    return regions
 
 
 def _play_sound(sound_type: str):
@@ -126,6 +168,11 @@ def _physical_to_normalized(x: int, y: int) -> tuple:
     y_norm = int((y / screen_h) * 1000)
     return x_norm, y_norm
 
+def _physical_to_logical(x: int, y: int, frame_shape: tuple) -> tuple:
+    """Convert mss capture pixels to pyautogui coordinates (they differ under HiDPI scaling)."""
+    screen_w, screen_h = pyautogui.size()
+    return int(x * screen_w / frame_shape[1]), int(y * screen_h / frame_shape[0])
+
 def _optimize_image(img: Image.Image) -> str:
     """Resize/compress image for VLM optimization."""
     # Resize if too large
@@ -166,6 +213,7 @@ def _smooth_move(target_x, target_y, duration=0.3):
 mcp = FastMCP("MewAct Desktop v2")
 
 @mcp.tool()
+@_lane("observe", timeout=mewact_config.MCP_OBSERVE_TIMEOUT)
 def capture_screen(annotate: bool = True, use_uia: bool = True) -> dict:
     """
     📸 Capture the current screen and return clickable elements.
@@ -174,99 +222,210 @@ def capture_screen(annotate: bool = True, use_uia: bool = True) -> dict:
         annotate (bool): If True, returns a base64 image with bounding boxes drawn.
         use_uia (bool): If True, uses Windows UI Automation for better element detection.
     """
-    global _last_ui_elements, _last_scale_factor
+    global _last_ui_elements, _last_scale_factor, _last_screenshot
     
     _play_sound("click")
     
-    with _action_lock:
-        try:
-            perception, _, _, _ = _get_components()
-            
-            # 1. Capture Logic
-            screenshot_path = "mcp_capture.png" 
-            # Note: PerceptionEngine usually handles this, but here we might need direct calls
-            # For simplicity, we use existing PerceptionEngine methods if available, or direct logic.
-            # mewact_legacy.PerceptionEngine has capture_window() logic.
-            
-            # Reusing legacy logic through _perception
-            # But wait, PerceptionEngine needs configuration.
-            # We lazy loaded it.
-            
-            # Simple implementation for now to verify MCP server stability
-            # We can expand to full logic once stability is confirmed.
-            
-            screen_w, screen_h = pyautogui.size()
-            screenshot = pyautogui.screenshot()
-            
-            # Store for VLM
-            global _last_screenshot
-            _last_screenshot = screenshot
-            
-            elements = []
-            if use_uia and PYWINAUTO_AVAILABLE:
-                # Mock UIA for now to avoid complexity in this step
-                pass
-            
-            # Add simple image return
-            img_b64 = _optimize_image(screenshot)
-            
-            return {
-                "width": screen_w,
-                "height": screen_h,
-                "image": img_b64, 
-                "elements": elements,
-                "message": "Screen captured successfully"
-            }
-            
-        except Exception as e:
-            _play_sound("error")
-            return {"error": str(e)}
+    try:
+        perception, _, _, _ = _get_components()
+        
+        # 1. Capture Logic
+        screenshot_path = "mcp_capture.png" 
+        # Note: PerceptionEngine usually handles this, but here we might need direct calls
+        # For simplicity, we use existing PerceptionEngine methods if available, or direct logic.
+        # mewact_legacy.PerceptionEngine has capture_window() logic.
+        
+        # Reusing legacy logic through _perception
+        # But wait, PerceptionEngine needs configuration.
+        # We lazy loaded it.
+        
+        # Simple implementation for now to verify MCP server stability
+        # We can expand to full logic once stability is confirmed.
+        
+        screen_w, screen_h = pyautogui.size()
+        screenshot = pyautogui.screenshot()
+        
+        _observe_frame(cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2GRAY))
+        
+        elements, ui_elements = [], {}
+        if use_uia and PYWINAUTO_AVAILABLE:
+            # Mock UIA for now to avoid complexity in this step
+            pass
+
+        # Non-text controls (icons, checkboxes) via classical-CV detector
+        if mewact_config.ELEMENT_DETECTION:
+            frame = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+            with _frame_lock:
+                detected = perception.element_detector.detect(frame, key="mcp_screen")
+            for i, el in enumerate(detected):
+                ui_elements[i] = el
+                elements.append({"id": i, "x": el["x"], "y": el["y"], "w": el["w"], "h": el["h"], "kind": el["kind"]})
+
+        # Store for VLM: screenshot and elements change together, so overlapping captures never mix frames
+        with _frame_lock:
+            _last_screenshot, _last_ui_elements = screenshot, ui_elements
+
+        # Add simple image return
+        img_b64 = _optimize_image(screenshot)
+        
+        return {
+            "width": screen_w,
+            "height": screen_h,
+            "image": img_b64, 
+            "elements": elements,
+            "message": "Screen captured successfully"
+        }
+        
+    except Exception as e:
+        _play_sound("error")
+        return {"error": str(e)}
 
 @mcp.tool()
+@_lane("action", timeout=mewact_config.MCP_ACTION_TIMEOUT)
 def execute_command(command_id: str, params: str = "") -> str:
     """
     ⚔️ Execute a specific command by ID from the command library.
     
     Args:
         command_id (str): The ID of the command (e.g., "200" for focus window).
-        params (str): Optional parameters for the command.
+        params (str): Optional parameters for the command. Fills __VAR__; space-separated
+                      parts also fill __VAR1__, __VAR2__, ...
     """
-    with _action_lock:
-        try:
-            _, _, executor, _ = _get_components()
-            # Simple parsing of params - in real usage, might need smarter parsing
-            param_list = params.split(" ") if params else []
-            result = executor.execute_action({"id": command_id, "params": param_list})
-            _play_sound("success")
-            return f"Executed {command_id}: {result}"
-        except Exception as e:
-            _play_sound("error")
-            return f"Error executing {command_id}: {e}"
+    try:
+        _, _, executor, _ = _get_components()
+        values = {"VAR": params}
+        values.update({f"VAR{i}": part for i, part in enumerate(params.split(), 1)})
+        result = executor.execute_command(command_id, values)
+        _play_sound("success" if result else "error")
+        return f"Executed {command_id}: {'Success' if result else 'Failed'}"
+    except Exception as e:
+        _play_sound("error")
+        return f"Error executing {command_id}: {e}"
 
 @mcp.tool()
+@_lane("observe", timeout=mewact_config.MCP_OBSERVE_TIMEOUT)
+def list_commands(query: str = "", page: int = 1, page_size: int = 20) -> dict:
+    """
+    📖 Search the command library (BM25 over names, descriptions and categories).
+    An empty query lists every command in ID order.
+    
+    Args:
+        query (str): Search words, e.g. "browser" or "open new tab".
+        page (int): 1-based page number.
+        page_size (int): Results per page (max 100).
+    """
+    _, lib_mgr, _, _ = _get_components()
+    page, page_size = max(1, page), max(1, min(page_size, 100))
+    offset = (page - 1) * page_size
+    cmds = lib_mgr.library["commands"]
+    if query.strip():
+        hits, total = lib_mgr.index.ranked(query, k=page_size, offset=offset)
+    else:
+        names = sorted((n for n, d in cmds.items() if isinstance(d, dict)), key=lambda n: cmds[n].get("id") or 0)
+        hits, total = [{"name": n, "score": None} for n in names[offset:offset + page_size]], len(names)
+    results = [{"id": cmds[h["name"]].get("id"), "name": h["name"], "type": cmds[h["name"]].get("type", "python"),
+                "description": cmds[h["name"]].get("description", ""), "score": h["score"]} for h in hits]
+    return {"query": query, "page": page, "page_size": page_size, "total": total, "results": results}
+
+@mcp.tool()
+@_lane("action", timeout=mewact_config.MCP_ACTION_TIMEOUT)
 def type_text(text: str) -> str:
     """
     ⌨️ Type text at the current cursor position.
     """
     _play_sound("type")
-    with _action_lock:
-        try:
-            pyautogui.write(text, interval=0.005)
-            # Paste support for efficiency could be added here
-            return "Text typed successfully"
-        except Exception as e:
-            return f"Error typing: {e}"
+    try:
+        pyautogui.write(text, interval=0.005)
+        # Paste support for efficiency could be added here
+        return "Text typed successfully"
+    except Exception as e:
+        return f"Error typing: {e}"
 
 @mcp.tool()
+@_lane("observe", timeout=mewact_config.MCP_OBSERVE_TIMEOUT, on_timeout=True)
 def check_screen_changed() -> bool:
     """
     👀 Check if the screen content has changed significantly since last capture.
     """
-    global _last_screwenshot
-    # Not implemented fully in this restoration step to save space, but stubbed.
-    return True
+    try:
+        frame = _grab_primary()
+        return bool(_observe_frame(cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)))
+    except Exception:
+        return True
+
+@mcp.tool()
+@_lane("observe", timeout=mewact_config.MCP_OBSERVE_TIMEOUT)
+def save_image_template(name: str, x: int, y: int, width: int, height: int) -> str:
+    """
+    🖼️ Save a screen region (physical pixels) as a named icon template for find_image/click_image.
+    """
+    try:
+        frame = _grab_primary()
+        sample = frame[y:y + height, x:x + width]
+        if sample.size == 0:
+            return "Error: Region is empty or off-screen."
+        info = _get_template_matcher().library.add(name, sample)
+        return f"Template '{name}' saved ({info['width']}x{info['height']})"
+    except Exception as e:
+        return f"Error saving template: {e}"
+
+@mcp.tool()
+@_lane("observe", timeout=mewact_config.MCP_OBSERVE_TIMEOUT)
+def find_image(name: str, x: int = 0, y: int = 0, width: int = 0, height: int = 0,
+               changed_only: bool = False, threshold: float = 0.0) -> dict:
+    """
+    🔎 Locate a saved icon template on screen.
+
+    Args:
+        name (str): Template name (see save_image_template).
+        x, y, width, height (int): Optional search region hint in physical pixels.
+        changed_only (bool): Only search regions that changed since the last observation.
+        threshold (float): Minimum match score (0 = config default).
+
+    Returns x/y in physical pixels, x_logical/y_logical in mouse coordinates and x_norm/y_norm (0-1000).
+    """
+    return _find_image(name, x, y, width, height, changed_only, threshold)
+
+def _find_image(name, x=0, y=0, width=0, height=0, changed_only=False, threshold=0.0) -> dict:
+    try:
+        matcher = _get_template_matcher()
+        if matcher.library.get(name) is None:
+            return {"error": f"Unknown template '{name}'", "templates": matcher.library.names()}
+
+        frame = _grab_primary()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
+        dirty = _observe_frame(gray)
+        region = (x, y, width, height) if width > 0 and height > 0 else None
+        regions = dirty if changed_only and region is None else None
+
+        match = matcher.match(gray, name, region=region, regions=regions,
+                              threshold=threshold or mewact_config.TEMPLATE_THRESHOLD)
+        if not match:
+            return {"found": False, "name": name}
+        match["found"] = True
+        match["x_logical"], match["y_logical"] = _physical_to_logical(match["x"], match["y"], gray.shape)
+        match["x_norm"], match["y_norm"] = _physical_to_normalized(match["x_logical"], match["y_logical"])
+        return match
+    except Exception as e:
+        return {"error": str(e)}
 
 @mcp.tool()
+@_lane("action", timeout=mewact_config.MCP_ACTION_TIMEOUT)
+def click_image(name: str, x: int = 0, y: int = 0, width: int = 0, height: int = 0) -> str:
+    """
+    🖱️ Find a saved icon template on screen and click its centre.
+    """
+    match = _find_image(name, x, y, width, height)
+    if not match.get("found"):
+        _play_sound("error")
+        return match.get("error") or f"Template '{name}' not found on screen."
+    _smooth_move(match["x_logical"], match["y_logical"])
+    pyautogui.click()
+    _play_sound("click")
+    return f"Clicked '{name}' at ({match['x_logical']}, {match['y_logical']}) score={match['score']}"
+
+@mcp.tool()
+@_lane("observe", timeout=mewact_config.MCP_OBSERVE_TIMEOUT)
 def get_screen_info() -> str:
     """
     ℹ️ Return screen resolution and DPI scaling details.
@@ -276,26 +435,54 @@ def get_screen_info() -> str:
     return f"Screen: {w}x{h}, DPI Scale: {scale:.2f}"
 
 @mcp.tool()
-def run_shell(command: str) -> str:
+async def run_shell(command: str, timeout: int = 0, ctx: Context = None) -> str:
     """
     ℹ️ Execute a raw shell command and return its output.
     Useful for getting system info, file listings, etc.
+    Output is streamed as log/progress notifications while the command runs;
+    the command is killed after `timeout` seconds (0 = config default) and
+    long output is truncated in the middle.
     """
+    loop = asyncio.get_running_loop()
+    pending, state = [], {"lines": 0, "flushed": time.time()}
+    pending_lock = threading.Lock()
+
+    def flush():
+        with pending_lock:
+            if not pending: return
+            chunk = "".join(pending)
+            pending.clear()
+            lines = state["lines"]
+        asyncio.run_coroutine_threadsafe(ctx.info(chunk.rstrip()), loop)
+        asyncio.run_coroutine_threadsafe(ctx.report_progress(lines), loop)
+
+    def on_output(stream, line):
+        # Called from reader threads; batch lines so chatty commands don't flood the client
+        with pending_lock:
+            pending.append(line)
+            state["lines"] += 1
+            due = time.time() - state["flushed"] >= 0.5
+            if due: state["flushed"] = time.time()
+        if due: flush()
+
+    def run():
+        result = get_shell_service().run(command, timeout=timeout or None,
+                                         on_output=on_output if ctx else None)
+        if ctx: flush()
+        return result
+
     try:
-        result = subprocess.run(
-            command, 
-            shell=True, 
-            capture_output=True, 
-            text=True, 
-            encoding='utf-8', 
-            errors='replace'
-        )
-        output = result.stdout + result.stderr
-        return output.strip() or "[No Output]"
+        pool, _ = _LANES["work"]
+        result = await loop.run_in_executor(pool, run)
+        output = result["output"].strip() or "[No Output]"
+        if result["returncode"] not in (0, None):
+            output += f"\n[Exit code {result['returncode']}]"
+        return output
     except Exception as e:
         return f"Error: {e}"
 
 @mcp.tool()
+@_lane("action", timeout=mewact_config.MCP_ACTION_TIMEOUT)
 def execute_script(code: str) -> str:
     """
     ℹ️ Execute arbitrary Python code in the agent's environment.
@@ -322,6 +509,7 @@ def execute_script(code: str) -> str:
         return f"Error: {e}"
 
 @mcp.tool()
+@_lane("work", timeout=mewact_config.MCP_WORK_TIMEOUT)
 def describe_screen(prompt: str = "Describe the current UI state.") -> str:
     """
     ℹ️ Use Vision Language Model (Moondream) to describe the screen.
@@ -341,6 +529,7 @@ def describe_screen(prompt: str = "Describe the current UI state.") -> str:
 
 
 @mcp.tool()
+@_lane("work", timeout=mewact_config.MCP_WORK_TIMEOUT)
 def achieve_goal(goal: str) -> str:
     """
     🤖 AUTONOMY AGENT: Achieve a high-level goal using Vision, Memory, and Planning.
@@ -348,12 +537,19 @@ def achieve_goal(goal: str) -> str:
     """
     perception, executor, lib_mgr, planner = _get_components()
     
-    # Generate Plan
+    # Generate Plan (LLM/VLM work: observations keep running meanwhile)
     plan = planner.plan_goal(goal)
     if not plan:
         return "Failed to generate plan. Check Ollama connection or model availability."
     
-    # Execute Plan
+    # Execute Plan under the action lane's guard, like any other input tool
+    _, action_guard = _LANES["action"]
+    with action_guard():
+        return "\n".join(_run_plan(plan, executor))
+
+
+def _run_plan(plan, executor) -> list:
+    """Carry out planner steps; returns the report lines."""
     report = []
     for step in plan:
         action = step.get('action')
@@ -384,12 +580,13 @@ def achieve_goal(goal: str) -> str:
             report.append(f"Error: {e}")
             break
             
-    return "\n".join(report)
+    return report
 
 
 # --- MOBILE TOOLS ---
 
 @mcp.tool()
+@_lane("work", timeout=mewact_config.MCP_WORK_TIMEOUT)
 def mobile_screenshot() -> str:
     """
     📱 MOBILE: Capture and describe the Android phone screen.
@@ -438,6 +635,7 @@ def mobile_screenshot() -> str:
         return f"Mobile Vision Error: {e}"
 
 @mcp.tool()
+@_lane("work", timeout=mewact_config.MCP_WORK_TIMEOUT)
 def mobile_tap(x: int, y: int) -> str:
     """📱 MOBILE: Tap the phone screen at (x, y)."""
     try:
@@ -448,6 +646,7 @@ def mobile_tap(x: int, y: int) -> str:
     except Exception as e: return f"Error: {e}"
 
 @mcp.tool()
+@_lane("work", timeout=mewact_config.MCP_WORK_TIMEOUT)
 def mobile_home() -> str:
     """📱 MOBILE: Press HOME button."""
     from mewact.mobile import MobileController
@@ -455,6 +654,7 @@ def mobile_home() -> str:
     return "Pressed HOME"
     
 @mcp.tool()
+@_lane("work", timeout=mewact_config.MCP_WORK_TIMEOUT)
 def mobile_back() -> str:
     """📱 MOBILE: Press BACK button."""
     from mewact.mobile import MobileController
@@ -462,6 +662,7 @@ def mobile_back() -> str:
     return "Pressed BACK"
 
 @mcp.tool()
+@_lane("work", timeout=mewact_config.MCP_WORK_TIMEOUT)
 def mobile_type(text: str) -> str:
     """📱 MOBILE: Type text on phone."""
     from mewact.mobile import MobileController
@@ -0,0 +1,54 @@
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Recall@k and latency of the IVF index against exact search on synthetic clustered embeddings.
+#   python scripts/bench_ann.py --n 200000 --dim 256
+
+try:
+    from mewact.vector_store import MappedVectorIndex
+    from mewact.ann import IVFIndex
+
+    parser = argparse.ArgumentParser(description="IVF vs brute-force benchmark")
+    parser.add_argument("--n", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((1000, args.dim)).astype(np.float32)
+    tmp = tempfile.mkdtemp()
+    index = MappedVectorIndex(os.path.join(tmp, "bench.vec"))
+    for start in range(0, args.n, 50000):
+        m = min(50000, args.n - start)
+        index.add_batch(centers[rng.integers(0, 1000, m)] + 0.6 * rng.standard_normal((m, args.dim)).astype(np.float32))
+    queries = centers[rng.integers(0, 1000, args.queries)] + 0.6 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    def timed(search):
+        results, start = [], time.perf_counter()
+        for q in queries: results.append(search(q)[0])
+        return results, (time.perf_counter() - start) / len(queries) * 1000
+
+    exact, exact_ms = timed(lambda q: index.search(q, args.k))
+    print(f"{Fore.CYAN}[*] {args.n} x {args.dim}, k={args.k}: exact {exact_ms:.2f} ms/query")
+
+    start = time.perf_counter()
+    ivf = IVFIndex(index, os.path.join(tmp, "bench"), min_items=0)
+    ivf.build()
+    print(f"{Fore.CYAN}[*] Build: {time.perf_counter() - start:.1f} s")
+    for nprobe in (1, 4, 8, 16, 32):
+        approx, ms = timed(lambda q: ivf.search(q, args.k, nprobe=nprobe))
+        recall = np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approx, exact)])
+        print(f"{Fore.GREEN}[+] nprobe={nprobe:<3} recall@{args.k}={recall:.3f}  {ms:.2f} ms/query  ({exact_ms / ms:.1f}x)")
+
+except Exception as e:
+    print(f"{Fore.RED}[!] Error: {e}")
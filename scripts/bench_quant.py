@@ -0,0 +1,56 @@
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Footprint, recall@k and latency of float16 / int8 scans (with full-precision re-rank) against float32.
+#   python scripts/bench_quant.py --n 100000 --dim 768
+
+try:
+    from mewact.vector_store import MappedVectorIndex
+    from mewact.quantize import QuantizedIndex
+
+    parser = argparse.ArgumentParser(description="Quantised vector scan benchmark")
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--rerank", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((500, args.dim)).astype(np.float32)
+    tmp = tempfile.mkdtemp()
+    index = MappedVectorIndex(os.path.join(tmp, "bench.vec"))
+    for start in range(0, args.n, 20000):
+        m = min(20000, args.n - start)
+        index.add_batch(centers[rng.integers(0, 500, m)] + 1.5 * rng.standard_normal((m, args.dim)).astype(np.float32))
+    queries = centers[rng.integers(0, 500, args.queries)] + 1.5 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    def timed(search):
+        results, start = [], time.perf_counter()
+        for q in queries: results.append(search(q)[0])
+        return results, (time.perf_counter() - start) / len(queries) * 1000
+
+    exact, exact_ms = timed(lambda q: index.search(q, args.k))
+    full_mb = args.n * args.dim * 4 / 1e6
+    sample = [float(x) for x in queries[0]]
+    list_mb = args.n * (sys.getsizeof(sample) + sum(sys.getsizeof(x) for x in sample)) / 1e6
+    print(f"{Fore.CYAN}[*] {args.n} x {args.dim}: as Python float lists ~{list_mb:.0f} MB; float32 {full_mb:.0f} MB, {exact_ms:.1f} ms/query")
+    for mode in ("float16", "int8"):
+        quant = QuantizedIndex(index, mode, os.path.join(tmp, "bench"), rerank=args.rerank)
+        approx, ms = timed(lambda q: quant.search(q, args.k))
+        recall = np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approx, exact)])
+        print(f"{Fore.GREEN}[+] {mode:<7} {quant.nbytes / 1e6:.0f} MB ({full_mb * 1e6 / quant.nbytes:.1f}x vs float32, "
+              f"{list_mb * 1e6 / quant.nbytes:.0f}x vs lists)  "
+              f"recall@{args.k}={recall:.3f}  {ms:.1f} ms/query")
+
+except Exception as e:
+    print(f"{Fore.RED}[!] Error: {e}")
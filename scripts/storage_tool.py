@@ -0,0 +1,41 @@
+
+import sys
+import os
+import argparse
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mewact.config as config
+
+# Move MewAct's data between the JSON files and the SQLite store (config.STORAGE_BACKEND = "sqlite").
+#   python scripts/storage_tool.py import            # JSON files in the current directory -> mewact.db
+#                                                    # (re-running only adds entries not imported yet)
+#   python scripts/storage_tool.py export backup/    # mewact.db -> JSON files in backup/
+
+try:
+    from mewact.db import Database
+
+    parser = argparse.ArgumentParser(description="Import/export MewAct storage")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("directory", nargs="?", default=".")
+    parser.add_argument("--db", default=config.DB_FILE)
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    if args.action == "import":
+        d = args.directory
+        counts = db.import_json(library=os.path.join(d, config.LIBRARY_FILE),
+                                sessions=os.path.join(d, config.SESSION_FILE),
+                                session_memory=os.path.join(d, "session_memory.json"),
+                                memories=os.path.join(d, "memory_store.json"),
+                                history=os.path.join(d, config.HISTORY_FILE))
+        print(f"{Fore.GREEN}[+] Imported into {args.db}: {counts}")
+    else:
+        for path in db.export_json(args.directory):
+            print(f"{Fore.GREEN}[+] Wrote {path}")
+    db.close()
+
+except Exception as e:
+    print(f"{Fore.RED}[!] Error: {e}")
@@ -1,7 +1,7 @@
 
 import sys
 import os
-import json
+import argparse
 from colorama import init, Fore
 
 init(autoreset=True)
@@ -9,45 +9,55 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
 import mewact.config as config
-# Force Active Mode for training to use Ollama
-config.ACTIVE_MODE = True
+
+# Embed the command library into VectorMemory (resumable; only new or changed commands are embedded).
+#   python scripts/train_memory.py                  # Ollama (nomic-embed-text)
+#   python scripts/train_memory.py --offline        # Built-in embedder, no model server
+#   python scripts/train_memory.py --workers 16 --batch-size 128
+
+parser = argparse.ArgumentParser(description="Train MewAct's vector memory from the command library")
+parser.add_argument("--offline", action="store_true", help="use the built-in embedder instead of Ollama")
+parser.add_argument("--batch-size", type=int, default=64)
+parser.add_argument("--workers", type=int, default=8, help="concurrent Ollama requests")
+parser.add_argument("--memory", default="memory_store.json")
+args = parser.parse_args()
+
+if args.offline:
+    config.EMBEDDING_BACKEND = "local"
+else:
+    # Force Active Mode for training to use Ollama
+    config.ACTIVE_MODE = True
+    config.EMBEDDING_BACKEND = "ollama"
 
 try:
     from mewact.memory_engine import VectorMemory
     from mewact.memory import LibraryManager
+    from mewact.training import MemoryTrainer
 
     print(f"{Fore.CYAN}[*] Initializing Memory Training...")
-    
+
     # Check Ollama
-    try:
-        import ollama
-        ollama.embeddings(model="nomic-embed-text", prompt="test")
-        print(f"{Fore.GREEN}[+] Ollama (nomic-embed-text) is ready.")
-    except Exception as e:
-        print(f"{Fore.RED}[!] Ollama Error: {e}")
-        print(f"{Fore.YELLOW}[!] Please run: ollama pull nomic-embed-text")
-        sys.exit(1)
+    if not args.offline:
+        try:
+            import ollama
+            ollama.embeddings(model=config.EMBEDDING_MODEL, prompt="test")
+            print(f"{Fore.GREEN}[+] Ollama ({config.EMBEDDING_MODEL}) is ready.")
+        except Exception as e:
+            print(f"{Fore.RED}[!] Ollama Error: {e}")
+            print(f"{Fore.YELLOW}[!] Please run: ollama pull {config.EMBEDDING_MODEL} (or use --offline)")
+            sys.exit(1)
 
     lib_mgr = LibraryManager()
-    memory = VectorMemory()
-    
-    print(f"{Fore.CYAN}[*] Loading {len(lib_mgr.library)} commands from library...")
-    
-    count = 0
-    for cmd_id, cmd_data in lib_mgr.library.items():
-        desc = cmd_data.get('description', '')
-        if not desc: continue
-        
-        # Create a rich text representation for embedding
-        # "Open Notepad" -> "Open Notepad application tool editor"
-        text = f"{desc} {cmd_data.get('category', '')} {cmd_data.get('tags', '')}"
-        
-        success = memory.add(text, metadata={"id": cmd_id, "command": cmd_data})
-        if success:
-            count += 1
-            print(f"\rTraining: {count}/{len(lib_mgr.library)}", end="")
-            
-    print(f"\n{Fore.GREEN}[+] Training Complete! Added {count} items to memory_store.json")
+    memory = VectorMemory(args.memory)
+    trainer = MemoryTrainer(lib_mgr, memory, batch_size=args.batch_size, workers=args.workers)
+
+    print(f"{Fore.CYAN}[*] {len(lib_mgr.library['commands'])} commands in library, {len(trainer.pending())} to embed...")
+    stats = trainer.run(progress=lambda done, total: print(f"\rTraining: {done}/{total}", end=""))
+
+    print(f"\n{Fore.GREEN}[+] Training Complete! Added {stats['added']} items ({stats['replaced']} replacing older versions) in {stats['batches']} batches, "
+          f"{stats['seconds']:.2f}s ({stats['per_second']:.0f} items/s)")
+    if stats["failed"]:
+        print(f"{Fore.YELLOW}[!] {stats['failed']} commands could not be embedded; they will be retried next run.")
 
 except Exception as e:
     print(f"{Fore.RED}[!] Error: {e}")
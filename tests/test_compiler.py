@@ -0,0 +1,78 @@
+
+import sys
+import os
+import time
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from mewact.memory import LibraryManager
+    from mewact.compiler import CodeCache, CommandTemplate, render, env_name
+    from mewact.shell import ShellService
+    from mewact.dispatch import prepare_library
+
+    # 1. Whole library compiles once at load
+    start = time.perf_counter()
+    lib = LibraryManager(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "command_library.json"))
+    load_ms = (time.perf_counter() - start) * 1000
+    assert not lib.code_cache.errors, lib.code_cache.errors
+    print(f"{Fore.GREEN}[+] {len(lib.code_cache)} python commands compiled in {load_ms:.1f} ms.")
+
+    # 2. Placeholder values are bound as data, never spliced into source
+    cache = CodeCache()
+    template = "out.append('say __VAR__!')\nout.append(__VAR__)"
+    value = "it's \"quoted\"'); import os #"
+    compiled = cache.get(template)
+    assert compiled["params"] == ("VAR",) and cache.get(template) is compiled
+    scope = {"out": [], "__VAR__": value}
+    exec(compiled["code"], scope, scope)
+    assert scope["out"] == [f"say {value}!", value], scope["out"]
+    assert render("ren __VAR1__ __VAR2__", {"VAR1": "a.txt", "VAR2": "b.txt"}) == "ren a.txt b.txt"
+    print(f"{Fore.GREEN}[+] Placeholders bound as variables.")
+
+    # 3. Broken entries are reported up front, directives are skipped
+    errors = cache.compile_library({
+        "broken": {"type": "python", "code": "pyautogui.press('__VAR__'"},
+        "wait for text": {"type": "python", "code": "SYSTEM:WAIT_FOR_TEXT:__VAR__"},
+        "dir": {"type": "shell", "code": "dir"}
+    })
+    assert list(errors) == ["broken"], errors
+    print(f"{Fore.GREEN}[+] Syntax errors reported at load.")
+
+    # 4. Typed dispatch records: native hotkeys/urls, flattened sequences
+    seq = lib.prepared[134]
+    assert [step["id"] for step, _ in seq["steps"]] == [200, 106] and seq["steps"][-1][1] == 0.0
+    assert lib.prepared[410]["keys"] == ("ctrl", "n") and lib.prepared[132]["target"] == "__VAR__"
+    nested = prepare_library({
+        "a": {"id": 1, "type": "hotkey", "code": "ctrl+c"},
+        "b": {"id": 2, "type": "sequence", "steps": [1, 3], "delay": 0.2},
+        "c": {"id": 3, "type": "sequence", "steps": [1, 2], "delay": 0.1}
+    })
+    assert [(s["id"], d) for s, d in nested[2]["steps"]] == [(1, 0.2), (1, 0.0)], nested[2]["steps"]
+    print(f"{Fore.GREEN}[+] {len(lib.prepared)} dispatch records; sequences flattened, cycles dropped.")
+
+    # 5. Named, typed parameters with defaults; shell values travel as environment variables
+    wait = lib.prepared[106]["template"]
+    assert wait.bind({}) == {"SECONDS": 1.0} and wait.bind({"VAR": "2.5"}) == {"SECONDS": 2.5}
+    drag = lib.prepared[2125]["template"]
+    for bad in ({}, {"PIXELS": "left"}):
+        try: drag.bind(bad); raise AssertionError(f"bind({bad}) should fail")
+        except ValueError: pass
+    # Raw code (no command id) gets the same typed binding when it is a library source
+    raw_wait = lib.code_cache.get(lib.prepared[106]["code"])["template"]
+    assert raw_wait.bind({"VAR": "2"}) == {"SECONDS": 2.0} and raw_wait.bind(None) == {"SECONDS": 1.0}
+    try: lib.code_cache.get(lib.prepared[2125]["code"])["template"].bind({"VAR": "left"}); raise AssertionError("raw drag should fail")
+    except ValueError: pass
+    assert cache.get("out.append(__NAME__)")["template"].bind({}) == {"NAME": ""}   # Ad-hoc code: optional strings
+    shell = ShellService(timeout=5)
+    tpl = CommandTemplate('echo "__VAR__"')
+    payload = 'x"; echo injected; "'
+    env = {env_name(k): str(v) for k, v in tpl.bind({"VAR": payload}).items()}
+    result = shell.run(tpl.shell_source(shell.var_ref), env=env)
+    assert result["output"].strip() == payload, result["output"]
+    print(f"{Fore.GREEN}[+] Typed binding OK; shell parameters passed as data.")
+
+except ImportError as e:
+    print(f"{Fore.RED}[!] Import Error: {e}")
@@ -0,0 +1,108 @@
+
+import sys
+import os
+import json
+import time
+import shutil
+import tempfile
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import mewact.config as config
+    from mewact.db import Database
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tmp = tempfile.mkdtemp()
+    lib_path = os.path.join(tmp, "command_library.json")
+    shutil.copy(os.path.join(root, "command_library.json"), lib_path)
+    with open(os.path.join(tmp, "sessions.json"), "w") as f:
+        json.dump({"morning": [{"command": "open chrome", "code": "pass", "delay": 1.0}]}, f)
+    with open(os.path.join(tmp, "memory_store.json"), "w") as f:
+        json.dump([{"text": "Open the browser window", "vector": [0.1, 0.2, 0.3], "metadata": {"id": 1}, "timestamp": 1.0}], f)
+    with open(os.path.join(tmp, "recording.txt"), "w") as f:
+        f.write("[2024-01-01 10:00:00] CMD: 107 | ARGS: hello | KEYWORDS: ['chrome', 'tab']\n")
+
+    # 1. Import the JSON stores, query them, export them back unchanged
+    db = Database(os.path.join(tmp, "mewact.db"))
+    counts = db.import_json(library=lib_path, sessions=os.path.join(tmp, "sessions.json"),
+                            memories=os.path.join(tmp, "memory_store.json"), history=os.path.join(tmp, "recording.txt"))
+    assert counts["memories"] == 1 and counts["history"] == 1, counts
+    assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert db.search_commands("chrome")[0]["name"].find("chrome") >= 0
+    assert db.search_memories_text("browser")[0]["metadata"] == {"id": 1}
+    assert db.recent_history()[0]["keywords"] == ["chrome", "tab"]
+    out = os.path.join(tmp, "export")
+    db.export_json(out)
+    with open(lib_path) as a, open(os.path.join(out, "command_library.json")) as b:
+        original, exported = json.load(a), json.load(b)
+    assert list(exported["commands"].items()) == list(original["commands"].items())
+    with open(os.path.join(out, "sessions.json")) as f: assert json.load(f)["morning"][0]["command"] == "open chrome"
+    print(f"{Fore.GREEN}[+] Import/export round trip OK: {counts}")
+
+    # 1b. Re-running the import adds nothing; a new memory/history line is picked up on its own
+    with open(os.path.join(tmp, "recording.txt"), "a") as f:
+        f.write("[2024-01-01 10:05:00] CMD: 108 | ARGS:  | KEYWORDS: ['close']\n")
+    again = db.import_json(library=lib_path, sessions=os.path.join(tmp, "sessions.json"),
+                           memories=os.path.join(tmp, "memory_store.json"), history=os.path.join(tmp, "recording.txt"))
+    assert again["memories"] == 0 and again["history"] == 1, again
+    table_rows = lambda t: db.conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+    assert table_rows("memories") == 1 and table_rows("history") == 2 and table_rows("sessions") == 1
+    assert table_rows("commands") == len(original["commands"])
+    print(f"{Fore.GREEN}[+] Re-import is idempotent: {again}")
+
+    # 1c. A reader on another thread never sees rows of a write transaction still open
+    import threading
+    inside, release, seen = threading.Event(), threading.Event(), []
+    def writer():
+        try:
+            with db._tx() as c:
+                c.execute("INSERT INTO history(ts, cmd_id, args, keywords) VALUES (?, ?, ?, ?)", (0.0, "999", "", "[]"))
+                inside.set(); release.wait(5)
+                raise RuntimeError("roll back")
+        except RuntimeError: pass
+    def reader():
+        inside.wait(5)
+        seen.append(table_rows("history"))
+        seen.append(any(r["cmd_id"] == "999" for r in db.recent_history()))
+        release.set()
+    threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+    for t in threads: t.start()
+    for t in threads: t.join(10)
+    assert seen == [2, False] and table_rows("history") == 2, seen
+    print(f"{Fore.GREEN}[+] Reads from other threads see only committed rows.")
+
+    # 2. Components on the sqlite backend: single-row writes, state survives a restart
+    config.STORAGE_BACKEND, config.DB_FILE = "sqlite", os.path.join(tmp, "live.db")
+    from mewact.memory import LibraryManager
+    from mewact.session import SessionManager
+    from mewact.memory_engine import VectorMemory
+
+    lib = LibraryManager(lib_path)
+    assert lib.get_command_by_id(107)["name"] == "mew act"
+    start = time.perf_counter()
+    for i in range(50): lib.save_entry(f"learned step {i}", f"time.sleep({i})")
+    per_save = (time.perf_counter() - start) / 50 * 1000
+    assert lib.delete_entry("learned step 0")
+    lib.reload()
+    assert lib.get_command("learned step 49")["code"] == "time.sleep(49)" and lib.get_command("learned step 0") is None
+
+    sm = SessionManager(os.path.join(tmp, "session_memory.json"))
+    sm.start_recording("demo", "a demo")
+    sm.record_step(107, {"args": "x"}, ["chrome", "window"])
+    sm.save_session()
+    assert SessionManager(os.path.join(tmp, "session_memory.json")).get_session("demo")["steps"][0]["id"] == 107
+    assert not os.path.exists(os.path.join(tmp, "session_memory.json"))
+
+    mem = VectorMemory(os.path.join(tmp, "memory_store.json"))
+    mem.add("Close every window")
+    assert [m["text"] for m in VectorMemory(os.path.join(tmp, "memory_store.json")).data] == ["Open the browser window", "Close every window"]
+    print(f"{Fore.GREEN}[+] SQLite backend: {per_save:.2f} ms per learned command; sessions, history and memories persisted.")
+
+    config.STORAGE_BACKEND = "json"
+    shutil.rmtree(tmp, ignore_errors=True)
+
+except ImportError as e:
+    print(f"{Fore.RED}[!] Import Error: {e}")
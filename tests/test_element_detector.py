@@ -0,0 +1,53 @@
+
+import sys
+import os
+import time
+import numpy as np
+import cv2
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from mewact.element_detector import ElementDetector, drop_text_overlaps
+
+    # Synthetic 1080p frame: light background with icon-sized boxes and a text line
+    img = np.full((1080, 1920, 4), 240, np.uint8)
+    icons = [(100 + i * 120, 200 + (i % 5) * 150) for i in range(15)]
+    for x, y in icons:
+        cv2.rectangle(img, (x, y), (x + 32, y + 32), (60, 60, 60, 255), 2)
+    cv2.putText(img, "Send message", (400, 900), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0, 255), 2)
+
+    detector = ElementDetector()
+    start = time.perf_counter()
+    elements = detector.detect(img, key="screen")
+    cold_ms = (time.perf_counter() - start) * 1000
+    print(f"{Fore.CYAN}[*] Cold detect: {len(elements)} elements in {cold_ms:.1f} ms")
+
+    found = sum(1 for x, y in icons if any(abs(e["x"] - (x + 16)) < 6 and abs(e["y"] - (y + 16)) < 6 for e in elements))
+    assert found == len(icons), f"Expected {len(icons)} icons, found {found}"
+    print(f"{Fore.GREEN}[+] All {found} icons detected.")
+
+    # Unchanged frame should be served from the per-region cache
+    start = time.perf_counter()
+    again = detector.detect(img, key="screen")
+    warm_ms = (time.perf_counter() - start) * 1000
+    assert len(again) == len(elements)
+    print(f"{Fore.GREEN}[+] Cached detect: {warm_ms:.1f} ms")
+
+    # Adding one icon must only re-detect the changed region, and match a full re-detect
+    img2 = img.copy()
+    cv2.rectangle(img2, (1600, 950), (1632, 982), (60, 60, 60, 255), 2)
+    incremental = detector.detect(img2, key="screen")
+    full = ElementDetector().detect(img2)
+    assert len(incremental) == len(full) == len(elements) + 1, (len(incremental), len(full))
+    print(f"{Fore.GREEN}[+] Dirty-region update: {len(incremental)} elements.")
+
+    # Element boxes that contain OCR text are left to OCR
+    text_items = [{"text": "icon label", "x": icons[0][0] + 16, "y": icons[0][1] + 16}]
+    assert len(drop_text_overlaps(incremental, text_items)) == len(incremental) - 1
+    print(f"{Fore.GREEN}[+] OCR overlap filter OK.")
+
+except ImportError as e:
+    print(f"{Fore.RED}[!] Import Error: {e}")
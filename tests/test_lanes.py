@@ -0,0 +1,95 @@
+
+import sys
+import os
+import time
+import asyncio
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from mewact.lanes import build_lanes, lane
+
+    lanes = build_lanes(observe_workers=4, work_workers=2)
+    log = []
+
+    def span(kind, i, delay):
+        start = time.perf_counter()
+        time.sleep(delay)
+        log.append((kind, i, start, time.perf_counter()))
+
+    @lane(lanes, "observe", timeout=2)
+    def observe(i) -> dict:
+        span("observe", i, 0.2)
+        return {"i": i}
+
+    @lane(lanes, "action", timeout=2)
+    def act(i) -> str:
+        span("action", i, 0.2)
+        return f"done {i}"
+
+    @lane(lanes, "observe", timeout=0.1)
+    def slow_observe() -> dict:
+        time.sleep(0.4)
+        return {}
+
+    @lane(lanes, "action", timeout=0.1)
+    def slow_act() -> str:
+        time.sleep(0.4)
+        return "late"
+
+    @lane(lanes, "observe", timeout=0.1, on_timeout=True)
+    def slow_check() -> bool:
+        time.sleep(0.4)
+        return False
+
+    @lane(lanes, "work", timeout=2)
+    def plan_then_act() -> str:
+        span("plan", 0, 0.3)            # Planning (LLM/VLM) runs without the screen lock
+        with lanes["action"][1]():      # Only the step execution takes the action guard
+            span("steps", 0, 0.1)
+        return "ok"
+
+    def overlaps(a, b):
+        return a[2] < b[3] and b[2] < a[3]
+
+    async def main():
+        # 1. Observations run together: four 200 ms captures take ~200 ms, not 800
+        start = time.perf_counter()
+        results = await asyncio.gather(*(observe(i) for i in range(4)))
+        together = time.perf_counter() - start
+        assert results == [{"i": i} for i in range(4)] and together < 0.35, together
+        print(f"{Fore.GREEN}[+] 4 observations in {together * 1000:.0f} ms (serial 800 ms).")
+
+        # 2. Actions run one at a time and never overlap an observation
+        log.clear()
+        results = await asyncio.gather(act(1), act(2), observe(5), act(3))
+        assert results == ["done 1", "done 2", {"i": 5}, "done 3"]
+        actions = [e for e in log if e[0] == "action"]
+        assert not any(overlaps(a, b) for a in actions for b in log if a is not b), log
+        print(f"{Fore.GREEN}[+] Actions serialised, no observation inside an action.")
+
+        # 3. Lane timeouts come back as errors in the tool's return shape (or the given value)
+        assert "timed out" in (await slow_observe())["error"]
+        assert (await slow_act()).startswith("Error: slow_act timed out")
+        assert await slow_check() is True
+        print(f"{Fore.GREEN}[+] Timeouts returned as errors.")
+
+        # 4. A goal tool plans on the work lane: observations aren't held up by its planning
+        await asyncio.sleep(0.5)        # Let the timed-out workers above finish
+        log.clear()
+        async def observe_later():
+            await asyncio.sleep(0.05)
+            return await observe(9)
+        results = await asyncio.gather(plan_then_act(), observe_later())
+        spans = {e[0]: e for e in log}
+        assert results[0] == "ok" and overlaps(spans["plan"], spans["observe"]), log
+        assert not overlaps(spans["steps"], spans["observe"]), log
+        print(f"{Fore.GREEN}[+] Planning overlaps observations; plan steps don't.")
+
+    asyncio.run(main())
+    assert observe.__name__ == "observe"   # functools.wraps keeps the tool name for FastMCP
+
+except ImportError as e:
+    print(f"{Fore.RED}[!] Import Error: {e}")
@@ -0,0 +1,66 @@
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from mewact.memory import LibraryManager
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tmp = tempfile.mkdtemp()
+    lib_path = os.path.join(tmp, "command_library.json")
+    shutil.copy(os.path.join(root, "command_library.json"), lib_path)
+
+    # 1. Constant-time id lookup, first entry wins on shared ids
+    lib = LibraryManager(lib_path)
+    assert lib.get_command_by_id(107)["name"] == "mew act"
+    start = time.perf_counter()
+    for _ in range(10000): lib.get_command_by_id(2128)
+    print(f"{Fore.GREEN}[+] get_command_by_id: {(time.perf_counter() - start) * 100:.2f} us per lookup.")
+
+    # 2. Monotonic ids; re-learning keeps the id; deletes and reloads stay consistent
+    lib.save_entry("say hello", "pyautogui.write('hello')")
+    first = lib.get_command("say hello")["id"]
+    lib.save_entry("say bye", "pyautogui.write('bye')")
+    second = lib.get_command("say bye")["id"]
+    assert second == first + 1 and first > 2128, (first, second)
+    lib.save_entry("say hello", "pyautogui.write('hello!')")
+    assert lib.get_command("say hello")["id"] == first and lib.by_id[first] == "say hello"
+    assert lib.delete_entry("say bye") and lib.get_command_by_id(second) is None
+    assert lib.delete_entry("mew act") and lib.get_command_by_id(107)["name"] == "mewact"  # Alias takes over
+
+    lib.reload()
+    assert lib.get_command_by_id(first)["code"] == "pyautogui.write('hello!')"
+    lib.save_entry("say again", "pass")
+    assert lib.get_command("say again")["id"] == second + 1  # Deleted ids are never reissued
+    learned = lib.prepared[second + 1]
+    lib.reload()
+    assert learned.keys() == lib.prepared[second + 1].keys()  # Learned and reloaded records match
+    print(f"{Fore.GREEN}[+] Id allocator and indexes consistent across save/delete/reload.")
+
+    # 3. Learning appends to the journal; the library file is only rewritten by compaction
+    snapshot_mtime = os.path.getmtime(lib_path)
+    start = time.perf_counter()
+    for i in range(20): lib.save_entry(f"learned step {i}", f"time.sleep({i})")
+    per_save = (time.perf_counter() - start) / 20 * 1000
+    assert os.path.getmtime(lib_path) == snapshot_mtime and os.path.exists(lib_path + ".journal")
+    with open(lib_path + ".journal", "a") as f: f.write('{"op": "set", "key": "torn')  # Crash mid-append
+    fresh = LibraryManager(lib_path)
+    assert fresh.get_command("learned step 19")["code"] == "time.sleep(19)" and fresh.get_command("say bye") is None
+    fresh.save_entry("after crash", "pass")  # Lands on its own line once the torn record is cut off
+    assert LibraryManager(lib_path).get_command("after crash") is not None
+    fresh.store.compact()
+    assert not os.path.exists(lib_path + ".journal")
+    assert LibraryManager(lib_path).get_command("learned step 19") is not None
+    print(f"{Fore.GREEN}[+] Journaled saves: {per_save:.2f} ms each; replay and compaction OK.")
+
+    shutil.rmtree(tmp, ignore_errors=True)
+
+except ImportError as e:
+    print(f"{Fore.RED}[!] Import Error: {e}")
@@ -0,0 +1,254 @@
+
+import sys
+import os
+import json
+import time
+import tempfile
+import numpy as np
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from mewact.memory_engine import VectorMemory
+    from mewact.vector_index import VectorIndex
+    from mewact.vector_store import MappedVectorIndex
+    from mewact.ann import IVFIndex
+    from mewact.quantize import QuantizedIndex
+    from mewact.embed_cache import EmbeddingCache
+    from mewact.local_embed import LocalEmbedder
+    from mewact.consolidate import Consolidator
+    from mewact import config
+
+    tmp = tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    config.EMBED_CACHE_DIR = os.path.join(tmp, "embeds")
+
+    # 1. Matrix search agrees with the pure-Python cosine loop
+    memory = VectorMemory(os.path.join(tmp, "memory_store.json"))
+    vectors = rng.standard_normal((300, 64)).astype(np.float32)
+    for i, v in enumerate(vectors): memory.add(f"item {i}", {"id": i}, vector=v)
+    query = rng.standard_normal(64)
+    expected = sorted(range(300), key=lambda i: -memory.cosine_similarity(query, vectors[i]))[:5]
+    assert [item["metadata"]["id"] for item, _ in memory.search_vector(query, k=5)] == expected
+    reloaded = VectorMemory(os.path.join(tmp, "memory_store.json"))
+    assert [item["metadata"]["id"] for item, _ in reloaded.search_vector(query, k=5)] == expected
+    print(f"{Fore.GREEN}[+] Top-k matches brute-force cosine; index rebuilt on load.")
+
+    # 1b. Deleted / vector-less rows never take result slots, even with many of them and negative cosines
+    small = VectorIndex()
+    small.add_batch(np.vstack([np.zeros((20, 8), np.float32), -np.eye(8, dtype=np.float32)[:3]]))
+    rows, scores = small.search(np.ones(8), k=3)
+    assert sorted(rows.tolist()) == [20, 21, 22] and (scores < 0).all()
+    small.add_batch(np.ones((2, 8), np.float32))
+    small.clear_rows([23])
+    rows = small.search(np.ones(8), k=2)[0].tolist()
+    assert rows[0] == 24 and rows[1] in (20, 21, 22), rows
+    # A batch with a foreign embedding size is rejected whole: items and rows stay aligned
+    before = len(memory.data)
+    assert memory.add_many(["a", "b"], None, [vectors[0], np.ones(32)]) == 0
+    assert memory.add("wrong size", vector=np.ones(32)) is False
+    assert len(memory.data) == len(memory.index) == before
+    print(f"{Fore.GREEN}[+] Dead rows excluded before top-k; mismatched batches rejected.")
+
+    # 2. 100k x 768 search in milliseconds; adds are incremental
+    index = VectorIndex()
+    index.add_batch(rng.standard_normal((100000, 768)).astype(np.float32))
+    start = time.perf_counter()
+    for _ in range(1000): index.add(rng.standard_normal(768))
+    per_add = (time.perf_counter() - start) / 1000 * 1e6
+    q = rng.standard_normal(768)
+    index.search(q, 3)
+    start = time.perf_counter()
+    for _ in range(20): rows, scores = index.search(q, 3)
+    per_query = (time.perf_counter() - start) / 20 * 1000
+    assert len(index) == 101000 and scores[0] >= scores[1] >= scores[2]
+    print(f"{Fore.GREEN}[+] 100k x 768: {per_query:.1f} ms per search, {per_add:.0f} us per add (amortised).")
+
+    # 3. Binary store: one-time JSON migration, append-only inserts, lazy cold start, torn-tail recovery
+    legacy = os.path.join(tmp, "legacy.json")
+    with open(legacy, "w") as f:
+        json.dump([{"text": f"skill {i}", "vector": vectors[i].tolist(), "metadata": {"id": i}, "timestamp": 1.0} for i in range(100)]
+                  + [{"text": "no embedding", "vector": None, "metadata": {}, "timestamp": 1.0}], f)
+    memory = VectorMemory(legacy)
+    assert len(memory.data) == 101 and os.path.exists(os.path.join(tmp, "legacy.vec"))
+    assert memory.search_vector(vectors[7], k=1)[0][0]["metadata"]["id"] == 7
+    sizes = []
+    for n in range(3):
+        memory.add_many([f"bulk {n} {i}" for i in range(5000)], None, rng.standard_normal((5000, 64)).astype(np.float32))
+        start = time.perf_counter()
+        memory.add("one more", {"n": n}, vector=rng.standard_normal(64))
+        sizes.append((len(memory.data), (time.perf_counter() - start) * 1e6))
+    start = time.perf_counter()
+    cold = VectorMemory(legacy)
+    cold_ms = (time.perf_counter() - start) * 1000
+    assert len(cold.data) == len(memory.data) == len(cold.index) and cold.data[100]["text"] == "no embedding"
+    with open(os.path.join(tmp, "legacy.meta.jsonl"), "ab") as f: f.write(b'{"text": "tor')  # Crash mid-append
+    with open(os.path.join(tmp, "legacy.vec"), "ab") as f: f.write(b"\0" * 40)
+    recovered = VectorMemory(legacy)
+    assert len(recovered.data) == len(recovered.index) == len(memory.data)
+    recovered.add("after crash", vector=vectors[3])
+    assert VectorMemory(legacy).data[-1]["text"] == "after crash"
+    print(f"{Fore.GREEN}[+] Binary store: cold start {cold_ms:.1f} ms for {len(cold.data)} items; "
+          + ", ".join(f"{us:.0f} us insert @ {n}" for n, us in sizes))
+
+    # 4. IVF index: recall against exact search, incremental adds, persisted next to the vector file
+    centers = rng.standard_normal((200, 64)).astype(np.float32)
+    mapped = MappedVectorIndex(os.path.join(tmp, "ann.vec"))
+    mapped.add_batch(centers[rng.integers(0, 200, 20000)] + 0.7 * rng.standard_normal((20000, 64)).astype(np.float32))
+    ivf = IVFIndex(mapped, os.path.join(tmp, "ann"), nprobe=8, min_items=0)
+    ivf.build()
+    queries = centers[rng.integers(0, 200, 50)] + 0.7 * rng.standard_normal((50, 64)).astype(np.float32)
+    recall = np.mean([len(set(ivf.search(q, 10)[0]) & set(mapped.search(q, 10)[0])) / 10 for q in queries])
+    assert recall > 0.9, recall
+    row = mapped.add(centers[5] * 10)
+    assert ivf.search(centers[5], 1)[0][0] == row
+    reopened = IVFIndex(MappedVectorIndex(os.path.join(tmp, "ann.vec")), os.path.join(tmp, "ann"), min_items=0)
+    assert reopened.active and reopened.search(centers[5], 1)[0][0] == row
+    small = IVFIndex(VectorIndex(), min_items=1000)
+    small.index.add_batch(vectors)
+    assert not small.active and list(small.search(query, 5)[0]) == list(small.index.search(query, 5)[0])
+    print(f"{Fore.GREEN}[+] IVF recall@10 = {recall:.3f}; incremental add and reload OK; exact below threshold.")
+
+    # 5. Quantised scans: 2x / 4x smaller, same top results after the full-precision re-rank
+    for mode, ratio in (("float16", 2), ("int8", 4)):
+        quant = QuantizedIndex(mapped, mode, os.path.join(tmp, "ann"))
+        recall = np.mean([len(set(quant.search(q, 10)[0]) & set(mapped.search(q, 10)[0])) / 10 for q in queries])
+        assert recall > 0.95 and quant.nbytes <= len(mapped) * 64 * 4 / ratio + len(mapped) * 4, (mode, recall)
+        row = mapped.add(centers[10 + ratio] * 3)
+        assert quant.search(centers[10 + ratio], 1)[0][0] == row  # Incremental
+        assert QuantizedIndex(mapped, mode, os.path.join(tmp, "ann")).rows == len(mapped)  # Persisted
+        print(f"{Fore.GREEN}[+] {mode}: recall@10 = {recall:.3f}, {quant.nbytes // 1024} KiB.")
+    # Deleted rows never take re-rank slots, however many of them rank first
+    top = mapped.search(queries[0], 40)[0]
+    quant.clear_rows(top[:30].tolist())
+    rows = quant.search(queries[0], 5)[0]
+    assert len(rows) == 5 and not set(rows) & set(top[:30]) and len(set(rows) & set(top[30:])) >= 4
+    # Only the binary store gets a compact copy; sqlite keeps its float32 matrix in RAM and stays exact
+    quantization, backend, db_file = config.VECTOR_QUANTIZATION, config.STORAGE_BACKEND, config.DB_FILE
+    config.VECTOR_QUANTIZATION, config.STORAGE_BACKEND, config.DB_FILE = "int8", "sqlite", os.path.join(tmp, "quant.db")
+    try:
+        sql_memory = VectorMemory(os.path.join(tmp, "quant_store.json"))
+        sql_memory.add_many(["a", "b"], None, vectors[:2])
+        assert sql_memory.quant is None and sql_memory.search_vector(vectors[1], 1)[0][0]["text"] == "b"
+        config.STORAGE_BACKEND = "json"
+        bin_memory = VectorMemory(os.path.join(tmp, "quant_bin.json"))
+        bin_memory.add_many(["a", "b"], None, vectors[:2])
+        assert bin_memory.quant is not None and bin_memory.search_vector(vectors[1], 1)[0][0]["text"] == "b"
+    finally:
+        config.VECTOR_QUANTIZATION, config.STORAGE_BACKEND, config.DB_FILE = quantization, backend, db_file
+
+    # 6. Embedding cache: hits skip the model server, survive a restart, keyed by model as well as text
+    cache = EmbeddingCache(os.path.join(tmp, "embeds"), lru_size=4)
+    cache.put_many("m1", [f"text {i}" for i in range(100)], vectors[:100])
+    assert cache.get("m1", "text 7") == [float(x) for x in vectors[7]] and cache.get("m2", "text 7") is None
+    with open(os.path.join(tmp, "embeds", "m1.emb"), "ab") as f: f.write(b"\1" * 30)  # Torn append
+    cold = EmbeddingCache(os.path.join(tmp, "embeds"))
+    assert cold.get("m1", "text 99") == [float(x) for x in vectors[99]] and cold.get("m1", "text 100") is None
+    assert EmbeddingCache(os.path.join(tmp, "unused")).get("m1", "x") is None and not os.path.exists(os.path.join(tmp, "unused"))
+    calls = []
+    class FakeOllama:
+        @staticmethod
+        def embeddings(model, prompt):
+            calls.append(prompt)
+            return {"embedding": [float(len(prompt)), 1.0, 0.5]}
+    real = sys.modules.get("ollama")
+    sys.modules["ollama"] = FakeOllama
+    active, cache_dir = config.ACTIVE_MODE, config.EMBED_CACHE_DIR
+    config.ACTIVE_MODE, config.EMBED_CACHE_DIR = True, "model_embeds"   # Relative: next to the store
+    try:
+        memory = VectorMemory(os.path.join(tmp, "embedded.json"))
+        for _ in range(3): memory.search("open the browser")
+        memory.add("open the browser", {"id": 1})
+        assert calls == ["open the browser"] and os.path.isdir(os.path.join(tmp, "model_embeds"))
+        start = time.perf_counter()
+        for _ in range(1000): memory.get_embedding("open the browser")
+        hit_us = (time.perf_counter() - start) * 1000
+    finally:
+        config.ACTIVE_MODE, config.EMBED_CACHE_DIR = active, cache_dir
+        if real is None: sys.modules.pop("ollama")
+        else: sys.modules["ollama"] = real
+    print(f"{Fore.GREEN}[+] Embedding cache: 1 model call for 5 requests, {hit_us:.1f} us per hit; reload and torn-tail OK.")
+
+    # 7. Offline embedder: no model server, batch == one-by-one, typo-tolerant, sub-millisecond queries
+    skills = ["Open the Chrome web browser", "Take a screenshot of the screen", "Mute the system volume",
+              "Create a new folder on the desktop", "Send an email to a contact", "Lock the computer",
+              "Play music in Spotify", "Search files by name", "Shut down the computer", "Copy text to clipboard"]
+    embedder = LocalEmbedder(dim=256, state_file=os.path.join(tmp, "df.npy"))
+    embedder.observe(skills)
+    batch = np.array(embedder.embed(skills))
+    single = np.array([embedder.embed([t])[0] for t in skills])
+    assert np.allclose(batch, single, atol=1e-5) and embedder.embed([""]) == [None]
+    assert not os.path.exists(os.path.join(tmp, "df.npy"))   # Counts are written in batches, not per text
+    embedder.save()
+    assert LocalEmbedder(dim=256, state_file=os.path.join(tmp, "df.npy")).docs == len(skills)  # IDF persisted
+    for goal, want in (("open browser", 0), ("screnshot", 1), ("turn the volume off", 2), ("play some musik", 6)):
+        assert int(np.argmax(batch @ np.array(embedder.embed([goal])[0]))) == want, goal
+    start = time.perf_counter()
+    for _ in range(200): embedder.embed(["open the web browser please"])
+    query_ms = (time.perf_counter() - start) * 1000 / 200
+    # Once fitted the IDF is frozen: later texts don't shift the weights of stored vectors
+    before = embedder.embed(["open the web browser please"])[0]
+    embedder.freeze()
+    embedder.observe(["browser browser browser"] * 50)
+    assert embedder.docs == len(skills) and embedder.embed(["open the web browser please"])[0] == before
+    assert LocalEmbedder(dim=256, state_file=os.path.join(tmp, "df.npy")).frozen
+    auto = LocalEmbedder(dim=256, fit_docs=20)
+    for t in skills * 3: auto.observe([t])
+    assert auto.frozen and auto.docs == 20
+    config.LOCAL_EMBED_STATE = os.path.join(tmp, "shared_df.npy")
+    memory = VectorMemory(os.path.join(tmp, "offline.json"))   # ACTIVE_MODE is off: local backend
+    for i, t in enumerate(skills): memory.add(t, {"id": i})
+    assert memory.search("lock my computer", k=1)[0]["metadata"]["id"] == 5
+    assert VectorMemory(os.path.join(tmp, "offline.json")).search("new desktop folder", k=1)[0]["metadata"]["id"] == 3
+    print(f"{Fore.GREEN}[+] Offline embedder: {query_ms:.3f} ms per query; batch/single agree; memory search works without Ollama.")
+
+    # 8. Consolidation: near-duplicates merged (newest wins), TTL and capacity eviction, compaction, background job
+    path = os.path.join(tmp, "consolidate.json")
+    memory = VectorMemory(path)
+    base_vecs = rng.standard_normal((300, 64)).astype(np.float32)
+    memory.add_many([f"skill {i}" for i in range(300)], [{"id": i, "source": "train"} for i in range(300)], base_vecs)
+    memory.add_many([f"skill {i} v2" for i in range(100)], [{"id": i, "v": 2} for i in range(100)],
+                    base_vecs[:100] + 0.01 * rng.standard_normal((100, 64)).astype(np.float32))
+    # A different command with a near-identical description is kept: only rows of the same id merge
+    memory.add_many(["skill 7 twin"], [{"id": "twin"}], base_vecs[7:8] * 1.001)
+    job = Consolidator(memory, threshold=0.97, batch=128)
+    merged = 0
+    while job.pending(): merged += job.step()["merged"]
+    item, _ = memory.search_vector(base_vecs[5], 1)[0]
+    assert merged == 100 and item["text"] == "skill 5 v2"
+    assert {hit["metadata"]["id"] for hit, _ in memory.search_vector(base_vecs[7], 2)} == {7, "twin"}
+    memory.remove_rows([400])
+    assert item["metadata"] == {"id": 5, "source": "train", "v": 2, "merged": 1}
+    reloaded = VectorMemory(path)
+    assert len(reloaded.deleted_rows()) == 101 and reloaded.usage.scanned == 401
+    assert reloaded.search_vector(base_vecs[5], 1)[0][0]["text"] == "skill 5 v2"
+    memory = reloaded
+    memory.usage.table[100:150, :2] = time.time() - 30 * 86400  # Untouched for a month
+    assert Consolidator(memory, ttl_days=7).step()["expired"] == 50
+    for _ in range(3):
+        for i in range(150, 170): memory.search_vector(base_vecs[i], 1)
+    stats = Consolidator(memory, max_items=120, policy="least_useful").step()
+    assert stats["evicted"] == 130 and stats["compacted"] and len(memory.data) == 120
+    assert all(memory.search_vector(base_vecs[i], 1)[0][0]["text"] == f"skill {i}" for i in range(150, 170))
+    reloaded = VectorMemory(path)
+    assert len(reloaded.data) == len(reloaded.index) == 120 and not reloaded.deleted_rows()
+    assert os.path.getsize(os.path.join(tmp, "consolidate.edits.jsonl")) == 0  # Tombstones folded into the rewrite
+    big = VectorMemory(os.path.join(tmp, "big.json"))
+    big.add_many([f"row {i}" for i in range(20000)], None, rng.standard_normal((20000, 64)).astype(np.float32))
+    start = time.perf_counter()
+    job = Consolidator(big, batch=2048)
+    while job.pending(): job.step()
+    scan_ms = (time.perf_counter() - start) * 1000
+    big.consolidator = Consolidator(big, batch=256).start(interval=0.05)
+    big.add_many([f"row {i} again" for i in range(50)], None, np.asarray(big.index.matrix[:50]) * 2)
+    deadline = time.time() + 10
+    while len(big.deleted_rows()) < 50 and time.time() < deadline: time.sleep(0.02)
+    big.consolidator.stop()
+    assert len(big.deleted_rows()) == 50
+    print(f"{Fore.GREEN}[+] Consolidation: duplicates merged, TTL/capacity eviction, compaction OK; "
+          f"20k-row dedupe scan {scan_ms:.0f} ms in bounded steps; background job OK.")
+
+except ImportError as e:
+    print(f"{Fore.RED}[!] Import Error: {e}")
@@ -0,0 +1,119 @@
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import mewact.config as config
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tmp = tempfile.mkdtemp()
+    usage_file = os.path.join(tmp, "usage_stats.bin")
+    config.HISTORY_FILE = os.path.join(tmp, "recording.txt")   # Nothing to seed from the cwd
+
+    from mewact.memory import LibraryManager
+    from mewact.planning import CognitivePlanner
+    from mewact.usage import UsageStats, RECORD
+
+    lib_path = os.path.join(tmp, "command_library.json")
+    shutil.copy(os.path.join(root, "command_library.json"), lib_path)
+    lib = LibraryManager(lib_path)
+    planner = CognitivePlanner(lib, usage_file=usage_file)
+
+    # 1. Repeated goals resolve from the goal cache; variables are bound per call
+    first = planner.resolve("type text | hello", [])
+    start = time.perf_counter()
+    for _ in range(1000): again = planner.resolve("Type  text | world", [])
+    per_hit = (time.perf_counter() - start) * 1000
+    assert again["name"] == first["name"] and again["params"]["VAR"] == "world"
+    assert not first["cached"] and again["cached"]   # Reflects the goal-cache lookup, not the library
+    assert planner.plan("type text | hi", [])[0] == planner.plan("type text | hi", [])[0]
+    print(f"{Fore.GREEN}[+] Goal cache hit: {per_hit:.1f} us per resolve.")
+
+    # 2. Library changes invalidate cached goals
+    lib.save_entry("type text", "pyautogui.write('__VAR__', interval=0.01)")
+    assert "interval" in planner.resolve("type text | x", [])["code"]
+    assert lib.delete_entry("type text") and planner.resolve("type text | x", [])["name"] != "type text"
+    print(f"{Fore.GREEN}[+] Cache invalidated on save/delete.")
+
+    # 3. Usage breaks ranking ties; stats are fixed-size records rewritten in place
+    lib.save_entry("zebra alpha", "pass")
+    lib.save_entry("zebra beta", "pass")
+    assert planner.resolve("zebra", [])["name"] == "zebra alpha"  # Tie: library order
+    beta = lib.get_command("zebra beta")
+    for _ in range(3): planner.record_outcome({"id": beta["id"], "name": "zebra beta"}, True)
+    assert planner.resolve("zebras", [])["name"] == "zebra beta"  # New goal text, ranked with the stats
+    for _ in range(30): planner.record_outcome({"id": beta["id"], "name": "zebra beta"}, False)
+    assert planner.resolve("zebras", [])["name"] == "zebra alpha"  # Failures evict the cached choice
+    size = os.path.getsize(usage_file)
+    start = time.perf_counter()
+    for _ in range(1000): planner.usage.record(beta["id"], True)
+    per_record = (time.perf_counter() - start) * 1000
+    assert os.path.getsize(usage_file) == size == RECORD.size
+    assert UsageStats(usage_file).get(beta["id"])["runs"] == 1033
+    print(f"{Fore.GREEN}[+] Usage-weighted ranking OK; {per_record:.1f} us per recorded execution.")
+
+    # 3b. A new stats file is seeded from the configured history: the log file, or the sqlite history table
+    alpha = lib.get_command("zebra alpha")
+    with open(config.HISTORY_FILE, "w", encoding="utf-8") as f:
+        for _ in range(4): f.write(f"[2024-01-02 03:04:05] CMD: {alpha['id']} | ARGS:  | KEYWORDS: []\n")
+        f.write("[2024-01-02 03:04:05] CMD: None | ARGS:  | KEYWORDS: []\n")
+    seeded = CognitivePlanner(lib, usage_file=os.path.join(tmp, "seeded.bin")).usage
+    assert seeded.get(alpha["id"])["runs"] == 4 and len(seeded) == 1
+    backend, db_file = config.STORAGE_BACKEND, config.DB_FILE
+    config.STORAGE_BACKEND, config.DB_FILE = "sqlite", os.path.join(tmp, "mewact.db")
+    try:
+        from mewact.db import get_database
+        for _ in range(2): get_database().log_history(beta["id"], "", [])
+        seeded = CognitivePlanner(lib, usage_file=os.path.join(tmp, "seeded_db.bin")).usage
+        assert seeded.get(beta["id"])["runs"] == 2 and seeded.get(alpha["id"]) is None
+    finally:
+        config.STORAGE_BACKEND, config.DB_FILE = backend, db_file
+    print(f"{Fore.GREEN}[+] Usage stats seeded from the history log and the sqlite history table.")
+
+    # 4. plan_goal gathers screen and skill context concurrently; a slow VLM is cut off at its deadline
+    class SlowVision:
+        def __init__(self, delay): self.delay, self.calls = delay, 0
+        def describe_screen(self):
+            self.calls += 1
+            time.sleep(self.delay)
+            return "Notepad is open"
+    class FakeClient:
+        def chat(self, model, messages):
+            self.prompt = messages[0]["content"]
+            return {"message": {"content": '[{"action": "type", "args": ["hi"]}]'}}
+    recall = planner._recall
+    planner._recall = lambda goal: (time.sleep(0.2), recall(goal))[1]
+    planner.client = FakeClient()
+    active, deadline, reuse = config.ACTIVE_MODE, config.PLAN_VISION_DEADLINE, config.PLAN_VISION_REUSE
+    config.ACTIVE_MODE = True
+    try:
+        planner.vision = SlowVision(0.3)
+        start = time.perf_counter()
+        plan = planner.plan_goal("open notepad and type hi")
+        elapsed = time.perf_counter() - start
+        assert plan == [{"action": "type", "args": ["hi"]}] and "Notepad is open" in planner.client.prompt
+        assert "ID " in planner.client.prompt and 0.3 <= elapsed < 0.45, elapsed  # max(0.3, 0.2), not the sum
+        config.PLAN_VISION_DEADLINE = 0.1
+        planner.vision = SlowVision(1.0)
+        start = time.perf_counter()
+        planner.plan_goal("open notepad")
+        cut = time.perf_counter() - start
+        planner.plan_goal("open notepad")  # Reuses the description still in flight (fresh)
+        assert cut < 0.3 and planner.vision.calls == 1 and "Unknown" in planner.client.prompt, cut
+        config.PLAN_VISION_REUSE = 0.1
+        planner.plan_goal("open notepad")  # Still in flight but stale: a new capture is started
+        assert planner.vision.calls == 2
+    finally:
+        config.ACTIVE_MODE, config.PLAN_VISION_DEADLINE, config.PLAN_VISION_REUSE = active, deadline, reuse
+    print(f"{Fore.GREEN}[+] plan_goal: context in {elapsed * 1000:.0f} ms (sources 300 + 200 ms); slow VLM cut at {cut * 1000:.0f} ms.")
+
+    shutil.rmtree(tmp, ignore_errors=True)
+
+except ImportError as e:
+    print(f"{Fore.RED}[!] Import Error: {e}")
@@ -0,0 +1,84 @@
+
+import sys
+import os
+import time
+import json
+import random
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from mewact.retrieval import CommandIndex, stem
+    from mewact.hybrid import HybridRetriever
+
+    lib_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "command_library.json")
+    with open(lib_path) as f:
+        commands = json.load(f)["commands"]
+
+    # 1. Stemming folds inflections together
+    assert stem("opening") == stem("opened") == stem("opens") == "open"
+    assert stem("settings") == stem("setting")
+    print(f"{Fore.GREEN}[+] Stemmer OK.")
+
+    # 2. Library ranking
+    index = CommandIndex()
+    index.build(commands)
+    for goal, expected in [("open chrome", "open chrome"), ("type text", "type text"),
+                           ("take a screenshot", "take screenshot"), ("kill the process", "kill process")]:
+        top = index.search(goal, k=3)
+        assert top and top[0]["name"] == expected, (goal, top)
+    print(f"{Fore.GREEN}[+] {len(index)} commands indexed; top matches correct.")
+
+    # 3. Pagination, updates and removal
+    first, total = index.ranked("browser", k=5)
+    second, _ = index.ranked("browser", k=5, offset=5)
+    assert total > 5 and not {h["name"] for h in first} & {h["name"] for h in second}
+    index.add("open my dashboard", {"description": "Open the team dashboard"})
+    assert index.search("dashboard")[0]["name"] == "open my dashboard"
+    assert index.remove("open my dashboard") and not index.search("dashboard")
+    print(f"{Fore.GREEN}[+] Pagination and incremental updates OK ({total} 'browser' hits).")
+
+    # 4. Lookups stay fast with tens of thousands of learned commands
+    words = [w for name in commands for w in name.split()]
+    for i in range(30000):
+        index.add(f"learned {i} " + " ".join(random.sample(words, 3)), {"description": " ".join(random.sample(words, 6))})
+    index.search("open chrome new tab")
+    start = time.perf_counter()
+    for _ in range(100): index.search("open chrome new tab", k=5)
+    per_query = (time.perf_counter() - start) / 100 * 1000
+    print(f"{Fore.GREEN}[+] {len(index)} commands: {per_query:.2f} ms per query.")
+
+    # 5. Hybrid retrieval: BM25 and offline embeddings fused by reciprocal rank, with filters and breakdowns
+    import shutil, tempfile
+    from mewact import config
+    from mewact.memory import LibraryManager
+    from mewact.memory_engine import VectorMemory
+    from mewact.training import MemoryTrainer
+    tmp = tempfile.mkdtemp()
+    shutil.copy(lib_path, os.path.join(tmp, "command_library.json"))
+    config.LOCAL_EMBED_STATE = os.path.join(tmp, "df.npy")
+    lib = LibraryManager(os.path.join(tmp, "command_library.json"))
+    memory = VectorMemory(os.path.join(tmp, "memory_store.json"))
+    MemoryTrainer(lib, memory).run()
+    hybrid = HybridRetriever(lib, memory)
+    assert not lib.index.search("screnshot")                      # Typo: no keyword overlap
+    assert hybrid.search("screnshot", k=3)[0]["name"] == "take screenshot"
+    top = hybrid.search("take screenshot", k=5)[0]
+    assert top["name"] == "take screenshot" and top["lexical"]["rank"] == 1 and top["vector"]["rank"] == 1
+    assert top["score"] == round(2 / 61, 6)
+    browser = hybrid.search("open a new tab", k=10, filters={"category": "browser"})
+    assert browser and all(h["category"] == "browser" for h in browser)
+    hotkeys = hybrid.search("volume", k=10, filters={"type": ["hotkey", "shell"]})
+    assert hotkeys and all(h["type"] in ("hotkey", "shell") for h in hotkeys)
+    lexical_only = HybridRetriever(lib).search("volume up", k=5)
+    assert [h["name"] for h in lexical_only] == [h["name"] for h in lib.index.search("volume up", k=5)]
+    hybrid.search("mute the sound")
+    start = time.perf_counter()
+    for _ in range(200): hybrid.search("mute the sound", k=5)
+    per_query = (time.perf_counter() - start) / 200 * 1000
+    print(f"{Fore.GREEN}[+] Hybrid: typo recovered by vectors, filters and breakdowns OK; {per_query:.2f} ms per query.")
+
+except ImportError as e:
+    print(f"{Fore.RED}[!] Import Error: {e}")
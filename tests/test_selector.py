@@ -0,0 +1,70 @@
+
+import sys
+import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Minimal Ollama-compatible /api/chat stub: picks the candidate whose name contains the goal's last word
+REQUESTS = []
+DELAY = {"seconds": 0.0}
+
+class StubOllama(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        REQUESTS.append(body)
+        time.sleep(DELAY["seconds"])
+        user = body["messages"][1]["content"]
+        goal = user.rsplit("GOAL: ", 1)[1]
+        pick = next((l for l in user.splitlines() if l.startswith("ID ") and goal.split()[-1] in l), user.splitlines()[1])
+        answer = {"id": int(pick.split(":")[0][3:]), "var": ""}
+        data = json.dumps({"model": body["model"], "message": {"role": "assistant", "content": json.dumps(answer)}, "done": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args): pass
+
+try:
+    from mewact.selector import LLMSelector, SYSTEM_PROMPT
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    selector = LLMSelector(f"http://127.0.0.1:{server.server_port}", "stub", deadline=0.5)
+    candidates = [{"id": 1, "name": "open chrome"}, {"id": 2, "name": "open notepad"}, {"id": 3, "name": "open settings"}]
+
+    # 1. Selection, stable system prefix, response cache
+    assert selector.select("open the notepad", candidates)["id"] == "2"
+    assert selector.select("open settings", candidates)["id"] == "3"
+    assert all(r["messages"][0]["content"] == SYSTEM_PROMPT and r["format"] == "json" for r in REQUESTS)
+    sent = len(REQUESTS)
+    start = time.perf_counter()
+    assert selector.select("Open the  notepad", candidates)["id"] == "2"
+    assert len(REQUESTS) == sent
+    print(f"{Fore.GREEN}[+] Selection OK; cached answer in {(time.perf_counter() - start) * 1e6:.0f} us.")
+
+    # 2. Deadline: a slow server yields None (caller uses the lexical top match); the late answer is cached
+    DELAY["seconds"] = 1.0
+    start = time.perf_counter()
+    assert selector.select("open chrome", candidates) is None
+    assert time.perf_counter() - start < 0.8
+    time.sleep(1.0)
+    assert selector.select("open chrome", candidates)["id"] == "1" and len(REQUESTS) == sent + 1
+    print(f"{Fore.GREEN}[+] Deadline fallback OK; late answer reused.")
+
+    # 3. Unreachable server: fails fast within the deadline
+    down = LLMSelector("http://127.0.0.1:9", "stub", deadline=0.5, retries=0)
+    assert down.select("open chrome", candidates) is None
+    print(f"{Fore.GREEN}[+] Unreachable server handled.")
+
+    server.shutdown()
+
+except ImportError as e:
+    print(f"{Fore.RED}[!] Import Error: {e}")
@@ -0,0 +1,54 @@
+
+import sys
+import os
+import time
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from mewact.shell import ShellService, PersistentShell
+
+    py = f'"{sys.executable}"'
+    shell = ShellService(timeout=5, max_output=400, max_concurrent=2)
+
+    # 1. Streaming + head/tail truncation
+    streamed = []
+    result = shell.run(f'{py} -c "for i in range(2000): print(\'line\', i)"',
+                       on_output=lambda stream, line: streamed.append(line))
+    assert result["returncode"] == 0
+    assert len(streamed) == 2000, len(streamed)
+    assert result["truncated"] and "line 0" in result["output"] and "line 1999" in result["output"]
+    assert len(result["output"]) < 600
+    print(f"{Fore.GREEN}[+] Streamed {len(streamed)} lines, returned {len(result['output'])} chars.")
+
+    # 2. Exit codes and stderr
+    result = shell.run(f'{py} -c "import sys; sys.stderr.write(\'oops\\n\'); sys.exit(3)"')
+    assert result["returncode"] == 3 and "oops" in result["output"]
+    print(f"{Fore.GREEN}[+] Exit code + stderr captured.")
+
+    # 3. Timeout kills the command
+    start = time.time()
+    result = shell.run(f'{py} -c "import time; time.sleep(30)"', timeout=1)
+    elapsed = time.time() - start
+    assert result["timed_out"] and elapsed < 5, elapsed
+    print(f"{Fore.GREEN}[+] Hung command killed after {elapsed:.1f}s.")
+
+    # 4. Persistent session: state survives between commands, exit codes come back via the sentinel
+    session = PersistentShell(timeout=5, max_output=400)
+    session.run("cd ..")
+    cwd = session.run(f'{py} -c "import os; print(os.getcwd())"')["output"].strip()
+    assert cwd == os.path.dirname(os.getcwd()), cwd
+    assert session.run("exit 7")["returncode"] == 7  # Kills the shell...
+    assert session.run("echo 'back'")["output"].strip() == "back"  # ...which restarts on demand
+    start = time.time()
+    for _ in range(20): session.run("echo hi")
+    per_cmd = (time.time() - start) / 20 * 1000
+    result = session.run(f'{py} -c "import time; time.sleep(30)"', timeout=1)
+    assert result["timed_out"] and session.run("echo ok")["returncode"] == 0
+    session.close()
+    print(f"{Fore.GREEN}[+] Persistent session: {per_cmd:.1f} ms per command, restarts after exit/timeout.")
+
+except ImportError as e:
+    print(f"{Fore.RED}[!] Import Error: {e}")
@@ -0,0 +1,75 @@
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+import cv2
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from mewact.template_matcher import TemplateLibrary, TemplateMatcher
+
+    # Sample icon: textured 48x48 glyph
+    rng = np.random.default_rng(7)
+    icon = np.full((48, 48, 3), 200, np.uint8)
+    cv2.circle(icon, (24, 24), 18, (40, 90, 200), -1)
+    cv2.rectangle(icon, (14, 14), (30, 30), (250, 250, 250), -1)
+    cv2.line(icon, (6, 42), (42, 6), (20, 20, 20), 3)
+
+    # Synthetic 4K screen: noisy background, the icon at 1.0x and at 1.25x (HiDPI), one at the border
+    screen = rng.integers(150, 210, (2160, 3840, 3), dtype=np.uint8)
+    big = cv2.resize(icon, None, fx=1.25, fy=1.25, interpolation=cv2.INTER_LINEAR)
+    screen[700:748, 1000:1048] = icon
+    screen[1500:1560, 3000:3060] = big
+    screen[2160 - 48:, 3840 - 48:] = icon
+
+    tmp = tempfile.mkdtemp()
+    library = TemplateLibrary(tmp)
+    library.add("Settings Gear", icon)
+    assert library.names() == ["settings_gear"]
+    matcher = TemplateMatcher(TemplateLibrary(tmp))   # Fresh instance: pyramids come from disk
+
+    # 1. Region hint: only the hinted area is searched
+    hit = matcher.match(screen, "settings gear", region=(900, 600, 300, 300))
+    assert hit and abs(hit["x"] - 1024) <= 2 and abs(hit["y"] - 724) <= 2 and hit["scale"] == 1.0, hit
+    print(f"{Fore.GREEN}[+] Region hint: found at ({hit['x']}, {hit['y']}) score={hit['score']}")
+
+    # 2. Multi-scale: the 1.25x copy matches the 1.25 variant
+    hit = matcher.match(screen, "settings gear", region=(2900, 1400, 300, 300))
+    assert hit and hit["scale"] == 1.25 and abs(hit["x"] - 3030) <= 3 and abs(hit["y"] - 1530) <= 3, hit
+    print(f"{Fore.GREEN}[+] Multi-scale: 1.25x icon found at ({hit['x']}, {hit['y']}) score={hit['score']}")
+
+    # 3. Icon touching the screen corner, and one cut off by the screen edge, keep level-0 coordinates
+    hit = matcher.match(screen, "settings gear", region=(3600, 1900, 240, 260))
+    assert hit and abs(hit["x"] - (3840 - 24)) <= 2 and abs(hit["y"] - (2160 - 24)) <= 2, hit
+    banner = cv2.resize(icon, (100, 100))
+    TemplateLibrary(tmp, scales=(1.0,)).add("banner", banner)
+    strip = rng.integers(150, 210, (97, 600, 3), dtype=np.uint8)
+    strip[:, 400:500] = banner[:97]
+    hit = matcher.match(strip, "banner", threshold=0.5)
+    assert hit and abs(hit["x"] - 450) <= 2, hit
+    print(f"{Fore.GREEN}[+] Border matches at ({hit['x']}, {hit['y']}) and the screen corner.")
+
+    # 4. Dirty regions: nothing in the changed area -> no match; unknown names -> None
+    assert matcher.match(screen, "settings gear", regions=[(200, 200, 100, 100)]) is None
+    assert matcher.match(screen, "missing") is None
+
+    # 5. Latency: full 4K search per template well under 50 ms
+    gray = cv2.cvtColor(screen, cv2.COLOR_BGR2GRAY)
+    matcher.match(gray, "settings gear")
+    runs = 5
+    start = time.perf_counter()
+    for _ in range(runs): hit = matcher.match(gray, "settings gear")
+    per_match = (time.perf_counter() - start) * 1000 / runs
+    assert hit and per_match < 50, per_match
+    print(f"{Fore.GREEN}[+] Full 4K match: {per_match:.1f} ms per template.")
+
+    shutil.rmtree(tmp, ignore_errors=True)
+
+except ImportError as e:
+    print(f"{Fore.RED}[!] Import Error: {e}")
@@ -0,0 +1,100 @@
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+from colorama import init, Fore
+
+init(autoreset=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from mewact import config
+    from mewact.memory import LibraryManager
+    from mewact.memory_engine import VectorMemory
+    from mewact.training import MemoryTrainer, iter_commands, command_text
+    from mewact.local_embed import get_local_embedder
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tmp = tempfile.mkdtemp()
+    lib_path = os.path.join(tmp, "command_library.json")
+    shutil.copy(os.path.join(root, "command_library.json"), lib_path)
+    config.LOCAL_EMBED_STATE = os.path.join(tmp, "df.npy")
+    config.EMBED_CACHE_DIR = os.path.join(tmp, "embeds")
+    store = os.path.join(tmp, "memory_store.json")
+
+    lib = LibraryManager(lib_path)
+    lib.library["commands"]["broken entry"] = "not a dict"   # Skipped, not fatal
+    total = len(list(iter_commands(lib)))
+
+    # 1. Full offline training: one bulk write per batch, throughput reported
+    memory = VectorMemory(store)
+    stats = MemoryTrainer(lib, memory, batch_size=128).run()
+    assert stats["added"] == total == len(memory.data) and stats["failed"] == 0
+    hit = memory.search("mew act", k=1)[0]
+    assert hit["metadata"]["id"] in ("mew act", "mewact"), hit["metadata"]["id"]
+    print(f"{Fore.GREEN}[+] Trained {total} commands in {stats['seconds']:.2f}s ({stats['per_second']:.0f}/s).")
+
+    # 2. Re-running embeds nothing; a changed command is the only one re-embedded
+    memory = VectorMemory(store)
+    assert MemoryTrainer(lib, memory).run()["added"] == 0
+    lib.save_entry("mew act", "print('changed')")
+    lib.library["commands"]["mew act"]["description"] = "Say hello from the retrained command"
+    stats = MemoryTrainer(lib, memory).run()
+    assert stats["added"] == 1 and stats["replaced"] == 1 and len(memory.deleted_rows()) == 1
+    hits = [item["metadata"]["id"] for item, _ in memory.search_vector(memory.get_embedding("mew act"), 5)]
+    assert hits.count("mew act") == 1, hits   # The superseded row no longer matches
+    print(f"{Fore.GREEN}[+] Incremental retraining: unchanged library embeds nothing; changed command replaced.")
+
+    # 3. Interrupted run resumes after the last checkpointed batch without duplicates
+    store2 = os.path.join(tmp, "interrupted.json")
+    config.LOCAL_EMBED_STATE = os.path.join(tmp, "df2.npy")   # Fresh IDF (the first one is frozen by now)
+    memory = VectorMemory(store2)
+    embedder = get_local_embedder()
+    docs_before = embedder.docs
+    def crash(done, todo):
+        if done >= 64: raise KeyboardInterrupt
+    try: MemoryTrainer(lib, memory, batch_size=32).run(progress=crash)
+    except KeyboardInterrupt: pass
+    assert len(memory.data) == 64
+    # Crash between the store append and the checkpoint: the written rows are recognised on resume
+    memory.add_many([command_text("mew act", lib.get_command("mew act"))], [{"id": "mew act", "command": {}}], [None])
+    resumed = MemoryTrainer(lib, VectorMemory(store2), batch_size=32)
+    stats = resumed.run()
+    names = [item["metadata"]["id"] for item in VectorMemory(store2).data]
+    assert len(names) == total + 1 and len(set(names)) == total, (len(names), len(set(names)), total)
+    assert embedder.docs - docs_before == total, (embedder.docs - docs_before, total)  # IDF counted once
+    assert embedder.frozen   # Fitted on the library, then fixed for every trained row
+    print(f"{Fore.GREEN}[+] Resume: {stats['added']} remaining commands added, no duplicates.")
+
+    # 4. Ollama requests run concurrently over a bounded pool (fake client with 5 ms latency)
+    calls, inflight, peak = [], [0], [0]
+    class FakeOllama:
+        @staticmethod
+        def embeddings(model, prompt):
+            inflight[0] += 1; peak[0] = max(peak[0], inflight[0])
+            time.sleep(0.005)
+            calls.append(prompt); inflight[0] -= 1
+            return {"embedding": [float(len(prompt)), 1.0, float(prompt.count(" "))]}
+    real = sys.modules.get("ollama")
+    sys.modules["ollama"] = FakeOllama
+    config.ACTIVE_MODE, config.EMBEDDING_BACKEND = True, "ollama"
+    try:
+        memory = VectorMemory(os.path.join(tmp, "ollama.json"))
+        stats = MemoryTrainer(lib, memory, batch_size=64, workers=8).run()
+        assert stats["added"] == total and len(calls) == total and 1 < peak[0] <= 8
+        serial = total * 0.005
+        assert stats["seconds"] < serial / 2, (stats["seconds"], serial)
+        # Retraining into a fresh store is served from the embedding cache
+        calls.clear()
+        MemoryTrainer(lib, VectorMemory(os.path.join(tmp, "ollama2.json"))).run()
+        assert not calls
+    finally:
+        config.ACTIVE_MODE, config.EMBEDDING_BACKEND = False, "auto"
+        if real is None: sys.modules.pop("ollama")
+        else: sys.modules["ollama"] = real
+    print(f"{Fore.GREEN}[+] Ollama: {stats['seconds']:.2f}s with {peak[0]} concurrent requests (serial ~{serial:.1f}s); cache serves retraining.")
+
+except ImportError as e:
+    print(f"{Fore.RED}[!] Import Error: {e}")